@@ -116,7 +116,6 @@ class ai_action:
     # 儲存與讀取 (PyTorch 格式)
     # -----------------------------
     def _save_path(self):
-        print(f"路徑: {self.role_id}")
         return os.path.join(self.SAVE_DIR, f"ppo_{self.role_id}.pth")
 
     def save_model(self):
@@ -156,9 +155,10 @@ class ai_action:
 
         # Buff 效果特徵
         for s in filtered_skills:
-            if s.SkillID in attacker.buff_skill:
-                remaining_time = attacker.buff_skill[s.SkillID][1]
-                max_time = attacker.buff_skill[s.SkillID][0].SkillOperationDataList[0].EffectDurationTime
+            handle = attacker.buff_skill.first_of(s.SkillID)
+            if handle is not None:
+                skill_data, remaining_time = attacker.buff_skill[handle]
+                max_time = skill_data.SkillOperationDataList[0].EffectDurationTime
                 state.append(remaining_time / max_time if max_time > 0 else 0)
             else:
                 state.append(0.0)
@@ -175,9 +175,10 @@ class ai_action:
         # 道具 Buff 效果特徵（遍歷所有遊戲道具，維度固定）
         for item in self.all_game_items:
             i_id = item.CodeID
-            if i_id in attacker.buff_item:
-                remaining_time = attacker.buff_item[i_id][1]
-                max_time = attacker.buff_item[i_id][0].EffectDurationTime
+            handle = attacker.buff_item.first_of(i_id)
+            if handle is not None:
+                item_data, remaining_time = attacker.buff_item[handle]
+                max_time = item_data.ItemEffectDataList[0].EffectDurationTime
                 state.append(remaining_time / max_time if max_time > 0 else 0)
             else:
                 state.append(0.0)
@@ -221,7 +222,7 @@ class ai_action:
                     # 檢查條件 (SkillProcessor)
                     condition_ok = skill_all_condition_process(self.battle_character, s)
                     # 檢查 Buff 是否正在運行 (避免重複施放同Buff)
-                    skill_not_running = not any(k.startswith(s.SkillID) for k in self_char.buff_skill)
+                    skill_not_running = not self_char.buff_skill.has_source(s.SkillID)
 
                     if mp_ok and cd_ok and condition_ok and skill_not_running:
                         mask.append(True)
@@ -240,7 +241,7 @@ class ai_action:
                         item_found = True
                         item_enough = count > 0
                         item_cd_ok = item_data.CodeID not in self_char.item_cooldowns
-                        item_buff_not_running = not any(k.startswith(item_data.CodeID) for k in self_char.buff_item)
+                        item_buff_not_running = not self_char.buff_item.has_source(item_data.CodeID)
 
                         if item_enough and item_cd_ok and item_buff_not_running:
                             mask.append(True)
@@ -271,9 +272,9 @@ class ai_action:
         mask_tensor = torch.tensor(action_mask, dtype=torch.bool)
         action_logits[0][~mask_tensor] = -1e9
 
-        # 計算機率分佈
+        # 計算機率分佈 以戰鬥自己的亂數產生器抽樣 (不使用 torch 的全域亂數)
         dist = Categorical(logits=action_logits)
-        action_index = dist.sample()
+        action_index = torch.tensor([self_char.rng.choice_index(dist.probs[0].tolist())])
         action_logprob = dist.log_prob(action_index)
 
         # 存入暫存記憶體 (Update 時使用)
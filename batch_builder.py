@@ -0,0 +1,211 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from game_models import GameData, BasalAttributeNames, get_basal_attribute_values
+from status_matrix import StatusMatrix
+from status_operation import EquipStatusSources, StatusFieldNames, StatusDefaults
+
+
+def _python_sum(values: np.ndarray, is_float: np.ndarray, present: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    逐列模擬 Python sum() 的加總結果 (從整數0開始 全為整數時維持整數
+    遇到第一個浮點數後 浮點數改用 Neumaier 補償加法 與 Python 3.12 之後的 sum() 相同)
+
+    Args:
+        values: (列, 項目) 數值
+        is_float: (列, 項目) 該項目原本是否為浮點數
+        present: (列, 項目) 該項目是否存在 (空的裝備欄位不加總)
+
+    Returns:
+        (加總結果, 結果是否為浮點數)
+    """
+    count = values.shape[0]
+    is_float = is_float & present
+    # 全為整數時直接相加 (整數以float64相加在此數值範圍內沒有誤差)
+    if not is_float.any():
+        return np.where(present, values, 0).sum(axis=1), np.zeros(count, dtype=bool)
+
+    int_total = np.zeros(count)
+    float_total = np.zeros(count)
+    compensation = np.zeros(count)
+    float_mode = np.zeros(count, dtype=bool)
+
+    for k in range(values.shape[1]):
+        x = values[:, k]
+        # 已在浮點階段的列: 浮點數使用補償加法 整數直接相加 (與 CPython 相同)
+        compensated = present[:, k] & float_mode & is_float[:, k]
+        t = float_total + x
+        error = np.where(np.abs(float_total) >= np.abs(x), (float_total - t) + x, (x - t) + float_total)
+        compensation = np.where(compensated, compensation + error, compensation)
+        float_total = np.where(present[:, k] & float_mode, t, float_total)
+
+        # 整數階段: 整數直接相加 遇到第一個浮點數時一般相加後進入浮點階段
+        integer = present[:, k] & ~float_mode
+        int_total = np.where(integer & ~is_float[:, k], int_total + x, int_total)
+        switch = integer & is_float[:, k]
+        float_total = np.where(switch, int_total + x, float_total)
+        float_mode = float_mode | switch
+
+    float_total = np.where(compensation != 0, float_total + compensation, float_total)
+    return np.where(float_mode, float_total, int_total), float_mode
+
+
+class _ForgeTable:
+    """
+    裝備合併能力值表 (裝備, 強化等級, 屬性)
+    沒有強化資料的等級 (未強化或超出範圍) 與裝備本身相同
+    """
+
+    def __init__(self, game_data: GameData, equipment_dic: Dict):
+        self.codes = pd.Index(list(equipment_dic))
+        self.max_forge_lv = max(
+            (forge.ForgeLv for equipment in equipment_dic.values() for forge in equipment.ForgeConfigList),
+            default=0,
+        )
+        # 最後一格固定放裝備本身 給超出強化資料範圍的等級使用
+        self.base_slot = self.max_forge_lv + 1
+        shape = (len(self.codes), self.base_slot + 1, len(BasalAttributeNames))
+        self.values = np.zeros(shape)
+        self.is_float = np.zeros(shape, dtype=bool)
+        for i, equipment in enumerate(equipment_dic.values()):
+            for forge_lv in range(self.base_slot + 1):
+                key_lv = forge_lv if forge_lv < self.base_slot else -1
+                merged = get_basal_attribute_values(game_data.get_forged_attributes(equipment, key_lv))
+                self.values[i, forge_lv] = merged
+                self.is_float[i, forge_lv] = [isinstance(value, float) for value in merged]
+
+    def lookup(self, codes: np.ndarray, forge_lvs: np.ndarray, kind: str):
+        """
+        取得 (列, 欄位) 裝備的合併能力值
+
+        Returns:
+            (裝備索引, 數值, 是否為浮點數, 是否有裝備)
+        """
+        flat = codes.ravel()
+        present = pd.notna(flat) & (flat != "")
+        index = self.codes.get_indexer(flat)
+        unknown = present & (index < 0)
+        if unknown.any():
+            raise KeyError(f"找不到{kind}: {flat[unknown][0]}")
+
+        # 超出強化資料範圍的等級 使用裝備本身
+        forge_lvs = forge_lvs.ravel()
+        forge_lvs = np.where((forge_lvs >= 0) & (forge_lvs <= self.max_forge_lv), forge_lvs, self.base_slot)
+        index = np.where(present, index, 0)
+        shape = codes.shape + (len(BasalAttributeNames),)
+        return (
+            index.reshape(codes.shape),
+            self.values[index, forge_lvs].reshape(shape),
+            self.is_float[index, forge_lvs].reshape(shape),
+            present.reshape(codes.shape),
+        )
+
+
+class BatchCharacterBuilder:
+    """
+    批次建立角色能力值
+    一次計算大量 (種族, 職業, 等級, 裝備) 組合的能力值 結果與 CharacterStatusCalculator.create_character 的 stats 相同
+    """
+
+    def __init__(self, game_data: GameData = None):
+        self.game_data = game_data or GameData.Instance
+        self.status_matrix = StatusMatrix(self.game_data)
+        self.weapon_table = _ForgeTable(self.game_data, self.game_data.WeaponsDic)
+        self.armor_table = _ForgeTable(self.game_data, self.game_data.ArmorsDic)
+        # 武器攻擊速度 (依武器索引)
+        weapon_as = [self.game_data.GameSettingDic[weapon.ASID].GameSettingValue
+                     for weapon in self.game_data.WeaponsDic.values()]
+        self.weapon_as = np.array(weapon_as, dtype=float)
+        self.weapon_as_is_float = np.array([isinstance(value, float) for value in weapon_as])
+
+        # 輸出的能力值欄位 (StatusValues中的數值欄位)
+        self.status_defaults = {
+            name: default for name, default in zip(StatusFieldNames, StatusDefaults) if not isinstance(default, str)
+        }
+        self.status_names: List[str] = list(self.status_defaults)
+
+    @staticmethod
+    def _as_2d(values, count: int, dtype=None) -> np.ndarray:
+        array = np.asarray(values, dtype=dtype)
+        if array.size == 0:
+            return array.reshape(count, 0)
+        return array.reshape(count, -1)
+
+    def build(self, races: Sequence[str], jobs: Sequence[str], levels: Sequence[int],
+              weapons, weapon_forge_lvs, armors, armor_forge_lvs) -> pd.DataFrame:
+        """
+        批次計算角色能力值
+
+        Args:
+            races: 種族 (n)
+            jobs: 職業ID (n)
+            levels: 等級 (n)
+            weapons: 武器CodeID (n, 武器欄位數) 空欄位為 "" 或 None 依序為計算器中 weapon_list 的順序
+            weapon_forge_lvs: 武器強化等級 (n, 武器欄位數)
+            armors: 防具CodeID (n, 防具欄位數) 空欄位為 "" 或 None
+            armor_forge_lvs: 防具強化等級 (n, 防具欄位數)
+
+        Returns:
+            每列一個角色的能力值表 (欄位: race, job, level 與 StatusValues 的數值欄位)
+        """
+        races = np.asarray(races, dtype=object)
+        jobs = np.asarray(jobs, dtype=object)
+        levels = np.asarray(levels)
+        count = len(races)
+
+        weapon_codes = self._as_2d(weapons, count, dtype=object)
+        armor_codes = self._as_2d(armors, count, dtype=object)
+        weapon_index, weapon_values, weapon_is_float, weapon_present = self.weapon_table.lookup(
+            weapon_codes, self._as_2d(weapon_forge_lvs, count, dtype=np.int64), "武器")
+        _, armor_values, armor_is_float, armor_present = self.armor_table.lookup(
+            armor_codes, self._as_2d(armor_forge_lvs, count, dtype=np.int64), "防具")
+
+        # 各裝備屬性分別加總 (武器/防具各自一次 與計算器的 sum() 結果相同)
+        weapon_sums = {}
+        armor_sums = {}
+        for a, name in enumerate(BasalAttributeNames):
+            weapon_sums[name] = _python_sum(weapon_values[:, :, a], weapon_is_float[:, :, a], weapon_present)
+            armor_sums[name] = _python_sum(armor_values[:, :, a], armor_is_float[:, :, a], armor_present)
+
+        equip: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for status_name, (attribute, source) in EquipStatusSources.items():
+            match source:
+                case "weapon":
+                    equip[status_name] = weapon_sums[attribute]
+                case "armor":
+                    equip[status_name] = armor_sums[attribute]
+                case "both":
+                    weapon_total, weapon_float = weapon_sums[attribute]
+                    armor_total, armor_float = armor_sums[attribute]
+                    equip[status_name] = (weapon_total + armor_total, weapon_float | armor_float)
+        equip["HP"] = equip["MaxHP"]
+        equip["MP"] = equip["MaxMP"]
+
+        # 攻擊速度取第一把武器 沒有武器時為0
+        has_weapon = weapon_present.any(axis=1)
+        first_weapon = weapon_index[np.arange(count), weapon_present.argmax(axis=1)] if weapon_codes.shape[1] else np.zeros(count, dtype=np.intp)
+        equip["AS"] = (
+            np.where(has_weapon, self.weapon_as[first_weapon], 0),
+            has_weapon & self.weapon_as_is_float[first_weapon],
+        )
+
+        basal = self.status_matrix.compute_basal(races, jobs, levels)
+
+        table = {"race": races, "job": jobs, "level": levels}
+        for name in self.status_names:
+            default = self.status_defaults[name]
+            basal_values = basal.get(name)
+            if basal_values is None:
+                basal_values = np.full(count, default)
+            basal_is_float = np.issubdtype(basal_values.dtype, np.floating)
+
+            equip_values, equip_is_float = equip.get(
+                name, (np.full(count, float(default)), np.full(count, isinstance(default, float))))
+            values = basal_values + equip_values
+            # 所有列都是整數時輸出整數欄位
+            if not basal_is_float and not equip_is_float.any():
+                values = values.astype(np.int64)
+            table[name] = values
+        return pd.DataFrame(table)
@@ -0,0 +1,336 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from battle_engine import BattleSpec, run_battle
+from exact_engine import ExactBattleSolver
+from game_models import GameData
+from vector_engine import VectorBattleScenario
+
+
+# 分位數統計的百分位
+Percentiles = [5, 25, 50, 75, 95]
+# 戰鬥引擎 auto: 可以向量化時使用向量引擎 否則逐場模擬
+Engines = ("auto", "scalar", "vector")
+# 命令列可選的引擎 exact: 雙方都只普攻時以動態規劃計算精確結果 (不模擬) auto 時優先使用
+CliEngines = (*Engines, "exact")
+# 向量引擎每批同步模擬的場數
+VectorChunkSize = 1000
+
+
+def wilson_interval(wins: int, total: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """
+    勝率的 Wilson 信賴區間 (場數少或勝率接近0/1時比常態近似準確)
+    """
+    if total <= 0:
+        return 0.0, 0.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = wins / total
+    denominator = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def battle_seed(base_seed: int, index: int) -> int:
+    """
+    由基礎種子與戰鬥編號產生每場戰鬥的種子 (結果與工作行程數量及分配順序無關)
+    """
+    return int(np.random.SeedSequence([base_seed, index]).generate_state(1)[0])
+
+
+# region 工作行程
+
+def _init_worker(cwd: str):
+    """
+    工作行程初始化 每個行程只讀取一次遊戲資料
+    """
+    import torch
+    from game_models import GameData
+
+    os.chdir(cwd)
+    # 每個行程只用一條執行緒 行程數量才是平行度 (否則多個行程搶同一組核心)
+    torch.set_num_threads(1)
+    if GameData.Instance is None:
+        GameData()
+
+
+def _run_chunk(player_spec: BattleSpec, enemy_spec: BattleSpec, base_seed: int,
+               indexes: Sequence[int]) -> List[Dict[str, Any]]:
+    """
+    執行一批戰鬥 只回傳統計需要的摘要 (不產生日誌)
+    """
+    summaries = []
+    for index in indexes:
+        result = run_battle(player_spec, enemy_spec, seed=battle_seed(base_seed, index), log_verbosity="none")
+        summaries.append({
+            "won": result.player_won,
+            "timed_out": result.timed_out,
+            "duration": result.duration,
+            "player_damage": result.player_damage,
+            "enemy_damage": result.enemy_damage,
+            "player_skill_usage": result.player_skill_usage,
+            "enemy_skill_usage": result.enemy_skill_usage,
+        })
+    return summaries
+
+# endregion
+
+
+@dataclass
+class BatchStats:
+    """
+    批次戰鬥的累計統計
+    """
+    confidence: float = 0.95
+    engine: str = "scalar"  # 實際使用的戰鬥引擎
+    battles: int = 0
+    wins: int = 0
+    timeouts: int = 0
+    win_durations: List[float] = field(default_factory=list)  # 玩家獲勝場次的擊殺時間
+    player_damage: List[float] = field(default_factory=list)  # 每場玩家造成的總傷害
+    enemy_damage: List[float] = field(default_factory=list)  # 每場敵人造成的總傷害
+    player_skill_usage: Counter = field(default_factory=Counter)
+    enemy_skill_usage: Counter = field(default_factory=Counter)
+
+    def add(self, summary: Dict[str, Any]):
+        self.battles += 1
+        self.wins += summary["won"]
+        self.timeouts += summary["timed_out"]
+        if summary["won"]:
+            self.win_durations.append(summary["duration"])
+        self.player_damage.append(summary["player_damage"])
+        self.enemy_damage.append(summary["enemy_damage"])
+        self.player_skill_usage.update(summary["player_skill_usage"])
+        self.enemy_skill_usage.update(summary["enemy_skill_usage"])
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.battles if self.battles else 0.0
+
+    def win_rate_interval(self) -> Tuple[float, float]:
+        return wilson_interval(self.wins, self.battles, self.confidence)
+
+    @staticmethod
+    def _distribution(values: List[float]) -> Dict[str, float]:
+        if not values:
+            return {}
+        array = np.asarray(values, dtype=float)
+        result = {"mean": float(array.mean()), "std": float(array.std())}
+        result.update({f"p{p}": float(v) for p, v in zip(Percentiles, np.percentile(array, Percentiles))})
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        統計結果 (可直接輸出為JSON)
+        """
+        low, high = self.win_rate_interval()
+        return {
+            "engine": self.engine,
+            "battles": self.battles,
+            "wins": self.wins,
+            "timeouts": self.timeouts,
+            "win_rate": self.win_rate,
+            "win_rate_ci": [low, high],
+            "confidence": self.confidence,
+            "time_to_kill": self._distribution(self.win_durations),
+            "player_damage": self._distribution(self.player_damage),
+            "enemy_damage": self._distribution(self.enemy_damage),
+            "player_skill_usage": {k: v / self.battles for k, v in self.player_skill_usage.items()} if self.battles else {},
+            "enemy_skill_usage": {k: v / self.battles for k, v in self.enemy_skill_usage.items()} if self.battles else {},
+        }
+
+    def progress_text(self) -> str:
+        low, high = self.win_rate_interval()
+        ttk = f"{np.mean(self.win_durations):.2f}s" if self.win_durations else "-"
+        return (f"{self.battles} 場  勝率 {self.win_rate * 100:.1f}% "
+                f"({self.confidence * 100:.0f}% CI {low * 100:.1f}% ~ {high * 100:.1f}%)  平均擊殺時間 {ttk}")
+
+
+def run_batch(player_spec: BattleSpec, enemy_spec: BattleSpec, battles: int, seed: int = 0,
+              workers: Optional[int] = None, chunk_size: int = 20, confidence: float = 0.95,
+              progress=None, engine: str = "auto") -> BatchStats:
+    """
+    以行程池執行多場快速戰鬥並累計統計
+    可以向量化的配置 (玩家只有普攻與純傷害技能 對上沒有技能的怪物) 改用向量引擎在目前行程一次模擬一批
+
+    Args:
+        battles: 戰鬥場數
+        seed: 基礎種子 每場戰鬥的種子由 (seed, 戰鬥編號) 產生 相同種子結果相同
+        workers: 工作行程數量 None時為CPU核心數 1時在目前行程執行
+        chunk_size: 每個工作一次執行的場數
+        progress: 每完成一批時呼叫 progress(stats)
+        engine: auto / scalar / vector 指定 vector 但無法向量化時拋出 ValueError
+    """
+    if engine not in Engines:
+        raise ValueError(f"未知的戰鬥引擎: {engine}")
+    stats = BatchStats(confidence=confidence)
+
+    if engine != "scalar":
+        scenario, reason = VectorBattleScenario.compile(player_spec, enemy_spec, GameData.Instance or GameData())
+        if scenario is None and engine == "vector":
+            raise ValueError(f"無法使用向量引擎: {reason}")
+        if scenario is not None:
+            stats.engine = "vector"
+            # 每批的種子由 (seed, 第一場的編號) 產生 結果與工作行程數量無關
+            for start in range(0, battles, VectorChunkSize):
+                results = scenario.run(min(VectorChunkSize, battles - start), seed=battle_seed(seed, start))
+                for summary in results.summaries():
+                    stats.add(summary)
+                if progress:
+                    progress(stats)
+            return stats
+
+    chunks = [range(start, min(start + chunk_size, battles)) for start in range(0, battles, chunk_size)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        for indexes in chunks:
+            for summary in _run_chunk(player_spec, enemy_spec, seed, indexes):
+                stats.add(summary)
+            if progress:
+                progress(stats)
+        return stats
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(os.getcwd(),)) as pool:
+        futures = [pool.submit(_run_chunk, player_spec, enemy_spec, seed, indexes) for indexes in chunks]
+        for future in as_completed(futures):
+            for summary in future.result():
+                stats.add(summary)
+            if progress:
+                progress(stats)
+    return stats
+
+
+# region 命令列
+
+def _parse_equipment(values: Optional[List[str]], default: int = 0) -> List[Tuple[str, int]]:
+    """
+    CodeID[:數值] -> (CodeID, 數值) 裝備為強化等級 道具為數量
+    """
+    result = []
+    for value in values or []:
+        code, _, number = value.partition(":")
+        result.append((code, int(number) if number else default))
+    return result
+
+
+def _parse_character(value: str) -> Tuple[str, str, int]:
+    """
+    種族,職業,等級
+    """
+    try:
+        race, job, level = value.split(",")
+        return race, job, int(level)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"角色格式應為 種族,職業,等級: {value}") from None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="批次執行快速戰鬥並統計勝率")
+    player = parser.add_mutually_exclusive_group(required=True)
+    player.add_argument("--player", type=_parse_character, help="玩家 種族,職業,等級")
+    player.add_argument("--player-monster", help="以怪物作為玩家方 怪物CodeID (基準對戰)")
+    parser.add_argument("--weapon", action="append", help="玩家武器 CodeID[:強化等級] (可重複)")
+    parser.add_argument("--armor", action="append", help="玩家防具 CodeID[:強化等級] (可重複)")
+    parser.add_argument("--item", action="append", help="玩家道具 CodeID[:數量] (可重複 數量預設1)")
+    enemy = parser.add_mutually_exclusive_group(required=True)
+    enemy.add_argument("--monster", help="怪物CodeID")
+    enemy.add_argument("--enemy", type=_parse_character, help="敵對玩家 種族,職業,等級")
+    parser.add_argument("--enemy-weapon", action="append", help="敵對玩家武器 CodeID[:強化等級] (可重複)")
+    parser.add_argument("--enemy-armor", action="append", help="敵對玩家防具 CodeID[:強化等級] (可重複)")
+    parser.add_argument("--enemy-item", action="append", help="敵人道具 CodeID[:數量] (可重複)")
+    parser.add_argument("-n", "--battles", type=int, default=100, help="戰鬥場數")
+    parser.add_argument("--seed", type=int, default=0, help="基礎亂數種子")
+    parser.add_argument("--workers", type=int, default=None, help="工作行程數量 (預設為CPU核心數)")
+    parser.add_argument("--chunk-size", type=int, default=20, help="每個工作一次執行的場數")
+    parser.add_argument("--confidence", type=float, default=0.95, help="勝率信賴區間的信心水準")
+    parser.add_argument("--engine", choices=CliEngines, default="auto",
+                        help="戰鬥引擎 (auto: 雙方都只普攻時計算精確解 可以向量化時使用向量引擎)")
+    parser.add_argument("--json", dest="json_path", help="統計結果輸出的JSON檔案")
+    return parser
+
+
+def _print_exact(summary: Dict[str, Any], elapsed: float, json_path: Optional[str]) -> int:
+    """
+    輸出精確解 (機率與擊殺時間分布 沒有抽樣誤差)
+    """
+    print(f"[exact] 勝率 {summary['win_rate'] * 100:.2f}%  敗率 {summary['loss_rate'] * 100:.2f}%  "
+          f"超時 {summary['timeout_rate'] * 100:.2f}%  耗時 {elapsed:.3f}s")
+    for name in ("time_to_kill", "time_to_lose"):
+        distribution = summary[name]
+        if distribution:
+            values = "  ".join(f"{k} {v:.1f}" for k, v in distribution.items())
+            print(f"{name:<14}{values}")
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.player_monster:
+        player_spec = BattleSpec.from_monster(args.player_monster, items=_parse_equipment(args.item, default=1))
+    else:
+        player_spec = BattleSpec.player(*args.player, weapons=_parse_equipment(args.weapon),
+                                        armors=_parse_equipment(args.armor),
+                                        items=_parse_equipment(args.item, default=1))
+    if args.monster:
+        enemy_spec = BattleSpec.from_monster(args.monster, items=_parse_equipment(args.enemy_item, default=1))
+    else:
+        enemy_spec = BattleSpec.player(*args.enemy, weapons=_parse_equipment(args.enemy_weapon),
+                                       armors=_parse_equipment(args.enemy_armor),
+                                       items=_parse_equipment(args.enemy_item, default=1))
+
+    start = time.perf_counter()
+    if args.engine in ("auto", "exact"):
+        solver, reason = ExactBattleSolver.compile(player_spec, enemy_spec, GameData.Instance or GameData())
+        if solver is not None:
+            return _print_exact(solver.solve().summary(), time.perf_counter() - start, args.json_path)
+        if args.engine == "exact":
+            print(f"無法計算精確解: {reason}")
+            return 1
+
+    try:
+        stats = run_batch(player_spec, enemy_spec, args.battles, seed=args.seed, workers=args.workers,
+                          chunk_size=args.chunk_size, confidence=args.confidence,
+                          progress=lambda s: print(s.progress_text(), flush=True),
+                          engine=args.engine)
+    except ValueError as e:
+        print(e)
+        return 1
+    elapsed = time.perf_counter() - start
+
+    summary = stats.summary()
+    print(f"[{stats.engine}] 共 {stats.battles} 場 耗時 {elapsed:.2f}s ({stats.battles / elapsed:.1f} 場/秒) 超時 {stats.timeouts} 場")
+    for name in ("time_to_kill", "player_damage", "enemy_damage"):
+        distribution = summary[name]
+        if distribution:
+            values = "  ".join(f"{k} {v:.1f}" for k, v in distribution.items())
+            print(f"{name:<14}{values}")
+    for name in ("player_skill_usage", "enemy_skill_usage"):
+        usage = sorted(summary[name].items(), key=lambda x: x[1], reverse=True)
+        print(f"{name}: " + ", ".join(f"{skill} {count:.2f}" for skill, count in usage))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    return 0
+
+# endregion
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import torch
+
+from battle_log import BattleLog
+from battle_simulator import BattleCharacter, BattleSimulator
+from character_factory import CharacterFactory
+from game_models import GameData, WeaponDataModel, ArmorDataModel, ItemDataModel, MonsterDataModel
+
+
+@dataclass
+class BattleSpec:
+    """
+    戰鬥角色配置 (不需要任何介面物件)
+    設定 monster 時為怪物 其餘欄位忽略 否則依 種族/職業/等級/裝備 建立人物
+
+    裝備與道具可傳入資料物件或 CodeID
+        weapons: [(武器, 強化等級)] 順序有意義 (攻擊速度取第一把武器)
+        armors: [(防具, 強化等級)]
+        items: [(道具, 數量)]
+    """
+    race: str = ""
+    job: str = ""
+    level: int = 1
+    weapons: Sequence[Tuple[Union[str, WeaponDataModel], int]] = ()
+    armors: Sequence[Tuple[Union[str, ArmorDataModel], int]] = ()
+    items: Sequence[Tuple[Union[str, ItemDataModel], int]] = ()
+    monster: Optional[Union[str, MonsterDataModel]] = None  # 怪物CodeID或資料
+    name: Optional[str] = None  # 角色名稱 None時使用預設名稱
+
+    @classmethod
+    def player(cls, race: str, job: str, level: int, weapons=(), armors=(), items=(), name: str = None) -> "BattleSpec":
+        return cls(race=race, job=job, level=level, weapons=weapons, armors=armors, items=items, name=name)
+
+    @classmethod
+    def from_monster(cls, monster: Union[str, MonsterDataModel], items=(), name: str = None) -> "BattleSpec":
+        return cls(monster=monster, items=items, name=name)
+
+
+@dataclass
+class BattleResult:
+    """
+    單場戰鬥結果
+    """
+    player_won: bool
+    timed_out: bool
+    duration: float  # 最後一個動作的時間 (秒) 超時為戰鬥上限時間
+    player_name: str
+    enemy_name: str
+    player_stats: Dict[str, Any]  # 戰鬥結束時的能力值
+    enemy_stats: Dict[str, Any]
+    battle_log: BattleLog  # 事件紀錄 需要文字時呼叫 battle_log.render()
+    damage_data: List[Dict]  # 日誌詳細程度為 damage 以上時才有資料
+    player_damage: float  # 玩家方造成的總傷害
+    enemy_damage: float  # 敵方造成的總傷害
+    player_skill_usage: Dict[str, int]
+    enemy_skill_usage: Dict[str, int]
+    seed: Optional[int] = None
+
+    def to_battle_data(self) -> Dict[str, Any]:
+        """
+        轉為介面 last_battle_data 的格式 (可直接給 StatsAnalyzer 使用)
+        """
+        return {
+            "damage": self.damage_data,
+            "player_skill_usage": self.player_skill_usage,
+            "enemy_skill_usage": self.enemy_skill_usage,
+            "result": self.player_won,
+        }
+
+
+_default_factory: Optional[CharacterFactory] = None
+
+
+def _get_factory(game_data: GameData) -> CharacterFactory:
+    """
+    取得預設的角色工廠 (遊戲資料不同時重新建立)
+    """
+    global _default_factory
+    if _default_factory is None or _default_factory.game_data is not game_data:
+        _default_factory = CharacterFactory(game_data)
+    return _default_factory
+
+
+def _resolve(value, dic: Dict, kind: str):
+    """
+    CodeID 轉為資料物件 (已經是資料物件時直接使用)
+    """
+    if not isinstance(value, str):
+        return value
+    data = dic.get(value)
+    if data is None:
+        raise KeyError(f"找不到{kind}: {value}")
+    return data
+
+
+def create_battle_character(spec: BattleSpec, game_data: GameData = None, factory: CharacterFactory = None,
+                            default_name: str = "玩家") -> BattleCharacter:
+    """
+    依配置建立戰鬥角色 (效果欄/道具管理器/能力值總覽皆為記憶體內物件)
+    """
+    game_data = game_data or GameData.Instance
+    factory = factory or _get_factory(game_data)
+    items = [(_resolve(item, game_data.ItemsDic, "道具"), int(count)) for item, count in spec.items]
+
+    if spec.monster is not None:
+        monster = _resolve(spec.monster, game_data.MonstersDataDic, "怪物")
+        character = factory.create_monster_character(monster, itemList=items)
+        if spec.name is not None:
+            character.name = spec.name
+        return character
+
+    jobBonusData = game_data.JobBonusDic.get(spec.job)
+    if jobBonusData is None:
+        raise KeyError(f"找不到職業: {spec.job}")
+    return factory.create_character(
+        name=default_name if spec.name is None else spec.name,
+        race=spec.race,
+        jobBonusData=jobBonusData,
+        level=spec.level,
+        weapon_list=[(_resolve(weapon, game_data.WeaponsDic, "武器"), forge_lv) for weapon, forge_lv in spec.weapons],
+        armor_list=[(_resolve(armor, game_data.ArmorsDic, "防具"), forge_lv) for armor, forge_lv in spec.armors],
+        itemList=items,
+    )
+
+
+def run_battle(player_spec: BattleSpec, enemy_spec: BattleSpec, seed: Optional[int] = None,
+               train_ai: bool = False, game_data: GameData = None, factory: CharacterFactory = None,
+               log_verbosity: str = "full") -> BattleResult:
+    """
+    無介面執行一場快速戰鬥 (不需要 tkinter)
+
+    Args:
+        seed: 亂數種子 (戰鬥亂數與 torch 的 AI 權重初始化/動作抽樣) None時由全域 random 取得
+              torch 只在這場戰鬥內以種子固定 結束後還原全域的 torch 亂數狀態
+              結果的 seed 為實際使用的種子 再次傳入可重現同一場戰鬥
+        train_ai: 戰鬥結束後是否更新並儲存玩家的 PPO 模型
+        game_data: 遊戲資料 None時使用 GameData.Instance (尚未建立時讀取預設資料)
+        factory: 角色工廠 None時使用模組內的預設工廠
+        log_verbosity: 日誌詳細程度 (LogVerbosityLevels) 只需要勝負與統計時使用 none
+    """
+    game_data = game_data or GameData.Instance or GameData()
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    with torch.random.fork_rng(devices=[]):
+        torch.manual_seed(seed)
+        player = create_battle_character(player_spec, game_data, factory)
+        enemy = create_battle_character(enemy_spec, game_data, factory, default_name="敵對玩家")
+
+        simulator = BattleSimulator(game_data, train_ai=train_ai, log_verbosity=log_verbosity)
+        simulator.simulate_battle_fast(player, enemy, seed=seed)
+
+    return BattleResult(
+        player_won=player.is_alive(),
+        timed_out=simulator.timed_out,
+        duration=simulator.battle_time,
+        player_name=player.name,
+        enemy_name=enemy.name,
+        player_stats=dict(player.stats),
+        enemy_stats=dict(enemy.stats),
+        battle_log=simulator.battle_log,
+        damage_data=list(simulator.get_damage_data()),
+        player_damage=simulator.damage_totals["player"],
+        enemy_damage=simulator.damage_totals["enemy"],
+        player_skill_usage=dict(player.skill_usage),
+        enemy_skill_usage=dict(enemy.skill_usage),
+        seed=simulator.rng.seed,
+    )
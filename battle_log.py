@@ -0,0 +1,133 @@
+from typing import Any, Dict, List, Optional
+
+
+# 戰鬥日誌詳細程度 (依序增加)
+#   none: 不產生日誌與傷害紀錄 只保留勝負與計數
+#   summary: 只有戰鬥結果 (勝負、超時)
+#   damage: 戰鬥結果與傷害紀錄 (damage_data)
+#   full: 完整日誌
+LogVerbosityLevels = ("none", "summary", "damage", "full")
+
+
+class BattleLogRecord:
+    """
+    戰鬥事件紀錄
+    只保存事件資料 (類型、施放者、目標、技能、數值、時間) 需要顯示時才轉為 <color>/<size> 標記文字
+    戰鬥計算產生的紀錄不帶樣式 (style 為 None) 顏色與大小由 render_battlelog_event 依類型決定
+    """
+    __slots__ = ("log_type", "style", "value", "time", "caster_name", "target_name", "skill_name", "is_crt", "detail", "_text")
+
+    def __init__(self, log_type: str, style: Optional[Dict[str, Any]] = None, value=None, time: float = 0.0,
+                 caster_name: str = "", target_name: str = "", skill_name: Optional[str] = None,
+                 is_crt: bool = False, detail: Optional[str] = None):
+        self.log_type = log_type
+        self.style = style  # battlelog_text_processor 的輸入 (文字/顏色/大小)
+        self.value = value  # 原始數值 (傷害、回復量、秒數等)
+        self.time = time  # 事件時間 (秒)
+        self.caster_name = caster_name  # 施放者名稱
+        self.target_name = target_name  # 目標名稱
+        self.skill_name = skill_name  # 技能 (效果) 名稱的文字ID
+        self.is_crt = is_crt  # 是否暴擊
+        self.detail = detail  # 其他分類資料 (屬性傷害類型、回復的能力值)
+        self._text = None
+
+    @property
+    def caster(self) -> str:
+        if self.style is None:
+            return self.caster_name
+        return self.style.get("caster_text", "")
+
+    @property
+    def target(self) -> str:
+        if self.style is None:
+            return self.target_name
+        return self.style.get("target_text", "")
+
+    @property
+    def descript(self) -> Any:
+        """
+        說明 (技能名稱或回復量等)
+        """
+        if self.style is None:
+            return self.skill_name if self.skill_name is not None else self.value
+        return self.style.get("descript_text", "")
+
+    def render(self) -> Optional[str]:
+        """
+        轉為戰鬥日誌文字 (結果會保留 重複顯示時不再重新組字串)
+        """
+        if self._text is None:
+            from commonfunction import render_battlelog_event, render_battlelog_text
+            if self.style is None:
+                self._text = render_battlelog_event(self)
+            else:
+                self._text = render_battlelog_text(self.style, self.log_type, self.value)
+        return self._text
+
+    def __str__(self) -> str:
+        return str(self.render())
+
+    def __repr__(self) -> str:
+        return f"BattleLogRecord({self.log_type!r}, caster={self.caster!r}, value={self.value!r}, time={self.time})"
+
+
+class BattleLog(list):
+    """
+    戰鬥日誌 依序存放 BattleLogRecord 與一般文字
+    加入紀錄時以 time 標記事件時間 (由戰鬥模擬更新)
+    詳細程度不是 full 時 append 不保存任何事件 戰鬥結果以 append_summary 加入
+    """
+    __slots__ = ("time", "_verbosity")
+
+    def __init__(self, *args, verbosity: str = "full"):
+        super().__init__(*args)
+        self.time = 0.0
+        self.verbosity = verbosity
+
+    @property
+    def verbosity(self) -> str:
+        return self._verbosity
+
+    @verbosity.setter
+    def verbosity(self, value: str):
+        if value not in LogVerbosityLevels:
+            raise ValueError(f"未知的日誌詳細程度: {value}")
+        self._verbosity = value
+
+    @property
+    def keeps_events(self) -> bool:
+        return self._verbosity == "full"
+
+    @property
+    def keeps_damage(self) -> bool:
+        return self._verbosity in ("damage", "full")
+
+    def append(self, record):
+        if self._verbosity != "full":
+            return
+        if isinstance(record, BattleLogRecord):
+            record.time = self.time
+        super().append(record)
+
+    def append_summary(self, text: str):
+        """
+        加入戰鬥結果 (詳細程度 none 以外都保存)
+        """
+        if self._verbosity != "none":
+            super().append(text)
+
+    def clear(self):
+        super().clear()
+        self.time = 0.0
+
+    def records(self, log_type: str = None) -> List[BattleLogRecord]:
+        """
+        取得事件紀錄 (可指定類型)
+        """
+        return [x for x in self if isinstance(x, BattleLogRecord) and (log_type is None or x.log_type == log_type)]
+
+    def render(self) -> List[Optional[str]]:
+        """
+        轉為介面顯示用的文字列表
+        """
+        return [x.render() if isinstance(x, BattleLogRecord) else x for x in self]
@@ -0,0 +1,62 @@
+import random
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+# 每次向 numpy Generator 取得的亂數數量
+RandomBlockSize = 1024
+
+
+class BattleRandom:
+    """
+    單場戰鬥的亂數產生器
+    以 numpy Generator 一次產生一批 [0, 1) 亂數再逐一取用 (比每次呼叫 random 模組便宜)
+    每場戰鬥各自擁有 結果只由種子決定 可以安全地平行執行
+    """
+    __slots__ = ("seed", "generator", "_buffer", "_index")
+
+    def __init__(self, seed: Optional[int] = None):
+        # 沒有指定種子時由全域 random 取得 (呼叫端以 random.seed 固定時結果仍可重現)
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.generator = np.random.default_rng(self.seed)
+        self._buffer = []
+        self._index = 0
+
+    def random(self) -> float:
+        """
+        [0, 1) 的亂數
+        """
+        if self._index >= len(self._buffer):
+            self._buffer = self.generator.random(RandomBlockSize).tolist()
+            self._index = 0
+        value = self._buffer[self._index]
+        self._index += 1
+        return value
+
+    def randint(self, a: int, b: int) -> int:
+        """
+        [a, b] 的整數 (與 random.randint 相同包含兩端)
+        """
+        return a + int(self.random() * (b - a + 1))
+
+    def uniform(self, a: float, b: float) -> float:
+        return a + (b - a) * self.random()
+
+    def choice_index(self, weights: Sequence[float]) -> int:
+        """
+        依權重選擇索引 (權重為0的索引不會被選到)
+        """
+        total = sum(weights)
+        point = self.random() * total
+        cumulative = 0.0
+        last = 0
+        for i, weight in enumerate(weights):
+            if weight <= 0:
+                continue
+            cumulative += weight
+            last = i
+            if point < cumulative:
+                return i
+        # 浮點數累加誤差 落在最後一個有權重的索引
+        return last
@@ -1,22 +1,229 @@
-﻿import random
-import heapq
-from typing import Dict, Optional, List
-from dataclasses import dataclass, field,fields
+﻿import heapq
+from collections.abc import MutableMapping
+import itertools
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, List, Set
+from dataclasses import dataclass, field
 from game_models import GameData, ItemsDic, SkillData, SkillOperationData, MonsterDataModel, MonsterDropItemDataModel, \
     ArmorDataModel, WeaponDataModel, ItemDataModel, JobBonusDataModel, StatusFormulaDataModel, GameText, \
     GameSettingDataModel, AreaData, LvAndExpDataModel,ItemEffectData
-from formula_parser import FormulaParser
 from typing import Tuple
-from commonfunction import clamp, battlelog_text_processor, get_text, get_time_stap
+from commonfunction import clamp, battlelog_event, get_text
 from skill_processor import (_execute_skill_operation, execute_item_operation,
     status_skill_effect_end, skill_all_condition_process, skill_condition_process,
     skill_continuancebuff_bonus_processor)
-from status_operation import StatusValues
+from status_operation import StatusVector, StatusFieldNames, StatusIndex, to_status_vector
 from AICombatAction import ai_action
 from commontool import Event
+from battle_log import BattleLog
+from battle_random import BattleRandom
+from dummy_gui import DummyStatusEffectBar, DummyCharacterOverview, DummyItemManager
 import os
 
 
+_HP_INDEX = StatusIndex["HP"]
+_MP_INDEX = StatusIndex["MP"]
+
+FastBattleTickTime = 0.1  # 快速戰鬥 tick 間隔 (秒)
+FastBattleMaxTime = 300.0  # 快速戰鬥時間上限 (秒) 防止無限戰鬥
+
+
+#region 計時器數值序列 (快速戰鬥跳過閒置 tick 用)
+# 逐 tick 遞減/累加的浮點數誤差會累積 直接以 value - n * dt 計算可能差一個 tick
+# 因此記錄逐 tick 計算的完整數值序列 序列中任一數值之後的變化都相同 以數值為鍵共用
+_countdown_cache: Dict[Tuple[float, float], Tuple[List[float], int]] = {}
+_accumulate_cache: Dict[Tuple[float, float, float], Tuple[List[float], int]] = {}
+
+
+def _countdown(value: float, dt: float) -> Tuple[List[float], int]:
+    """
+    倒數計時 (每個 tick value = max(0, value - dt)) 到0為止的數值序列
+
+    Returns:
+        (數值序列, value在序列中的位置)
+    """
+    found = _countdown_cache.get((value, dt))
+    if found is None:
+        chain = [value]
+        while value > 0:
+            value = max(0, value - dt)
+            chain.append(value)
+        for i, v in enumerate(chain):
+            _countdown_cache.setdefault((v, dt), (chain, i))
+        found = _countdown_cache[(chain[0], dt)]
+    return found
+
+
+def _countdown_ticks(value: float, dt: float) -> int:
+    """
+    倒數計時在第幾個 tick 歸0 (已經小於等於0時為下一個 tick)
+    """
+    chain, i = _countdown(value, dt)
+    return max(1, len(chain) - 1 - i)
+
+
+def _accumulate(value: float, limit: float, dt: float) -> Tuple[List[float], int]:
+    """
+    累加計時 (每個 tick 未達 limit 時 value += dt) 到達 limit 為止的數值序列
+    到達後的下一個 tick 觸發並歸0
+
+    Returns:
+        (數值序列, value在序列中的位置)
+    """
+    found = _accumulate_cache.get((value, limit, dt))
+    if found is None:
+        chain = [value]
+        while value < limit:
+            value += dt
+            chain.append(value)
+        for i, v in enumerate(chain):
+            _accumulate_cache.setdefault((v, limit, dt), (chain, i))
+        found = _accumulate_cache[(chain[0], limit, dt)]
+    return found
+
+
+def _accumulate_ticks(value: float, limit: float, dt: float) -> int:
+    """
+    累加計時在第幾個 tick 觸發
+    """
+    chain, i = _accumulate(value, limit, dt)
+    return len(chain) - i
+
+
+def _skip_accumulate(value: float, limit: float, dt: float, count: int) -> float:
+    """
+    累加計時經過 count 個 tick 後的數值 (途中觸發時從0重新累加 只用於觸發沒有效果的計時)
+    """
+    chain, i = _accumulate(value, limit, dt)
+    if count < len(chain) - i:
+        return chain[i + count]
+    count -= len(chain) - i
+    cycle, _ = _accumulate(0, limit, dt)
+    return cycle[count % len(cycle)]
+#endregion
+
+
+#region 到期計時器 (冷卻與效果)
+class TimerDict(MutableMapping):
+    """
+    以到期 tick 為鍵的計時字典 (最小堆積)
+    只記錄設定時的數值與到期 tick 經過 tick 時不改寫任何數值 剩餘時間在讀取時由逐 tick 遞減的數值序列推得
+    (與每 tick value = max(0, value - dt) 的結果完全相同)
+
+    with_data=False: 值為剩餘時間 (技能/道具冷卻) 小於等於0的冷卻不會遞減 一直留在字典中
+    with_data=True: 值為 (資料, 剩餘時間) (Buff/負面狀態) 小於等於0時下一個 tick 到期
+    迭代順序與一般字典相同 (依第一次加入的順序) 同一個 tick 到期的項目也依此順序取出
+    source: 由資料取得來源ID (技能ID/道具ID/狀態名稱) 的方法 指定時以來源ID建立索引 (鍵為效果 handle)
+    """
+    __slots__ = ("with_data", "dt", "tick", "source", "_entries", "_heap", "_counter", "_by_source")
+
+    def __init__(self, with_data: bool = False, dt: float = FastBattleTickTime, source: Callable[[Any], str] = None):
+        self.with_data = with_data
+        self.dt = dt
+        self.tick = 0  # 已經過的 tick 數
+        self.source = source
+        self._entries: Dict[Any, list] = {}  # key -> [資料, 設定時的數值, 設定時的 tick, 到期 tick, 加入順序, 版本]
+        self._heap: List[Tuple[int, int, int, Any]] = []  # (到期 tick, 加入順序, 版本, key) 覆寫或刪除後的舊項目取出時略過
+        self._counter = 0
+        self._by_source: Dict[str, Dict[Any, None]] = {}  # 來源ID -> 作用中的 key (依加入順序)
+
+    def _remaining(self, entry: list) -> float:
+        value = entry[1]
+        elapsed = self.tick - entry[2]
+        if elapsed <= 0 or value <= 0:
+            return value
+        chain, i = _countdown(value, self.dt)
+        return chain[min(i + elapsed, len(chain) - 1)]
+
+    def __getitem__(self, key):
+        entry = self._entries[key]
+        return (entry[0], self._remaining(entry)) if self.with_data else self._remaining(entry)
+
+    def __setitem__(self, key, value):
+        data, remaining = value if self.with_data else (None, value)
+        old = self._entries.get(key)
+        self._counter += 1
+        order = old[4] if old is not None else self._counter
+        if remaining <= 0 and not self.with_data:
+            expire = None
+        else:
+            expire = self.tick + _countdown_ticks(remaining, self.dt)
+            heapq.heappush(self._heap, (expire, order, self._counter, key))
+        self._entries[key] = [data, remaining, self.tick, expire, order, self._counter]
+        if old is None and self.source is not None:
+            self._by_source.setdefault(self.source(data), {})[key] = None
+
+    def __delitem__(self, key):
+        entry = self._entries.pop(key)
+        if self.source is not None:
+            source_id = self.source(entry[0])
+            keys = self._by_source[source_id]
+            del keys[key]
+            if not keys:
+                del self._by_source[source_id]
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"TimerDict({dict(self.items())!r})"
+
+    def has_source(self, source_id: str) -> bool:
+        """
+        是否有來源ID相同的項目作用中
+        """
+        return source_id in self._by_source
+
+    def keys_of(self, source_id: str) -> List[Any]:
+        """
+        取得來源ID相同的所有 key (依加入順序)
+        """
+        return list(self._by_source.get(source_id, ()))
+
+    def first_of(self, source_id: str) -> Optional[Any]:
+        """
+        取得來源ID相同的第一個 key 沒有時回傳None
+        """
+        keys = self._by_source.get(source_id)
+        return next(iter(keys)) if keys else None
+
+    def _valid(self, item) -> bool:
+        entry = self._entries.get(item[3])
+        return entry is not None and entry[5] == item[2]
+
+    def advance(self, count: int = 1):
+        """
+        經過 count 個 tick (到期的項目以 pop_expired 取出)
+        """
+        self.tick += count
+
+    def pop_expired(self) -> Optional[str]:
+        """
+        取出一個已到期的項目 (項目仍在字典中 由呼叫端處理後刪除) 沒有時回傳None
+        """
+        heap = self._heap
+        while heap and heap[0][0] <= self.tick:
+            item = heapq.heappop(heap)
+            if self._valid(item):
+                return item[3]
+        return None
+
+    def next_expiry(self) -> Optional[int]:
+        """
+        之後第幾個 tick 有項目到期 沒有會到期的項目時回傳None
+        """
+        heap = self._heap
+        while heap and not self._valid(heap[0]):
+            heapq.heappop(heap)
+        return heap[0][0] - self.tick if heap else None
+#endregion
+
+
 @dataclass
 class BattleCharacter:
     #基本資料
@@ -24,10 +231,10 @@ class BattleCharacter:
     jobBonusData: JobBonusDataModel
     ai_id: str
     level: int
-    stats: Dict[str, int]
-    basal: StatusValues  #基本屬性數值
-    equip: StatusValues  #裝備數值
-    effect: StatusValues  #效果影響數值
+    stats: StatusVector  #總能力值 (可傳入 dict 建立後轉為能力值向量)
+    basal: Optional[StatusVector]  #基本屬性數值
+    equip: Optional[StatusVector]  #裝備數值
+    effect: Optional[StatusVector]  #效果影響數值
     equipped_weapon: Optional[WeaponDataModel]
     equipped_armor: Optional[ArmorDataModel]
     skills: List[SkillData]
@@ -46,11 +253,13 @@ class BattleCharacter:
     character_overview: Optional[object] = None  # 角色能力值總覽
 
     #動態資料
-    skill_cooldowns: Dict[str, float] = field(default_factory=dict)  # skill_id -> remaining_cooldown_time
-    item_cooldowns: Dict[str, float] = field(default_factory=dict)  # item_id -> remaining_cooldown_time
-    buff_skill: Dict[str, Tuple[SkillData, float]] = field(default_factory=dict)  #運行中的buff效果
-    buff_item: Dict[str, Tuple[ItemDataModel, float]] = field(default_factory=dict)  #運行中的buff效果
-    debuff_skill: Dict[str, Tuple[SkillOperationData, float]] = field(default_factory=dict)  #運行中的負面狀態
+    skill_cooldowns: TimerDict = field(default_factory=TimerDict)  # skill_id -> remaining_cooldown_time
+    item_cooldowns: TimerDict = field(default_factory=TimerDict)  # item_id -> remaining_cooldown_time
+    buff_skill: TimerDict = field(default_factory=lambda: TimerDict(with_data=True, source=lambda skill: skill.SkillID))  #運行中的buff效果 handle -> (SkillData, 剩餘時間)
+    buff_item: TimerDict = field(default_factory=lambda: TimerDict(with_data=True, source=lambda item: item.CodeID))  #運行中的buff效果 handle -> (ItemDataModel, 剩餘時間)
+    debuff_skill: TimerDict = field(default_factory=lambda: TimerDict(with_data=True, source=lambda op: op.InfluenceStatus))  #運行中的負面狀態 handle -> (SkillOperationData, 剩餘時間)
+    effect_handles: Iterator[int] = field(default_factory=lambda: itertools.count(1), init=False, repr=False)  #持續效果 handle 產生器 (遞增整數 效果欄與效果字典共用)
+    persistent_buff_handles: Dict[str, int] = field(default_factory=dict, init=False, repr=False)  #常駐buff (沒有Bonus) 技能ID -> handle 與同技能的Bonus效果分開
     controlled_for_attack: float = 0.0  #受到控制不得使用普通攻擊類型
     controlled_for_skill: float = 0.0  #受到控制不得使用技能類型
     attackTimerFunc = None  #儲存普攻計時任務
@@ -67,8 +276,31 @@ class BattleCharacter:
     upgrade_skill_dict:Dict[str,SkillData] = field(default_factory=dict)    #存放所選職業的技能內有升級技能的字典
     enhance_skill_dict:Dict[str,SkillData] = field(default_factory=dict)    #存放所選職業的技能內有強化技能的字典
     inherit_damage_skill_dict:Dict[str,SkillData] = field(default_factory=dict)    #存放所選職業的技能內有繼承技能傷害的字典
+    dirty_stats: Set[int] = field(default_factory=set, init=False, repr=False)  #效果有變動 尚未重算的能力值索引
+    rng: Optional[BattleRandom] = None  #戰鬥亂數產生器 (戰鬥開始時由 BattleSimulator 指定 雙方共用)
 
     def __post_init__(self):
+        # 能力值統一轉為固定欄位的能力值向量
+        self.stats = to_status_vector(self.stats)
+        self.basal = to_status_vector(self.basal)
+        self.equip = to_status_vector(self.equip)
+        self.effect = to_status_vector(self.effect)
+        # 初始能力值尚未加上效果數值 第一次重算時全部重算
+        self.dirty_stats = set(range(len(StatusFieldNames)))
+        # 沒有傳入介面物件時 (無介面執行) 使用記憶體內的效果欄與道具管理器
+        if self.buff_bar is None:
+            self.buff_bar = DummyStatusEffectBar()
+        if self.debuff_bar is None:
+            self.debuff_bar = DummyStatusEffectBar()
+        if self.passive_bar is None:
+            self.passive_bar = DummyStatusEffectBar()
+        if self.item_manager is None:
+            self.item_manager = DummyItemManager(
+                {item.CodeID: {"count": count, "data": item} for item, count in self.items})
+        if self.character_overview is None:
+            self.character_overview = DummyCharacterOverview()
+        if self.rng is None:
+            self.rng = BattleRandom()
         # 在物件建立後，才初始化 AI
         self.ai = ai_action(self.ai_id, self)
 
@@ -77,63 +309,53 @@ class BattleCharacter:
         攻擊指令許可確定
         """
         if (skill.Name == "普通攻擊"):
-            return self.stats["HP"] > 0 and self.controlled_for_attack <= 0
+            return self.stats.values[_HP_INDEX] > 0 and self.controlled_for_attack <= 0
         else:
-            return self.stats["HP"] > 0 and self.controlled_for_skill <= 0
+            return self.stats.values[_HP_INDEX] > 0 and self.controlled_for_skill <= 0
 
     def is_alive(self) -> bool:
-        return self.stats["HP"] > 0
-
-    def pass_time(self, dt: float):
-        """
-        獨立計時器
-        """
-
-        # 技能冷卻遞減
-        for skill_id in list(self.skill_cooldowns):
-            if self.skill_cooldowns[skill_id] > 0:
-                self.skill_cooldowns[skill_id] = max(0, self.skill_cooldowns[skill_id] - dt)
-                if self.skill_cooldowns[skill_id] == 0:
-                    del self.skill_cooldowns[skill_id]
-        for item_id in list(self.item_cooldowns):
-            if self.item_cooldowns[item_id] > 0:
-                self.item_cooldowns[item_id] = max(0, self.item_cooldowns[item_id] - dt)
-                if self.item_cooldowns[item_id] == 0:
-                    del self.item_cooldowns[item_id]
-
-        #技能Buff時間遞減
-        for buff_skill_id in list(self.buff_skill):
-            skillData, skillDuration = self.buff_skill[buff_skill_id]
-            skillDuration = max(0, skillDuration - dt)
-            self.buff_skill[buff_skill_id] = (skillData, skillDuration)
-            if (skillDuration == 0):
-                stack = clamp(self.buff_bar.get_effect_stack(buff_skill_id),1,self.buff_bar.get_effect_stack(buff_skill_id))
-                for op in skillData.SkillOperationDataList:
-                    self.SkillEffectStatusOperation(op.InfluenceStatus, (op.AddType == "Rate"),
-                                                    -1 * op.EffectValue * stack)
-                self.buff_skill.pop(buff_skill_id, None)
-                self.buff_bar.remove_effect(buff_skill_id)
-        for buff_item_id in list(self.buff_item):
-            itemData, itemDuration = self.buff_item[buff_item_id]
-            itemDuration = max(0, itemDuration - dt)
-            self.buff_item[buff_item_id] = (itemData, itemDuration)
-            if (itemDuration == 0):
-                stack = self.buff_bar.get_effect_stack(buff_item_id)
-                for op in itemData.ItemEffectDataList:
-                    self.SkillEffectStatusOperation(op.InfluenceStatus, (op.AddType == "Rate"),
-                                                    -1 * op.EffectValue * stack)
-                self.buff_item.pop(buff_item_id, None)
-                self.buff_bar.remove_effect(buff_item_id)
-        #負面狀態遞減
-        for debuff_id in list(self.debuff_skill):
-            op, debuffDuration = self.debuff_skill[debuff_id]
-            debuffDuration = max(0, debuffDuration - dt)
-            self.debuff_skill[debuff_id] = (op, debuffDuration)
-            if (debuffDuration == 0):
-                log, dmg, cd = status_skill_effect_end(op, self)
-                self.battle_log.append(log)
-                del self.debuff_skill[debuff_id]
-                self.debuff_bar.remove_effect(debuff_id)
+        return self.stats.values[_HP_INDEX] > 0
+
+    def pass_time(self):
+        """
+        獨立計時器 每次呼叫前進一個 tick (FastBattleTickTime 秒)
+        """
+        dt = FastBattleTickTime
+
+        # 冷卻與效果只在到期時處理 (剩餘時間讀取時才計算)
+        for timers in (self.skill_cooldowns, self.item_cooldowns, self.buff_skill, self.buff_item, self.debuff_skill):
+            timers.advance()
+
+        # 技能冷卻結束
+        while (skill_id := self.skill_cooldowns.pop_expired()) is not None:
+            del self.skill_cooldowns[skill_id]
+        while (item_id := self.item_cooldowns.pop_expired()) is not None:
+            del self.item_cooldowns[item_id]
+
+        #技能Buff結束
+        while (buff_skill_id := self.buff_skill.pop_expired()) is not None:
+            skillData, _ = self.buff_skill[buff_skill_id]
+            stack = clamp(self.buff_bar.get_effect_stack(buff_skill_id),1,self.buff_bar.get_effect_stack(buff_skill_id))
+            for op in skillData.SkillOperationDataList:
+                self.SkillEffectStatusOperation(op.InfluenceStatus, (op.AddType == "Rate"),
+                                                -1 * op.EffectValue * stack)
+            self.buff_skill.pop(buff_skill_id, None)
+            self.buff_bar.remove_effect(buff_skill_id)
+        while (buff_item_id := self.buff_item.pop_expired()) is not None:
+            itemData, _ = self.buff_item[buff_item_id]
+            stack = self.buff_bar.get_effect_stack(buff_item_id)
+            for op in itemData.ItemEffectDataList:
+                self.SkillEffectStatusOperation(op.InfluenceStatus, (op.AddType == "Rate"),
+                                                -1 * op.EffectValue * stack)
+            self.buff_item.pop(buff_item_id, None)
+            self.buff_bar.remove_effect(buff_item_id)
+        #負面狀態結束
+        while (debuff_id := self.debuff_skill.pop_expired()) is not None:
+            op, _ = self.debuff_skill[debuff_id]
+            log, dmg, cd = status_skill_effect_end(op, self)
+            self.battle_log.append(log)
+            del self.debuff_skill[debuff_id]
+            self.debuff_bar.remove_effect(debuff_id)
 
         # 血量自然恢復計時
         if ("HP_Recovery" in self.stats):
@@ -144,12 +366,8 @@ class BattleCharacter:
                 self.stats["HP"] = clamp(self.stats["HP"] + self.stats["HP_Recovery"], 0,
                                                         self.stats["MaxHP"])
                 self.update_hp_mp()
-                self.battle_log.append(battlelog_text_processor({
-                    "caster_text": self.name,
-                    "caster_color": "#00ffdc",
-                    "descript_text": self.stats["HP_Recovery"],
-                    "descript_color": "#ff0000",
-                }, "naturalHpRecovery"))
+                if self.logs_events:
+                    self.battle_log.append(battlelog_event("naturalHpRecovery", self.name, value=self.stats["HP_Recovery"]))
 
         # 魔力自然恢復計時
         if ("MP_Recovery" in self.stats):
@@ -160,12 +378,8 @@ class BattleCharacter:
                 self.stats["MP"] = clamp(self.stats["MP"] + self.stats["MP_Recovery"], 0,
                                                         self.stats["MaxMP"])
                 self.update_hp_mp()
-                self.battle_log.append(battlelog_text_processor({
-                    "caster_text": self.name,
-                    "caster_color": "#00ffdc",
-                    "descript_text": self.stats["MP_Recovery"],
-                    "descript_color": "#ff0000",
-                }, "naturalMpRecovery"))
+                if self.logs_events:
+                    self.battle_log.append(battlelog_event("naturalMpRecovery", self.name, value=self.stats["MP_Recovery"]))
 
         #持續疊加的Buff
         if (self.additive_buff_time < 0.25):
@@ -190,6 +404,52 @@ class BattleCharacter:
             self.subscription_skill_time = 0
             self.subscription_skill_event()
 
+    def idle_ticks(self, dt: float) -> int:
+        """
+        之後第幾個 tick 的 pass_time 會產生效果 (冷卻結束、效果結束、自然恢復、疊加/訂閱事件)
+        在這之前的 tick 只有計時數值變化 可以用 skip_ticks 一次跳過
+        """
+        ticks = []
+        for timers in (self.skill_cooldowns, self.item_cooldowns, self.buff_skill, self.buff_item, self.debuff_skill):
+            expiry = timers.next_expiry()
+            if expiry is not None:
+                ticks.append(expiry)
+
+        settings = GameData.Instance.GameSettingDic
+        if "HP_Recovery" in self.stats:
+            ticks.append(_accumulate_ticks(self.hp_recovery_time, settings["HpRecoverySec"].GameSettingValue, dt))
+        if "MP_Recovery" in self.stats:
+            ticks.append(_accumulate_ticks(self.mp_recovery_time, settings["MpRecoverySec"].GameSettingValue, dt))
+        # 沒有訂閱者的事件觸發時沒有效果
+        if self.additive_buff_event.has_subscribers():
+            ticks.append(_accumulate_ticks(self.additive_buff_time, 0.25, dt))
+        if self.additive_debuff_event.has_subscribers():
+            ticks.append(_accumulate_ticks(self.additive_debuff_time, 0.25, dt))
+        if self.subscription_skill_event.has_subscribers():
+            ticks.append(_accumulate_ticks(self.subscription_skill_time, 1, dt))
+        return min(ticks)
+
+    def skip_ticks(self, count: int, dt: float):
+        """
+        跳過 count 個沒有效果的 tick (count 必須小於 idle_ticks)
+        計時數值與逐 tick 呼叫 pass_time 的結果完全相同
+        """
+        if count <= 0:
+            return
+        for timers in (self.skill_cooldowns, self.item_cooldowns, self.buff_skill, self.buff_item, self.debuff_skill):
+            timers.advance(count)
+
+        settings = GameData.Instance.GameSettingDic
+        if "HP_Recovery" in self.stats:
+            self.hp_recovery_time = _skip_accumulate(
+                self.hp_recovery_time, settings["HpRecoverySec"].GameSettingValue, dt, count)
+        if "MP_Recovery" in self.stats:
+            self.mp_recovery_time = _skip_accumulate(
+                self.mp_recovery_time, settings["MpRecoverySec"].GameSettingValue, dt, count)
+        self.additive_buff_time = _skip_accumulate(self.additive_buff_time, 0.25, dt, count)
+        self.additive_debuff_time = _skip_accumulate(self.additive_debuff_time, 0.25, dt, count)
+        self.subscription_skill_time = _skip_accumulate(self.subscription_skill_time, 1, dt, count)
+
     def use_item_id(self, itemid) -> Tuple[str, int, float]:
         for idx, (item, count) in enumerate(self.items):
             if count > 0 and item.CodeID not in self.item_cooldowns and itemid == item.CodeID:
@@ -224,6 +484,19 @@ class BattleCharacter:
                         log = temp[0]
                         self.battle_log.append(log)
 
+    @property
+    def logs_events(self) -> bool:
+        """
+        是否產生戰鬥事件紀錄 (戰鬥日誌詳細程度不是 full 時 不建立任何紀錄)
+        """
+        return self.battle_log is None or self.battle_log.keeps_events
+
+    def new_effect_handle(self) -> int:
+        """
+        取得新的持續效果 handle (作為效果字典與效果欄的鍵)
+        """
+        return next(self.effect_handles)
+
     def add_skill_buff_effect(self, skillData: SkillData, op) -> int:
         """
         增加技能buff效果
@@ -238,7 +511,7 @@ class BattleCharacter:
             temp = skill_continuancebuff_bonus_processor(self,op)
             match(temp):
                 case int():
-                    temp_id = get_time_stap(skillData.SkillID)
+                    temp_id = self.new_effect_handle()
                     self.SkillEffectStatusOperation(op.InfluenceStatus, (op.AddType == "Rate"), op.EffectValue*temp)
                     #疊層最大值
                     max = int(next(
@@ -263,30 +536,34 @@ class BattleCharacter:
                         #先做條件檢查
                         if(skill_condition_process(self,subscriptionSkillOp)):
                             #檢查buff技能是否再做用中
-                            subscriptionSkillId = next((x for x in self.buff_skill.keys() if x == temp_id), None)
                             #若正再做用 刷新時間
-                            if subscriptionSkillId is not None:
-                                self.buff_skill[subscriptionSkillId] = (skillData, subscriptionSkillOp.EffectDurationTime)
+                            if temp_id in self.buff_skill:
+                                self.buff_skill[temp_id] = (skillData, subscriptionSkillOp.EffectDurationTime)
                             #若未再做用 開始作用
                             else:
                                 self.SkillEffectStatusOperation(subscriptionSkillOp.InfluenceStatus, (subscriptionSkillOp.AddType == "Rate"), subscriptionSkillOp.EffectValue)
                                 self.buff_bar.add_skill_effect(temp_id, skillData)
                                 self.buff_skill[temp_id] = (skillData, subscriptionSkillOp.EffectDurationTime)
 
-                    temp_id = get_time_stap(skillData.SkillID)
+                    temp_id = self.new_effect_handle()
                     self.subscription_skill_event += lambda: SubscriptionSkillEffect(op,temp_id)
 
                     return 0
 
                 case _:
-                    temp_id = get_time_stap(skillData.SkillID)
+                    temp_id = self.new_effect_handle()
                     self.SkillEffectStatusOperation(op.InfluenceStatus, (op.AddType == "Rate"), op.EffectValue)
 
             self.buff_bar.add_skill_effect(temp_id, skillData,temp)
             self.buff_skill[temp_id] = (skillData, op.EffectDurationTime)
         else:
-            self.buff_bar.add_skill_effect(skillData.SkillID, skillData)
-            self.buff_skill[skillData.SkillID] = (skillData, op.EffectDurationTime)
+            #同技能的常駐buff共用同一個 handle (再次施放時刷新時間) 已結束時取新的 handle
+            temp_id = self.persistent_buff_handles.get(skillData.SkillID)
+            if temp_id not in self.buff_skill:
+                temp_id = self.new_effect_handle()
+                self.persistent_buff_handles[skillData.SkillID] = temp_id
+            self.buff_bar.add_skill_effect(temp_id, skillData)
+            self.buff_skill[temp_id] = (skillData, op.EffectDurationTime)
             self.SkillEffectStatusOperation(op.InfluenceStatus, (op.AddType == "Rate"), op.EffectValue)
             #一般常駐buff 獎勵為5
             if(skillData.CD == 1):
@@ -297,7 +574,7 @@ class BattleCharacter:
         """
         增加被動技能效果
         """
-        temp_id = get_time_stap(skillData.SkillID)
+        temp_id = self.new_effect_handle()
         self.SkillEffectStatusOperation(op.InfluenceStatus, (op.AddType == "Rate"), op.EffectValue)
         # 效果欄增加資料
         self.passive_bar.add_skill_effect(temp_id, skillData)
@@ -313,7 +590,7 @@ class BattleCharacter:
         is_rate = (op.AddType == "Rate")
 
         # 找出目前所有同技能 ID 的 buff
-        existing_keys = [k for k in self.buff_skill if k.startswith(skill_id)]
+        existing_keys = self.buff_skill.keys_of(skill_id)
 
         # 如果已存在同技能效果
         if existing_keys:
@@ -330,7 +607,7 @@ class BattleCharacter:
 
         else:
             # 新的 buff 加入 buff bar 並生成唯一 key
-            key = get_time_stap(skill_id)
+            key = self.new_effect_handle()
             self.buff_skill[key] = (skillData, duration)
             self.passive_bar.add_skill_effect(key, skillData, stackCount)
 
@@ -351,7 +628,7 @@ class BattleCharacter:
         is_rate = (op.AddType == "Rate")
 
         # 找出目前所有同技能 ID 的 buff
-        existing_keys = [k for k in self.buff_skill if k.startswith(skill_id)]
+        existing_keys = self.buff_skill.keys_of(skill_id)
 
         # 如果已存在同技能效果
         if existing_keys:
@@ -375,7 +652,7 @@ class BattleCharacter:
         """
         增加道具buff效果
         """
-        temp_id = get_time_stap(itemData.CodeID)
+        temp_id = self.new_effect_handle()
         self.SkillEffectStatusOperation(op.InfluenceStatus, (op.AddType == "Rate"), op.EffectValue)
 
         self.buff_bar.add_item_effect(temp_id, itemData)
@@ -385,7 +662,7 @@ class BattleCharacter:
         """
         增加負面效果(含 控制狀態)
         """
-        temp_id = get_time_stap(op.InfluenceStatus)
+        temp_id = self.new_effect_handle()
         self.debuff_bar.add_debuff(temp_id, op.InfluenceStatus)
         self.debuff_skill[temp_id] = op, op.EffectDurationTime
 
@@ -428,16 +705,9 @@ class BattleCharacter:
 
 
         self.update_hp_mp()
-        color_code = "#2945FF" if op.InfluenceStatus == "MP" else "#ff0000";
-        recovery_type = "魔力" if op.InfluenceStatus == "MP" else "血量";
-        return battlelog_text_processor({
-            "caster_text": caster.name,
-            "caster_color": "#00ffdc",
-            "descript_text": get_text(effectName),
-            "descript_color": "#ff9300",
-            "target_text": target.name,
-            "target_color": "#83ff00",
-        }, "effectRecovery", f"<color={color_code}>{logRecoveryText} {recovery_type} </color>"), op.EffectValue, 0
+        log = battlelog_event("effectRecovery", caster.name, target.name, effectName, logRecoveryText,
+                              detail=op.InfluenceStatus) if self.logs_events else None
+        return log, op.EffectValue, 0
 
     #region 戰鬥數值 計算
 
@@ -465,33 +735,23 @@ class BattleCharacter:
         # 命中率 四捨五入取整數
         hit_value = round(selfHit * 100 / max(1, selfHit + target.stats["Avoid"]))
         # 命中判定  0～100 隨機
-        is_hit = random.randint(0, 100)
+        is_hit = self.rng.randint(0, 100)
 
         if is_hit <= hit_value:
             return self.BlockCalculator(skill, target)
         else:
-            missResult = battlelog_text_processor({
-                "caster_text": self.name,
-                "caster_color": "#636363",
-                "caster_size": 12,
-                "descript_text": get_text(skill.Name),
-                "descript_color": "#ff9300",
-            }, "miss"), 0, self.attackTimer
+            log = battlelog_event("miss", self.name, skill=skill.Name) if self.logs_events else None
+            missResult = log, 0, self.attackTimer
             return [missResult]
 
     def BlockCalculator(self, skill: SkillData, target):
         """
         格檔計算
         """
-        is_block = random.randint(0, 100)
+        is_block = self.rng.randint(0, 100)
         if (is_block <= target.stats["BlockRate"]):
-            blockResult = battlelog_text_processor({
-                "caster_text": self.name,
-                "caster_color": "#636363",
-                "caster_size": 12,
-                "descript_text": get_text(skill.Name),
-                "descript_color": "#ff9300",
-            }, "block"), 0, self.attackTimer
+            log = battlelog_event("block", self.name, skill=skill.Name) if self.logs_events else None
+            blockResult = log, 0, self.attackTimer
             return [blockResult]
         else:
             return self.CrtCalculator(skill, target)
@@ -504,7 +764,7 @@ class BattleCharacter:
         crt_value = self.stats["Crt"]*(self.stats["Crt"] / max(1, self.stats["Crt"] + target.stats["CrtResistance"]))
         #print(f'>>暴擊率:{self.stats["Crt"] } 暴擊抵抗:{target.stats["CrtResistance"]}')
 
-        is_Crt = random.randint(0, 100)
+        is_Crt = self.rng.randint(0, 100)
         #print(f'暴擊率:{crt_value} 暴擊隨機值:{is_Crt}')
 
         #暴擊判定
@@ -549,17 +809,15 @@ class BattleCharacter:
         returnResult = []
 
         # 實現技能效果
-        parser = FormulaParser()
         variables = {
             "attacker_attack": selfATK,  #攻擊者的攻擊力
             "target_defense": targetDEF,  #受攻擊者防禦
             "skill_power": skill.Damage,  #傷害倍率
             "attacker_level": self.level,  #攻擊者等級
             "target_level": target.level,  #受攻擊者等級
-            "random_factor": random.uniform(0.85, 1.15),
+            "random_factor": self.rng.uniform(0.85, 1.15),
             "base_damage": skill.Damage
         }
-        parser.set_variables(variables)
 
         #計算防禦減免
         defenseRatio = clamp(variables["target_defense"] / (variables["target_defense"] + 9), 0.1, 0.75)
@@ -579,17 +837,9 @@ class BattleCharacter:
         finalDamage = self.BonusDamageCalulator(finalDamage, target)
         target.stats["HP"] -= finalDamage
 
-        color_code = f'<color=#ffd600><size=13><b>{finalDamage}</size></color></b>' if is_Crt else f'<color=#ff0000><size=11>{finalDamage}</size></color>'
-
-        returnResult.append((battlelog_text_processor({
-            "caster_text": self.name,
-            "caster_color": "#636363",
-            "caster_size": 12,
-            "descript_text": get_text(skill.Name),
-            "descript_color": "#ff0000",
-            "target_text": target.name,
-            "target_color": "#363636"
-        }, "damage", color_code), finalDamage, self.attackTimer))
+        log = battlelog_event("damage", self.name, target.name, skill.Name, finalDamage,
+                              is_crt=is_Crt) if self.logs_events else None
+        returnResult.append((log, finalDamage, self.attackTimer))
 
         #處理吸血
         if (self.stats["RecoveryDmg"] != 0 and damage != 0):
@@ -605,48 +855,35 @@ class BattleCharacter:
 
         attackerElementDamage = 0
         targetElementDefense = 0
-        colorCode = ""
 
         match (op.InfluenceStatus):
             case "FireDamage":
                 attackerElementDamage = self.stats["FireDamage"]
                 targetElementDefense = self.stats["FireDefense"]
-                colorCode = "#FF4000"
 
             case "WaterDamage":
                 attackerElementDamage = self.stats["WaterDamage"]
                 targetElementDefense = self.stats["WaterDefense"]
-                colorCode = "#0084FF"
             case "EarthDamage":
                 attackerElementDamage = self.stats["EarthDamage"]
                 targetElementDefense = self.stats["EarthDefense"]
-                colorCode = "#A36000"
             case "WindDamage":
                 attackerElementDamage = self.stats["WindDamage"]
                 targetElementDefense = self.stats["WindDefense"]
-                colorCode = "#26FF99"
             case "HolyDamage":
                 attackerElementDamage = self.stats["HolyDamage"]
                 targetElementDefense = self.stats["HolyDefense"]
-                colorCode = "#FFF800"
             case "DarkDamage":
                 attackerElementDamage = self.stats["DarkDamage"]
                 targetElementDefense = self.stats["DarkDefense"]
-                colorCode = "#242424"
 
         calulatordmg = (attackerElementDamage*op.EffectValue*self.stats["ElementDamageIncrease"])-(targetElementDefense*target.stats["ElementDamageReduction"])
         calulatordmg =  clamp(calulatordmg, 0, calulatordmg)
         calulatordmg = round(self.BonusDamageCalulator(calulatordmg, target))
 
-        return battlelog_text_processor({
-            "caster_text": self.name,
-            "caster_color": "#636363",
-            "caster_size": 12,
-            "descript_text": get_text(skill.Name),
-            "descript_color": "#910000",
-            "target_text": target.name,
-            "target_color": "#363636"
-        }, "elementDamage", f"<color={colorCode}>{calulatordmg}</color>"), calulatordmg, 0
+        log = battlelog_event("elementDamage", self.name, target.name, skill.Name, calulatordmg,
+                              detail=op.InfluenceStatus) if self.logs_events else None
+        return log, calulatordmg, 0
 
     def BonusDamageCalulator(self,damage,target) -> int:
         """
@@ -674,12 +911,8 @@ class BattleCharacter:
         recoveryValue = round(damage*self.stats["RecoveryDmg"]/100)
         self.stats["HP"] = clamp(self.stats["HP"] + recoveryValue,self.stats["HP"],self.stats["MaxHP"])
 
-        return battlelog_text_processor({
-            "caster_text": self.name,
-            "caster_color": "#00ffdc",
-            "descript_text": recoveryValue,
-            "descript_color": "#ff9300",
-        }, "recoveryDmg"), 0, 0
+        log = battlelog_event("recoveryDmg", self.name, value=recoveryValue) if self.logs_events else None
+        return log, 0, 0
 
     #endregion
 
@@ -708,20 +941,21 @@ class BattleCharacter:
                 self._apply_effect("SpeedSlowRate" if(isRate is True) else "SpeedSlow", isRate, value)
             # 一般數值
             case _:
-                if hasattr(self.effect, stateType):
+                if stateType in StatusIndex:
                     self._apply_effect(stateType, isRate, value)
                 #else:
                     #print("未定義的參數:", stateType)
 
-        # 套完 Effect 重算 stats
-        self._recalculate_stats()
-        self.character_overview.update_state(self.stats)
+        # 套完 Effect 只重算有變動的能力值
+        changes = self._recalculate_stats(self.dirty_stats)
+        self._notify_stats_changed(changes)
 
     def _apply_effect(self, attr: str, isRate: bool, value: float):
         """
         效果影響的參數加成處理
         """
-        base_val = getattr(self.basal, attr)
+        index = StatusIndex[attr]
+        base_val = self.basal.values[index]
 
         if isRate:
             add_val = base_val * value
@@ -732,31 +966,67 @@ class BattleCharacter:
         if isinstance(base_val, int):
             add_val = round(add_val)
 
-        current = getattr(self.effect, attr)
-        setattr(self.effect, attr, current + add_val)
+        self.effect.values[index] += add_val
+        self.dirty_stats.add(index)
         return add_val
 
-    def _recalculate_stats(self):
+    def _recalculate_stats(self, indexes: Optional[Iterable[int]] = None) -> Dict[str, Any]:
         """
         能力值運算計算
-        """
+        indexes 為 None 時重算全部能力值 否則只重算指定索引的能力值
 
-        for f in fields(StatusValues):
-            name = f.name
-            if name != 'HP' and name != 'MP':
-                self.stats[name] = getattr(self.basal, name) + getattr(self.equip, name) + getattr(self.effect, name)
+        Returns:
+            {有重算的能力值: 新數值}
+        """
+        stats = self.stats.values
+        basal = self.basal.values
+        equip = self.equip.values
+        effect = self.effect.values
+        changes = {}
+        for i in range(len(stats)) if indexes is None else indexes:
+            # 當前 HP/MP 不重算
+            if i != _HP_INDEX and i != _MP_INDEX:
+                stats[i] = basal[i] + equip[i] + effect[i]
+                changes[StatusFieldNames[i]] = stats[i]
+        self.dirty_stats.clear()
 
         # 套 buff 增加的當前 HP/MP
-        self.stats["HP"] += self.tempHp
-        self.stats["MP"] += self.tempMp
+        stats[_HP_INDEX] += self.tempHp
+        stats[_MP_INDEX] += self.tempMp
+        if self.tempHp:
+            changes["HP"] = stats[_HP_INDEX]
+        if self.tempMp:
+            changes["MP"] = stats[_MP_INDEX]
+        return changes
+
+    def _notify_stats_changed(self, changes: Dict[str, Any]):
+        """
+        通知能力值總覽 有 update_state_delta 時只傳送變動的能力值 否則傳送全部能力值
+        """
+        update_state_delta = getattr(self.character_overview, "update_state_delta", None)
+        if update_state_delta is not None:
+            update_state_delta(changes)
+        else:
+            self.character_overview.update_state(self.stats)
     #endregion
 
 class BattleSimulator:
-    def __init__(self, game_data, gui):
+    def __init__(self, game_data, gui=None, train_ai: bool = True, log_verbosity: str = "full"):
+        """
+        Args:
+            gui: 戰鬥介面 None時為無介面執行 (只能使用 simulate_battle_fast)
+            train_ai: 戰鬥結束後是否更新並儲存 PPO 模型
+            log_verbosity: 快速戰鬥的日誌詳細程度 (LogVerbosityLevels) none 時不產生日誌與傷害紀錄
+        """
         self.game_data = game_data
         self.gui = gui
-        self.battle_log: List[str] = []
+        self.train_ai = train_ai
+        self.battle_time = 0.0  # 快速戰鬥最後一個動作的時間 (秒)
+        self.timed_out = False  # 快速戰鬥是否超時結束
+        self.battle_log = BattleLog(verbosity=log_verbosity)
         self.damage_data: List[Dict] = []
+        self.damage_totals: Dict[str, float] = {}  # 快速戰鬥雙方 ("player"/"enemy") 造成的總傷害 (不受日誌詳細程度影響 雙方同名時也分開計算)
+        self.rng: Optional[BattleRandom] = None  # 目前戰鬥的亂數產生器
         self.skill_usage: Dict[str, int] = {}
         self.update_hp_mp = None  #用來儲存更新雙方血量魔力的匿名方法
         self._after_ids: List = []  # 追蹤所有 tkinter.after 的 ID
@@ -785,7 +1055,7 @@ class BattleSimulator:
         if not self.is_battling:
             return
 
-        dt = 0.1  # 每 0.1 秒刷新一次
+        dt = FastBattleTickTime  # 每個 tick 刷新一次
 
         # 暫停不執行並Delay
         if (os.environ.get("PAUSED") == "1"):
@@ -793,8 +1063,8 @@ class BattleSimulator:
             return
 
         if player.is_alive() and enemy.is_alive():
-            player.pass_time(dt)
-            enemy.pass_time(dt)
+            player.pass_time()
+            enemy.pass_time()
             self._schedule(int(dt * 1000), lambda: self.battle_tick(player, enemy))
 
     def attack_loop(self, attacker: BattleCharacter, target):
@@ -835,13 +1105,7 @@ class BattleSimulator:
                         self.battle_log.append(log_msg)
                         reward += ai.calculate_reward(damage,target.is_alive(),attacker.is_alive())
                         total_attack_timer += attack_timer
-                        self.battle_log.append(battlelog_text_processor({
-                            "caster_text": attacker.name,
-                            "caster_color": "#636363",
-                            "caster_size": 12,
-                            "descript_text": "普攻",
-                            "descript_color": "#ff0000",
-                        }, "normalAttckTimer", f"{total_attack_timer:.2f}"))
+                        self.battle_log.append(battlelog_event("normalAttckTimer", attacker.name, value=total_attack_timer))
                         self.damage_data.append({
                             "attacker": attacker.name,
                             "target": target.name,
@@ -880,13 +1144,8 @@ class BattleSimulator:
                         for temp in resultList:
                             log_msg, damage, attack_timer = temp
                             self.battle_log.append(log_msg)
-                            self.battle_log.append(battlelog_text_processor({
-                            "caster_text": attacker.name,
-                            "caster_color": "#636363",
-                            "caster_size": 12,
-                            "descript_text": get_text(skill.Name),
-                            "descript_color": "#ff0000",
-                        }, "skillTimer", f"{1 if skill.Type == "Buff" else 1.8}"))
+                            self.battle_log.append(battlelog_event("skillTimer", attacker.name, skill=skill.Name,
+                                                                   value=1 if skill.Type == "Buff" else 1.8))
                             attacker.skill_cooldowns[skill.SkillID] = skill.CD
                             reward += ai.calculate_reward(damage,target.is_alive(),attacker.is_alive())
                             total_attack_timer += attack_timer
@@ -920,6 +1179,8 @@ class BattleSimulator:
         self.is_battling = True
         self.battle_log.clear()
         self.damage_data.clear()
+        self.rng = BattleRandom()
+        player.rng = enemy.rng = self.rng
         player.skill_usage = {get_text(s.Name):0 for s in player.skills}
         enemy.skill_usage = {get_text(s.Name):0 for s in enemy.skills}
 
@@ -964,11 +1225,11 @@ class BattleSimulator:
         self.is_battling = False
         if player.is_alive():
             print(f"{enemy.name} 被擊敗了！{player.name} 獲勝！")
-            self.battle_log.append(f"{enemy.name} 被擊敗了！{player.name} 獲勝！")
+            self.battle_log.append_summary(f"{enemy.name} 被擊敗了！{player.name} 獲勝！")
             self.gui.battle_results.append(True)
         else:
             print(f"{player.name} 被擊敗了！{enemy.name} 獲勝！")
-            self.battle_log.append(f"{player.name} 被擊敗了！{enemy.name} 獲勝！")
+            self.battle_log.append_summary(f"{player.name} 被擊敗了！{enemy.name} 獲勝！")
             self.gui.battle_results.append(False)
 
         self.gui.display_battle_log(self.get_battle_log())
@@ -980,7 +1241,10 @@ class BattleSimulator:
             "result": player.is_alive()
         }
         #AI訓練資料更新
-        player.ai.update_ppo()
+        if self.train_ai:
+            player.ai.update_ppo()
+        else:
+            player.ai.clear_memory()
 
         # 通知 GUI 戰鬥結束（恢復按鈕狀態）
         if hasattr(self.gui, '_on_battle_end'):
@@ -990,10 +1254,24 @@ class BattleSimulator:
     # 快速略過戰鬥 (Discrete Event Simulation)
     # ──────────────────────────────────────────
 
-    def simulate_battle_fast(self, player: BattleCharacter, enemy: BattleCharacter):
-        """以離散事件模擬 (DES) 方式瞬間完成整場戰鬥"""
+    def simulate_battle_fast(self, player: BattleCharacter, enemy: BattleCharacter, log_verbosity: str = None,
+                             seed: Optional[int] = None):
+        """
+        以離散事件模擬 (DES) 方式瞬間完成整場戰鬥
+
+        Args:
+            log_verbosity: 不為 None 時改變這場之後的日誌詳細程度
+            seed: 這場戰鬥的亂數種子 (命中/格檔/暴擊與 AI 動作抽樣) None時由全域 random 取得
+        """
+        if log_verbosity is not None:
+            self.battle_log.verbosity = log_verbosity
         self.battle_log.clear()
         self.damage_data.clear()
+        self.damage_totals = {"player": 0, "enemy": 0}
+        self.rng = BattleRandom(seed)
+        player.rng = enemy.rng = self.rng
+        self.battle_time = 0.0
+        self.timed_out = False
         player.skill_usage = {get_text(s.Name): 0 for s in player.skills}
         enemy.skill_usage = {get_text(s.Name): 0 for s in enemy.skills}
 
@@ -1015,8 +1293,10 @@ class BattleSimulator:
         enemy.run_passive_skill()
 
         # ── 建立優先佇列 ──
-        # 事件格式: (time, priority, event_type, data)
+        # 事件格式: (time, priority, counter, event_type)
         #   priority: 0=TICK, 1=PLAYER_ATTACK, 2=ENEMY_ATTACK （同時間時依此順序）
+        # TICK 維持在每 0.1 秒的格線上，但只排程下一個「會產生效果」的 tick；
+        # 中間閒置的 tick 在處理下一個事件前以 skip_ticks 一次補上（計時數值與逐 tick 執行相同）
         TICK = 0
         PLAYER_ATTACK = 1
         ENEMY_ATTACK = 2
@@ -1024,50 +1304,101 @@ class BattleSimulator:
         event_queue = []
         counter = 0  # 用來打破同 (time, priority) 的 tie
 
-        def push_event(t, priority, etype):
+        def push_event(t, priority, etype) -> int:
             nonlocal counter
             heapq.heappush(event_queue, (t, priority, counter, etype))
             counter += 1
-
-        dt = 0.1
-        push_event(dt, TICK, "TICK")
+            return counter - 1
+
+        dt = FastBattleTickTime
+        tick_index = 0  # 已套用（執行或跳過）的 tick 數
+        tick_time = 0.0  # 最後套用的 tick 時間（逐次累加 dt，與每 tick 排程的時間相同）
+        next_tick_index = 0  # 已排程的下一個執行 tick
+        next_tick_id = -1  # 已排程 tick 事件的 counter（重新排程後舊事件失效）
+
+        def skip_idle_ticks(until):
+            """補上時間不晚於 until、且在下一個執行 tick 之前的閒置 tick"""
+            nonlocal tick_index, tick_time
+            count = 0
+            t = tick_time
+            while tick_index + count + 1 < next_tick_index and t + dt <= until:
+                t += dt
+                count += 1
+            if count:
+                player.skip_ticks(count, dt)
+                enemy.skip_ticks(count, dt)
+                tick_index += count
+                tick_time = t
+
+        def schedule_tick():
+            """依雙方計時狀態排程下一個會產生效果的 tick（戰鬥已分出勝負時排程下一格）"""
+            nonlocal next_tick_index, next_tick_id
+            if player.is_alive() and enemy.is_alive():
+                ticks = min(player.idle_ticks(dt), enemy.idle_ticks(dt))
+            else:
+                ticks = 1
+            if tick_index + ticks == next_tick_index:
+                return
+            t = tick_time
+            for _ in range(ticks):
+                t += dt
+            next_tick_index = tick_index + ticks
+            next_tick_id = push_event(t, TICK, "TICK")
+
+        schedule_tick()
         push_event(0.0, PLAYER_ATTACK, "PLAYER_ATTACK")
         push_event(0.0, ENEMY_ATTACK, "ENEMY_ATTACK")
 
-        MAX_TIME = 300.0  # 5 分鐘上限，防止無限戰鬥
-
         while event_queue:
-            current_time, priority, _cnt, etype = heapq.heappop(event_queue)
+            current_time, priority, event_id, etype = heapq.heappop(event_queue)
+
+            # 已重新排程的舊 tick
+            if etype == "TICK" and event_id != next_tick_id:
+                continue
 
-            if current_time > MAX_TIME:
-                self.battle_log.append("戰鬥超時！（300秒）")
+            if current_time > FastBattleMaxTime:
+                self.battle_log.append_summary(f"戰鬥超時！（{FastBattleMaxTime:g}秒）")
+                self.battle_time = FastBattleMaxTime
+                self.timed_out = True
                 break
 
             if not player.is_alive() or not enemy.is_alive():
                 break
+            self.battle_time = current_time
+            self.battle_log.time = current_time
+
+            # 先補上這個事件之前的閒置 tick
+            skip_idle_ticks(current_time)
 
             if etype == "TICK":
-                player.pass_time(dt)
-                enemy.pass_time(dt)
-                push_event(current_time + dt, TICK, "TICK")
+                player.pass_time()
+                enemy.pass_time()
+                tick_index = next_tick_index
+                tick_time = current_time
 
             elif etype == "PLAYER_ATTACK":
-                next_delay = self._process_action_fast(player, enemy)
+                next_delay = self._process_action_fast(player, enemy, "player")
                 if next_delay is not None:
                     push_event(current_time + next_delay, PLAYER_ATTACK, "PLAYER_ATTACK")
 
             elif etype == "ENEMY_ATTACK":
-                next_delay = self._process_action_fast(enemy, player)
+                next_delay = self._process_action_fast(enemy, player, "enemy")
                 if next_delay is not None:
                     push_event(current_time + next_delay, ENEMY_ATTACK, "ENEMY_ATTACK")
 
+            # 雙方狀態可能改變（冷卻、效果、訂閱事件），重新排程下一個 tick
+            schedule_tick()
+
         # 戰鬥結束，處理結果
         self._finalize_battle_fast(player, enemy)
 
-    def _process_action_fast(self, attacker: BattleCharacter, target: BattleCharacter) -> Optional[float]:
+    def _process_action_fast(self, attacker: BattleCharacter, target: BattleCharacter, side: str) -> Optional[float]:
         """
         處理一次攻擊動作（快速模式），回傳下次攻擊的延遲秒數。
         若戰鬥已結束則回傳 None。
+
+        Args:
+            side: 攻擊者是哪一方 ("player"/"enemy") 累計總傷害用
         """
         if not attacker.is_alive() or not target.is_alive():
             return None
@@ -1077,6 +1408,9 @@ class BattleSimulator:
 
         reward = 0
         total_attack_timer = 0
+        # 日誌詳細程度不足時 不產生事件紀錄與傷害紀錄
+        log_events = self.battle_log.keeps_events
+        log_damage = self.battle_log.keeps_damage
 
         match (action_id):
             case "NORMAL_ATTACK":
@@ -1088,22 +1422,19 @@ class BattleSimulator:
                 )
                 if attacker.action_check(normal_attack):
                     for log_msg, damage, attack_timer in _execute_skill_operation(normal_attack, attacker, target):
-                        self.battle_log.append(log_msg)
                         reward += ai.calculate_reward(damage, target.is_alive(), attacker.is_alive())
                         total_attack_timer += attack_timer
-                        self.battle_log.append(battlelog_text_processor({
-                            "caster_text": attacker.name,
-                            "caster_color": "#636363",
-                            "caster_size": 12,
-                            "descript_text": "普攻",
-                            "descript_color": "#ff0000",
-                        }, "normalAttckTimer", f"{total_attack_timer:.2f}"))
-                        self.damage_data.append({
-                            "attacker": attacker.name,
-                            "target": target.name,
-                            "skill": "NORMAL_ATTACK",
-                            "Damage": damage,
-                        })
+                        self.damage_totals[side] += damage
+                        if log_events:
+                            self.battle_log.append(log_msg)
+                            self.battle_log.append(battlelog_event("normalAttckTimer", attacker.name, value=total_attack_timer))
+                        if log_damage:
+                            self.damage_data.append({
+                                "attacker": attacker.name,
+                                "target": target.name,
+                                "skill": "NORMAL_ATTACK",
+                                "Damage": damage,
+                            })
                 else:
                     reward = -0.1
                     ai.record_result(reward, False)
@@ -1111,7 +1442,8 @@ class BattleSimulator:
 
             case str() if action_id.startswith("USE_ITEM:"):
                 log_msg, damage, attack_timer = attacker.use_item_id(action_id.replace("USE_ITEM:", ""))
-                self.battle_log.append(log_msg)
+                if log_events:
+                    self.battle_log.append(log_msg)
                 reward += ai.calculate_reward(damage, target.is_alive(), attacker.is_alive())
                 total_attack_timer += attack_timer
 
@@ -1127,23 +1459,21 @@ class BattleSimulator:
                             continue
                         for temp in resultList:
                             log_msg, damage, attack_timer = temp
-                            self.battle_log.append(log_msg)
-                            self.battle_log.append(battlelog_text_processor({
-                                "caster_text": attacker.name,
-                                "caster_color": "#636363",
-                                "caster_size": 12,
-                                "descript_text": get_text(skill.Name),
-                                "descript_color": "#ff0000",
-                            }, "skillTimer", f"{1 if skill.Type == 'Buff' else 1.8}"))
+                            if log_events:
+                                self.battle_log.append(log_msg)
+                                self.battle_log.append(battlelog_event("skillTimer", attacker.name, skill=skill.Name,
+                                                                       value=1 if skill.Type == "Buff" else 1.8))
                             attacker.skill_cooldowns[skill.SkillID] = skill.CD
                             reward += ai.calculate_reward(damage, target.is_alive(), attacker.is_alive())
                             total_attack_timer += attack_timer
-                            self.damage_data.append({
-                                "attacker": attacker.name,
-                                "target": target.name,
-                                "skill": get_text(skill.Name),
-                                "Damage": damage,
-                            })
+                            self.damage_totals[side] += damage
+                            if log_damage:
+                                self.damage_data.append({
+                                    "attacker": attacker.name,
+                                    "target": target.name,
+                                    "skill": get_text(skill.Name),
+                                    "Damage": damage,
+                                })
                 else:
                     reward = -0.1
                     ai.record_result(reward, False)
@@ -1156,13 +1486,24 @@ class BattleSimulator:
         return total_attack_timer if total_attack_timer > 0 else attacker.attackTimer
 
     def _finalize_battle_fast(self, player: BattleCharacter, enemy: BattleCharacter):
-        """快速戰鬥結束後：記錄結果、更新真實 GUI、觸發 AI 訓練"""
+        """快速戰鬥結束後：記錄結果、更新真實 GUI (有介面時)、觸發 AI 訓練"""
         if player.is_alive():
-            self.battle_log.append(f"{enemy.name} 被擊敗了！{player.name} 獲勝！")
-            self.gui.battle_results.append(True)
+            self.battle_log.append_summary(f"{enemy.name} 被擊敗了！{player.name} 獲勝！")
         else:
-            self.battle_log.append(f"{player.name} 被擊敗了！{enemy.name} 獲勝！")
-            self.gui.battle_results.append(False)
+            self.battle_log.append_summary(f"{player.name} 被擊敗了！{enemy.name} 獲勝！")
+
+        if self.gui is not None:
+            self._update_gui_fast(player, enemy)
+
+        # AI 訓練資料更新 (不訓練時清空本場軌跡 避免累積到下一場)
+        if self.train_ai:
+            player.ai.update_ppo()
+        else:
+            player.ai.clear_memory()
+
+    def _update_gui_fast(self, player: BattleCharacter, enemy: BattleCharacter):
+        """快速戰鬥結束後更新真實 GUI"""
+        self.gui.battle_results.append(player.is_alive())
 
         # 顯示完整戰鬥日誌
         self.gui.display_battle_log(self.get_battle_log())
@@ -1183,11 +1524,11 @@ class BattleSimulator:
             "result": player.is_alive()
         }
 
-        # AI 訓練資料更新
-        player.ai.update_ppo()
-
     def get_battle_log(self) -> List[str]:
-        return self.battle_log
+        """
+        戰鬥日誌文字 (在這裡才產生紀錄的文字樣式)
+        """
+        return self.battle_log.render()
 
     def get_damage_data(self) -> List[Dict]:
         return self.damage_data
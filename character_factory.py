@@ -0,0 +1,229 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from battle_simulator import BattleCharacter
+from commonfunction import get_text
+from game_models import GameData, JobBonusDataModel, MonsterDataModel, WeaponDataModel, ArmorDataModel
+from status_operation import CharacterStatusCalculator, StatusVector, to_status_vector
+
+
+@dataclass(frozen=True)
+class CharacterTemplate:
+    """
+    角色模板 (計算完成且不可變更的角色資料)
+    每場戰鬥以 stamp() 產生新的 BattleCharacter 可變動的資料都會複製一份
+    """
+    key: tuple
+    name: str
+    jobBonusData: Optional[JobBonusDataModel]
+    ai_id: str
+    level: int
+    stats: StatusVector  # 模板持有的能力值向量不可直接修改 stamp() 時複製
+    basal: Optional[StatusVector]
+    equip: Optional[StatusVector]
+    effect: Optional[StatusVector]
+    skills: tuple
+    equipped_weapon: Optional[Tuple[Tuple[WeaponDataModel, int], ...]]
+    equipped_armor: Optional[Tuple[Tuple[ArmorDataModel, int], ...]]
+    characterType: bool
+    attackTimer: float
+
+    def stamp(self, name: str = None, items=None, buff_bar=None, debuff_bar=None, passive_bar=None,
+              item_manager=None, character_overview=None) -> BattleCharacter:
+        """
+        由模板產生新的戰鬥角色
+
+        Args:
+            name: 角色名稱 None時使用模板名稱
+            items: 攜帶道具 [(道具資料, 數量)]
+        """
+        return BattleCharacter(
+            name=self.name if name is None else name,
+            level=self.level,
+            jobBonusData=self.jobBonusData,
+            ai_id=self.ai_id,
+            stats=self.stats.copy(),
+            basal=None if self.basal is None else self.basal.copy(),
+            equip=None if self.equip is None else self.equip.copy(),
+            effect=None if self.effect is None else self.effect.copy(),
+            skills=list(self.skills),
+            equipped_weapon=None if self.equipped_weapon is None else list(self.equipped_weapon),
+            equipped_armor=None if self.equipped_armor is None else list(self.equipped_armor),
+            characterType=self.characterType,
+            attackTimer=self.attackTimer,
+            buff_bar=buff_bar,
+            debuff_bar=debuff_bar,
+            passive_bar=passive_bar,
+            items=[] if items is None else list(items),
+            item_manager=item_manager,
+            character_overview=character_overview,
+        )
+
+
+class CharacterFactory:
+    """
+    角色建立工廠
+    以正規化的配置指紋 (種族, 職業, 等級, 裝備與強化等級, 資料版本) 快取角色模板 超過上限時淘汰最久未使用的模板
+    """
+
+    def __init__(self, game_data: GameData = None, max_size: int = 128):
+        self.game_data = game_data or GameData.Instance
+        self.max_size = max_size
+        self._templates: "OrderedDict[tuple, CharacterTemplate]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def cache_info(self) -> Dict[str, int]:
+        """
+        快取使用狀況
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._templates), "max_size": self.max_size}
+
+    def clear(self):
+        """
+        清除所有快取的模板與計數
+        """
+        self._templates.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_or_build(self, key: tuple, builder) -> CharacterTemplate:
+        template = self._templates.get(key)
+        if template is not None:
+            self.hits += 1
+            self._templates.move_to_end(key)
+            return template
+
+        self.misses += 1
+        template = builder()
+        self._templates[key] = template
+        if len(self._templates) > self.max_size:
+            self._templates.popitem(last=False)
+        return template
+
+    def _normalize_armors(self, armor_list) -> List[Tuple[ArmorDataModel, int]]:
+        """
+        防具依部位順序 (與介面上的部位順序相同) 排列
+        """
+        part_order = {part: i for i, part in enumerate(self.game_data.get_armor_parts())}
+        return sorted(
+            ((armor, int(forge_lv)) for armor, forge_lv in armor_list),
+            key=lambda x: (part_order.get(x[0].WearPartID, len(part_order)), x[0].CodeID, x[1]),
+        )
+
+    def get_template(self, race: str, jobBonusData: JobBonusDataModel, level: int,
+                     weapon_list=(), armor_list=()) -> CharacterTemplate:
+        """
+        取得人物角色模板
+
+        Args:
+            weapon_list: [(武器資料, 強化等級)] 順序有意義 (攻擊速度取第一把武器) 不會重新排序
+            armor_list: [(防具資料, 強化等級)] 會依部位排序
+        """
+        weapons = [(weapon, int(forge_lv)) for weapon, forge_lv in weapon_list]
+        armors = self._normalize_armors(armor_list)
+        key = (
+            "character",
+            race,
+            jobBonusData.Job,
+            int(level),
+            tuple((weapon.CodeID, forge_lv) for weapon, forge_lv in weapons),
+            tuple((armor.CodeID, forge_lv) for armor, forge_lv in armors),
+            self.game_data.data_version,
+        )
+
+        def build() -> CharacterTemplate:
+            calculator = CharacterStatusCalculator(
+                player_data=None,
+                weapon_list=weapons,
+                armor_list=armors,
+                game_data=self.game_data,
+            )
+            character_data = calculator.create_character("", race, jobBonusData, int(level))
+            return CharacterTemplate(
+                key=key,
+                name="",
+                jobBonusData=jobBonusData,
+                ai_id=jobBonusData.Job,
+                level=character_data["level"],
+                stats=to_status_vector(character_data["stats"]),
+                basal=to_status_vector(character_data["basal"]),
+                equip=to_status_vector(character_data["equip"]),
+                effect=to_status_vector(character_data["effect"]),
+                skills=tuple(self.game_data.get_skills_by_job(jobBonusData.Job)),
+                equipped_weapon=tuple(weapons),
+                equipped_armor=tuple(armors),
+                characterType=True,
+                attackTimer=1 / character_data["stats"]["AS"],
+            )
+
+        return self._get_or_build(key, build)
+
+    def get_monster_template(self, monster: MonsterDataModel) -> CharacterTemplate:
+        """
+        取得怪物角色模板
+        """
+        key = ("monster", monster.MonsterCodeID, self.game_data.data_version)
+
+        def build() -> CharacterTemplate:
+            # 將怪物轉換為戰鬥角色
+            stats = StatusVector()
+
+            # 把怪物有的欄位塞進去
+            monster_stats = {
+                "MaxHP": monster.HP,
+                "HP": monster.HP,
+                "MaxMP": monster.MP,
+                "MP": monster.MP,
+                "ATK": monster.ATK,
+                "DEF": monster.DEF,
+                "Crt": monster.Crt,
+                "CrtResistance": monster.CrtResistance,
+                "CrtDamage": 0,
+                "Avoid": monster.Avoid,
+                "Hit": monster.Hit,
+                "AtkSpeed": monster.AtkSpeed,
+                "AttackMode": monster.AttackMode,
+                "BlockRate": 0,
+                "DamageReduction": 0,
+            }
+            for k, v in monster_stats.items():
+                if k in stats:
+                    stats[k] = v
+
+            return CharacterTemplate(
+                key=key,
+                name=get_text(f"TM_{monster.MonsterCodeID}_Name"),
+                jobBonusData=None,
+                ai_id=monster.MonsterCodeID,
+                level=monster.Lv,
+                stats=stats,
+                basal=None,
+                equip=None,
+                effect=None,
+                skills=tuple(monster.MonsterSkillList),
+                equipped_weapon=None,
+                equipped_armor=None,
+                characterType=False,
+                attackTimer=1 / monster.AtkSpeed,
+            )
+
+        return self._get_or_build(key, build)
+
+    def create_character(self, name: str, race: str, jobBonusData: JobBonusDataModel, level: int,
+                         weapon_list=(), armor_list=(), itemList=None, **ui_objects) -> BattleCharacter:
+        """
+        創建人物 (相同配置直接使用快取的模板)
+
+        Args:
+            ui_objects: buff_bar / debuff_bar / passive_bar / item_manager / character_overview
+        """
+        template = self.get_template(race, jobBonusData, level, weapon_list, armor_list)
+        return template.stamp(name=name, items=itemList, **ui_objects)
+
+    def create_monster_character(self, monster: MonsterDataModel, itemList=None, **ui_objects) -> BattleCharacter:
+        """
+        創建怪物 (相同怪物直接使用快取的模板)
+        """
+        return self.get_monster_template(monster).stamp(items=itemList, **ui_objects)
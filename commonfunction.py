@@ -1,7 +1,7 @@
 import os
 import sys
-import time
 
+from battle_log import BattleLogRecord
 from game_models import GameData
 
 
@@ -56,12 +56,6 @@ def load_image_resource(path,name):
         print(f"圖片載入失敗: {full_path}, 錯誤: {e}")
         return None
 
-def get_time_stap(id:str):
-    """
-    帶入ID取得時間戳返回
-    """
-    return f"{id}_{str(time.time())}"
-
 # --- JSON 讀取輔助 ---
 def get_data_path(path, filename):
     # 直接調用共用方法，不要在裡面定義
@@ -76,7 +70,95 @@ def get_resource_path(relative_path):
         return os.path.join(sys._MEIPASS, relative_path)
     return os.path.join(os.path.abspath("."), relative_path)
 
-def battlelog_text_processor(input_log_dic,log_type:str,other = None):
+def get_cache_path(filename):
+    """
+    取得快取檔案路徑
+    打包後的執行檔解壓目錄是暫存的 因此快取放在執行檔所在目錄
+    """
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        base_dir = os.path.abspath(".")
+    return os.path.join(base_dir, "cache", filename)
+
+def battlelog_text_processor(input_log_dic,log_type:str,other = None) -> BattleLogRecord:
+    """
+    建立戰鬥Log 紀錄 (文字樣式在顯示時才由 render_battlelog_text 產生)
+    """
+    return BattleLogRecord(log_type, input_log_dic, other)
+
+def battlelog_event(log_type:str, caster:str, target:str = "", skill:str = None, value = None,
+                    is_crt:bool = False, detail:str = None) -> BattleLogRecord:
+    """
+    建立戰鬥計算的 Log 紀錄 (只保存原始資料 顏色與大小在顯示時由 render_battlelog_event 決定)
+
+    Args:
+        caster: 施放者名稱
+        target: 目標名稱
+        skill: 技能 (效果) 名稱的文字ID
+        value: 原始數值 (傷害、回復量、秒數)
+        is_crt: 是否暴擊
+        detail: 其他分類資料 (屬性傷害類型、回復的能力值)
+    """
+    return BattleLogRecord(log_type, None, value, caster_name=caster, target_name=target, skill_name=skill,
+                           is_crt=is_crt, detail=detail)
+
+# 戰鬥計算 Log 的預設樣式
+BattleEventStyles = {
+    "miss": {"caster_color": "#636363", "caster_size": 12, "descript_color": "#ff9300"},
+    "block": {"caster_color": "#636363", "caster_size": 12, "descript_color": "#ff9300"},
+    "damage": {"caster_color": "#636363", "caster_size": 12, "descript_color": "#ff0000", "target_color": "#363636"},
+    "elementDamage": {"caster_color": "#636363", "caster_size": 12, "descript_color": "#910000", "target_color": "#363636"},
+    "effectRecovery": {"caster_color": "#00ffdc", "descript_color": "#ff9300", "target_color": "#83ff00"},
+    "recoveryDmg": {"caster_color": "#00ffdc", "descript_color": "#ff9300"},
+    "naturalHpRecovery": {"caster_color": "#00ffdc", "descript_color": "#ff0000"},
+    "naturalMpRecovery": {"caster_color": "#00ffdc", "descript_color": "#ff0000"},
+    "normalAttckTimer": {"caster_color": "#636363", "caster_size": 12, "descript_color": "#ff0000"},
+    "skillTimer": {"caster_color": "#636363", "caster_size": 12, "descript_color": "#ff0000"},
+}
+
+# 屬性傷害的顏色
+ElementDamageColors = {
+    "FireDamage": "#FF4000",
+    "WaterDamage": "#0084FF",
+    "EarthDamage": "#A36000",
+    "WindDamage": "#26FF99",
+    "HolyDamage": "#FFF800",
+    "DarkDamage": "#242424",
+}
+
+def render_battlelog_event(record: BattleLogRecord):
+    """
+    將戰鬥計算的 Log 紀錄轉為文字樣式 (依類型決定顏色、大小與數值標記)
+    """
+    log_dic = dict(BattleEventStyles.get(record.log_type, {}))
+    log_dic["caster_text"] = record.caster_name
+    log_dic["target_text"] = record.target_name
+    if record.skill_name is not None:
+        log_dic["descript_text"] = get_text(record.skill_name)
+    other = record.value
+
+    match(record.log_type):
+        case "damage":
+            if record.is_crt:
+                other = f'<color=#ffd600><size=13><b>{record.value}</size></color></b>'
+            else:
+                other = f'<color=#ff0000><size=11>{record.value}</size></color>'
+        case "elementDamage":
+            other = f'<color={ElementDamageColors.get(record.detail, "")}>{record.value}</color>'
+        case "effectRecovery":
+            color_code = "#2945FF" if record.detail == "MP" else "#ff0000"
+            recovery_type = "魔力" if record.detail == "MP" else "血量"
+            other = f'<color={color_code}>{record.value} {recovery_type} </color>'
+        case "normalAttckTimer":
+            log_dic["descript_text"] = "普攻"
+            other = f'{record.value:.2f}'
+        case "recoveryDmg" | "naturalHpRecovery" | "naturalMpRecovery":
+            log_dic["descript_text"] = record.value
+
+    return render_battlelog_text(log_dic, record.log_type, other)
+
+def render_battlelog_text(input_log_dic,log_type:str,other = None):
     """
     取得戰鬥Log 文字樣式
     """
@@ -22,4 +22,8 @@ class Event:
 
     def clear(self):
         """清空所有訂閱者"""
-        self._subscribers.clear()
\ No newline at end of file
+        self._subscribers.clear()
+
+    def has_subscribers(self) -> bool:
+        """是否有任何訂閱者 (沒有訂閱者時呼叫事件不會有任何效果)"""
+        return len(self._subscribers) > 0
@@ -0,0 +1,357 @@
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from battle_engine import BattleSpec, create_battle_character
+from battle_simulator import BattleCharacter, FastBattleTickTime, _accumulate_ticks
+from character_factory import CharacterFactory
+from commonfunction import clamp, get_text
+from game_models import GameData, SkillData
+from skill_processor import skill_all_condition_process, upgrade_skill_processor, enhance_skill_processor
+
+
+# 會進行一次攻擊判定 (HitCalculator) 的技能組件
+DamageSkillComponents = ("Damage", "MultipleDamage")
+# 估計擊殺時間時 依施放期間重新計算魔力限制的最多次數
+RotationHorizonIterations = 20
+
+
+def roll_chance(threshold: float) -> float:
+    """
+    random.randint(0, 100) <= threshold 的機率 (共101種結果)
+    """
+    return clamp(math.floor(threshold) + 1, 0, 101) / 101
+
+
+@dataclass
+class AttackProfile:
+    """
+    一次攻擊判定 HitCalculator -> BlockCalculator -> CrtCalculator -> AttackCalculator 的門檻與結果
+    能力值固定時傷害只有一般/暴擊兩種 事先算好
+    """
+    hit_value: float  # random.randint(0, 100) <= hit_value 時命中
+    block_value: float  # 命中後 random.randint(0, 100) <= block_value 時被格檔
+    crt_value: float  # 未被格檔時 random.randint(0, 100) <= crt_value 時暴擊
+    damage: float  # 一般傷害 (BonusDamageCalulator 之後)
+    crt_damage: float  # 暴擊傷害
+    recovery: float  # 一般傷害的吸血量 (沒有吸血時為0)
+    crt_recovery: float  # 暴擊傷害的吸血量
+
+    def chances(self) -> Tuple[float, float]:
+        """
+        Returns:
+            (一般傷害的機率, 暴擊的機率) 其餘為未命中或被格檔
+        """
+        landed = roll_chance(self.hit_value) * (1 - roll_chance(self.block_value))
+        crt = landed * roll_chance(self.crt_value)
+        return landed - crt, crt
+
+    @property
+    def expected_damage(self) -> float:
+        normal, crt = self.chances()
+        return normal * self.damage + crt * self.crt_damage
+
+    @property
+    def damage_variance(self) -> float:
+        normal, crt = self.chances()
+        return normal * self.damage ** 2 + crt * self.crt_damage ** 2 - self.expected_damage ** 2
+
+    @property
+    def expected_recovery(self) -> float:
+        normal, crt = self.chances()
+        return normal * self.recovery + crt * self.crt_recovery
+
+
+def attack_profile(attacker: BattleCharacter, target: BattleCharacter, skill: SkillData) -> AttackProfile:
+    """
+    依攻擊方/防守方能力值計算攻擊判定 (計算方式與 BattleCharacter 的各個 Calculator 相同)
+    """
+    return stats_attack_profile(attacker.stats, target.stats, attacker.characterType, skill)
+
+
+def stats_attack_profile(stats: Dict[str, Any], target_stats: Dict[str, Any], characterType: bool,
+                         skill: SkillData) -> AttackProfile:
+    """
+    只依能力值字典計算攻擊判定 (配裝搜尋等沒有建立 BattleCharacter 時使用)
+
+    Args:
+        stats: 攻擊方能力值
+        target_stats: 防守方能力值
+        characterType: 攻擊方是否為人物 (False為怪物)
+    """
+    selfHit = selfATK = targetDEF = 0
+    if characterType:
+        mode = skill.AdditionMode if skill.Name != "普通攻擊" else "MeleeATK"
+        match mode:
+            case "MeleeATK":
+                selfHit, selfATK, targetDEF = stats["MeleeHit"], stats["MeleeATK"], target_stats["DEF"]
+            case "RemoteATK":
+                selfHit, selfATK, targetDEF = stats["RemoteHit"], stats["RemoteATK"], target_stats["DEF"]
+            case "MageATK":
+                selfHit, selfATK, targetDEF = stats["MageHit"], stats["MageATK"], target_stats["MDEF"]
+    else:
+        selfHit, selfATK = stats["Hit"], stats["ATK"]
+        match stats["AttackMode"]:
+            case "MeleeATK" | "RemoteATK":
+                targetDEF = target_stats["DEF"]
+            case "MageATK":
+                targetDEF = target_stats["MDEF"]
+
+    hit_value = round(selfHit * 100 / max(1, selfHit + target_stats["Avoid"]))
+    crt_value = stats["Crt"] * (stats["Crt"] / max(1, stats["Crt"] + target_stats["CrtResistance"]))
+    defenseRatio = clamp(targetDEF / (targetDEF + 9), 0.1, 0.75)
+
+    def final_damage(damage) -> float:
+        finalDamage = clamp(round(damage * (1 - defenseRatio)) - target_stats["DamageReduction"], 0,
+                            round(damage * (1 - defenseRatio)) - target_stats["DamageReduction"])
+        increaseDamagerate = clamp(stats["IncreaseDmgRate"], 1, stats["IncreaseDmgRate"])
+        Damage = clamp(stats["Damage"], 1, stats["Damage"])
+        newDamage = (finalDamage * increaseDamagerate + stats["IncreaseDmgValue"]) * Damage
+        return newDamage * clamp((1 - target_stats["FinalDamageReductionRate"]), 0, 1)
+
+    def recovery(raw_damage, damage) -> float:
+        # 是否吸血以防禦減免前的傷害判斷
+        if stats.get("RecoveryDmg", 0) != 0 and raw_damage != 0:
+            return round(damage * stats["RecoveryDmg"] / 100)
+        return 0
+
+    raw_damage = round(selfATK * skill.Damage)
+    raw_crt_damage = round(selfATK * skill.Damage * 1.5) + stats["CrtDamage"]
+    damage = final_damage(raw_damage)
+    crt_damage = final_damage(raw_crt_damage)
+    return AttackProfile(hit_value, target_stats["BlockRate"], crt_value, damage, crt_damage,
+                         recovery(raw_damage, damage), recovery(raw_crt_damage, crt_damage))
+
+
+def normal_attack_skill() -> SkillData:
+    """
+    普通攻擊的技能資料 (與快速戰鬥相同)
+    """
+    return SkillData(SkillID="NORMAL_ATTACK", Name="普通攻擊", Damage=1, CastMage=0)
+
+
+def attack_delay(attacker: BattleCharacter, hit_count: int) -> float:
+    """
+    與快速戰鬥相同 每個攻擊判定累加一次攻擊間隔 沒有攻擊判定時使用攻擊間隔
+    """
+    total_attack_timer = 0
+    for _ in range(hit_count):
+        total_attack_timer += attacker.attackTimer
+    return total_attack_timer if total_attack_timer > 0 else attacker.attackTimer
+
+
+def effective_skill(character: BattleCharacter, skill: SkillData) -> SkillData:
+    """
+    套用升級/強化後實際用來計算傷害的技能資料 (與 _execute_component 相同)
+    """
+    upgradeDataList = character.upgrade_skill_dict.get(skill.SkillID)
+    tempSkillData = upgrade_skill_processor(upgradeDataList[-1], skill) if upgradeDataList is not None else skill
+    enhanceDataList = character.enhance_skill_dict.get(skill.SkillID)
+    if enhanceDataList is not None:
+        tempSkillData = enhance_skill_processor(enhanceDataList, tempSkillData)
+    return tempSkillData
+
+
+def recovery_per_second(character: BattleCharacter, status_name: str, setting_name: str) -> float:
+    """
+    自然恢復的每秒回復量 (每 GameSetting 秒數觸發一次 以 tick 格線計算實際週期)
+    """
+    limit = GameData.Instance.GameSettingDic[setting_name].GameSettingValue
+    return character.stats.get(status_name, 0) / (_accumulate_ticks(0, limit, FastBattleTickTime) * FastBattleTickTime)
+
+
+@dataclass
+class ActionEstimate:
+    """
+    一個動作 (普攻或技能) 的期望傷害
+    技能的各個攻擊判定互相獨立 期望值與變異數直接相加
+    """
+    action_id: str
+    name: str
+    expected_damage: float
+    variance: float
+    second_moment: float  # 傷害平方的期望值
+    expected_recovery: float  # 吸血量的期望值
+    delay: float  # 到下一次行動的間隔
+    cooldown: float = 0  # 技能冷卻 (普攻為0)
+    cast_mage: float = 0  # 魔力消耗
+
+    @property
+    def dps(self) -> float:
+        """
+        連續使用這個動作 (不計冷卻) 的每秒傷害
+        """
+        return self.expected_damage / self.delay
+
+    @property
+    def period(self) -> float:
+        """
+        兩次施放的最短間隔
+        """
+        return max(self.cooldown, self.delay)
+
+
+@dataclass
+class RotationEstimate:
+    """
+    依每秒傷害由高到低使用技能 (受冷卻與魔力限制) 其餘時間普攻的平均輸出
+    假設每次都選擇最好的動作 未訓練的 AI 會隨機選到沒有傷害的動作 實際輸出較低
+    """
+    rates: Dict[str, float] = field(default_factory=dict)  # 各動作每秒使用次數
+    dps: float = 0  # 每秒期望傷害
+    recovery_per_second: float = 0  # 每秒期望吸血量
+    second_moment_per_second: float = 0  # 每秒的傷害平方期望值 (估計擊殺時的溢出傷害)
+
+    @property
+    def actions_per_second(self) -> float:
+        return sum(self.rates.values())
+
+
+@dataclass
+class KillEstimate:
+    """
+    對目標的期望擊殺時間
+    """
+    rotation: RotationEstimate
+    target_hp: float
+    net_dps: float  # 扣除目標自然恢復 (與吸血) 後的每秒傷害
+    time_to_kill: float  # 無法擊殺時為 inf
+
+
+@dataclass
+class MatchupEstimate:
+    """
+    雙方互相的期望擊殺時間 (不需要模擬 可用來在 Monte Carlo 之前篩選配裝與對手)
+    """
+    player: KillEstimate  # 玩家擊殺敵人
+    enemy: KillEstimate  # 敵人擊殺玩家
+
+    @property
+    def player_favored(self) -> bool:
+        return self.player.time_to_kill < self.enemy.time_to_kill
+
+
+def action_estimates(attacker: BattleCharacter, target: BattleCharacter) -> List[ActionEstimate]:
+    """
+    普攻與目前可以施放的主動技能的期望傷害 (技能條件不成立的技能不列入)
+    只計算傷害組件 效果組件 (Buff/控制等) 視為沒有傷害
+    """
+    profile = attack_profile(attacker, target, normal_attack_skill())
+    estimates = [ActionEstimate("NORMAL_ATTACK", "普通攻擊", profile.expected_damage, profile.damage_variance,
+                                profile.damage_variance + profile.expected_damage ** 2, profile.expected_recovery,
+                                attack_delay(attacker, 1))]
+    # 怪物技能資料不是 SkillData 只計算普攻
+    if not attacker.characterType:
+        return estimates
+
+    for skill in attacker.skills:
+        if not skill.Characteristic or not skill_all_condition_process(attacker, skill):
+            continue
+        profile = attack_profile(attacker, target, effective_skill(attacker, skill))
+        hit_count = sum(op.SkillComponentID in DamageSkillComponents for op in skill.SkillOperationDataList)
+        mean = profile.expected_damage * hit_count
+        variance = profile.damage_variance * hit_count
+        estimates.append(ActionEstimate(skill.SkillID, get_text(skill.Name), mean, variance, variance + mean ** 2,
+                                        profile.expected_recovery * hit_count, attack_delay(attacker, hit_count),
+                                        skill.CD, skill.CastMage))
+    return estimates
+
+
+def rotation_estimate(attacker: BattleCharacter, target: BattleCharacter,
+                      horizon: Optional[float] = None) -> RotationEstimate:
+    """
+    估計每秒期望傷害
+
+    Args:
+        horizon: 戰鬥時間 (秒) 目前魔力可在這段時間內用完 None時只以自然恢復的魔力計算 (長期平均)
+    """
+    estimates = action_estimates(attacker, target)
+    normal = estimates[0]
+    mp_rate = recovery_per_second(attacker, "MP_Recovery", "MpRecoverySec")
+    if horizon:
+        mp_rate += attacker.stats["MP"] / horizon
+
+    rotation = RotationEstimate()
+    time_left = 1.0  # 每秒可分配的行動時間
+    for estimate in sorted(estimates[1:], key=lambda e: e.dps, reverse=True):
+        if estimate.dps <= normal.dps:
+            break
+        rate = min(1 / estimate.period, time_left / estimate.delay)
+        if estimate.cast_mage > 0:
+            rate = min(rate, max(0.0, mp_rate) / estimate.cast_mage)
+            mp_rate -= rate * estimate.cast_mage
+        time_left -= rate * estimate.delay
+        rotation.rates[estimate.action_id] = rate
+    rotation.rates[normal.action_id] = time_left / normal.delay
+
+    for estimate in estimates:
+        rate = rotation.rates.get(estimate.action_id, 0)
+        rotation.dps += rate * estimate.expected_damage
+        rotation.recovery_per_second += rate * estimate.expected_recovery
+        rotation.second_moment_per_second += rate * estimate.second_moment
+    return rotation
+
+
+def time_to_kill(rotation: RotationEstimate, target_hp: float, target_regen: float = 0) -> float:
+    """
+    期望擊殺時間 (更新過程近似)
+    第一次行動在0秒 擊殺時累積傷害為目標生命加上平均溢出傷害 E[X²]/(2E[X])
+    """
+    net_dps = rotation.dps - target_regen
+    if net_dps <= 0 or rotation.actions_per_second <= 0:
+        return math.inf
+    overshoot = rotation.second_moment_per_second / (2 * rotation.dps)
+    return max(0.0, (target_hp + overshoot) / net_dps - 1 / rotation.actions_per_second)
+
+
+def kill_estimate(attacker: BattleCharacter, target: BattleCharacter, target_regen: float = None) -> KillEstimate:
+    """
+    attacker 擊殺 target 的期望時間
+    魔力限制依估計的戰鬥時間反覆修正 (戰鬥越短 目前的魔力越能支撐技能)
+
+    Args:
+        target_regen: 目標每秒回復量 None時使用目標的自然恢復
+    """
+    if target_regen is None:
+        target_regen = recovery_per_second(target, "HP_Recovery", "HpRecoverySec")
+    target_hp = target.stats["HP"]
+    rotation = rotation_estimate(attacker, target)
+    ttk = time_to_kill(rotation, target_hp, target_regen)
+    for _ in range(RotationHorizonIterations):
+        if math.isinf(ttk):
+            break
+        rotation = rotation_estimate(attacker, target, max(ttk, attacker.attackTimer))
+        new_ttk = time_to_kill(rotation, target_hp, target_regen)
+        if abs(new_ttk - ttk) < FastBattleTickTime:
+            ttk = new_ttk
+            break
+        ttk = new_ttk
+    return KillEstimate(rotation, target_hp, rotation.dps - target_regen, ttk)
+
+
+def estimate_matchup(player: BattleCharacter, enemy: BattleCharacter) -> MatchupEstimate:
+    """
+    雙方 (已執行被動技能) 的期望擊殺時間 目標的回復包含自然恢復與自己攻擊的吸血
+    """
+    player_rotation = rotation_estimate(player, enemy)
+    enemy_rotation = rotation_estimate(enemy, player)
+    enemy_regen = recovery_per_second(enemy, "HP_Recovery", "HpRecoverySec") + enemy_rotation.recovery_per_second
+    player_regen = recovery_per_second(player, "HP_Recovery", "HpRecoverySec") + player_rotation.recovery_per_second
+    return MatchupEstimate(kill_estimate(player, enemy, enemy_regen), kill_estimate(enemy, player, player_regen))
+
+
+def analyze_matchup(player_spec: BattleSpec, enemy_spec: BattleSpec, game_data: GameData = None,
+                    factory: CharacterFactory = None) -> MatchupEstimate:
+    """
+    依配置建立雙方並執行被動技能後估計擊殺時間 (不進行任何模擬)
+    """
+    game_data = game_data or GameData.Instance or GameData()
+    player = create_battle_character(player_spec, game_data, factory)
+    enemy = create_battle_character(enemy_spec, game_data, factory, default_name="敵對玩家")
+    battle_log = []
+    for character in (player, enemy):
+        character.battle_log = battle_log
+        # 怪物技能資料沒有 Characteristic 無法執行被動技能
+        if character.characterType or not character.skills:
+            character.run_passive_skill()
+    return estimate_matchup(player, enemy)
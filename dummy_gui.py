@@ -3,6 +3,8 @@
 用於快速略過戰鬥時取代真正的 tkinter 元件。
 """
 
+from typing import Hashable
+
 from commonfunction import clamp
 from game_models import GameData
 
@@ -14,47 +16,71 @@ class DummyStatusEffectBar:
     """
 
     def __init__(self):
-        self.effects = []  # list of {"id": str, "stack": int, "skill": object}
-
-    def add_skill_effect(self, id: str, skill, stack_count=0):
+        self.effects = {}  # id -> {"id": 效果 handle 或 ID, "source": 來源ID, "stack": int, "skill"/"item"/"effectId": object}
+        self.sources = {}  # 來源ID -> {id: 效果} (依加入順序)
+
+    def _add(self, eff: dict):
+        """加入效果並建立來源索引 (相同 id 已存在時保留原本的效果)"""
+        if eff["id"] in self.effects:
+            return
+        self.effects[eff["id"]] = eff
+        self.sources.setdefault(eff["source"], {})[eff["id"]] = eff
+
+    def _matching(self, id: Hashable) -> list:
+        """取得 id 相同或來源ID相同的效果"""
+        matched = list(self.sources.get(id, {}).values())
+        eff = self.effects.get(id)
+        if eff is not None and eff not in matched:
+            matched.insert(0, eff)
+        return matched
+
+    def add_skill_effect(self, id: Hashable, skill, stack_count=0):
         """增加技能效果（含疊層邏輯）"""
         if stack_count > 0:
-            for eff in self.effects:
-                if eff["id"] == id:
-                    # 疊層上限來自 skill.SkillOperationDataList[0].Bonus[0]
-                    max_stack = int(skill.SkillOperationDataList[0].Bonus[0])
-                    eff["stack"] = clamp(eff["stack"] + stack_count, 0, max_stack)
-                    return
-        self.effects.append({"id": id, "stack": stack_count, "skill": skill})
-
-    def add_item_effect(self, id: str, item, stack_count=0):
+            eff = self.effects.get(id)
+            if eff is not None:
+                # 疊層上限來自 skill.SkillOperationDataList[0].Bonus[0]
+                max_stack = int(skill.SkillOperationDataList[0].Bonus[0])
+                eff["stack"] = clamp(eff["stack"] + stack_count, 0, max_stack)
+                return
+        self._add({"id": id, "source": skill.SkillID, "stack": stack_count, "skill": skill})
+
+    def add_item_effect(self, id: int, item, stack_count=0):
         """增加道具效果"""
-        self.effects.append({"id": id, "stack": stack_count, "item": item})
+        self._add({"id": id, "source": item.CodeID, "stack": stack_count, "item": item})
 
-    def add_debuff(self, id: str, effectId, stack_count=0):
+    def add_debuff(self, id: int, effectId, stack_count=0):
         """增加負面狀態效果"""
-        self.effects.append({"id": id, "stack": stack_count, "effectId": effectId})
+        self._add({"id": id, "source": effectId, "stack": stack_count, "effectId": effectId})
 
-    def remove_effect(self, id):
+    def remove_effect(self, id: Hashable):
         """移除指定 id 的效果"""
-        self.effects = [eff for eff in self.effects if eff["id"] != id]
-
-    def get_effect_stack(self, id) -> int:
-        """取得指定效果的疊層數"""
-        for eff in self.effects:
-            if eff["id"] == id or eff["id"].startswith(id):
-                return eff["stack"]
-        return 0
-
-    def set_effect_stack(self, id, target_stack):
-        """設定指定效果的疊層數"""
-        for eff in self.effects:
-            if eff["id"] == id or eff["id"].startswith(id):
-                eff["stack"] = target_stack
+        eff = self.effects.pop(id, None)
+        if eff is not None:
+            group = self.sources[eff["source"]]
+            del group[id]
+            if not group:
+                del self.sources[eff["source"]]
+
+    def get_effect_stack(self, id: Hashable) -> int:
+        """取得指定效果 (id 或來源ID) 的疊層數"""
+        eff = self.effects.get(id)
+        if eff is None:
+            group = self.sources.get(id)
+            if not group:
+                return 0
+            eff = next(iter(group.values()))
+        return eff["stack"]
+
+    def set_effect_stack(self, id: Hashable, target_stack):
+        """設定指定效果 (id 或來源ID) 的疊層數"""
+        for eff in self._matching(id):
+            eff["stack"] = target_stack
 
     def clear_bar(self):
         """清空所有效果"""
-        self.effects = []
+        self.effects = {}
+        self.sources = {}
 
 
 class DummyCharacterOverview:
@@ -69,6 +95,9 @@ class DummyCharacterOverview:
     def update_state(self, status: dict):
         self.status = status
 
+    def update_state_delta(self, changes: dict):
+        self.status.update(changes)
+
 
 class DummyItemManager:
     """
@@ -0,0 +1,501 @@
+"""
+戰鬥引擎的行為與統計一致性檢查 (不需要測試框架 固定種子 結果可重現)
+
+用法:
+    python engine_checks.py               執行全部檢查
+    python engine_checks.py exact timer   只執行名稱包含任一關鍵字的檢查
+"""
+import argparse
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from game_models import GameData
+
+
+# 檢查名稱 -> 檢查函式 (失敗時拋出 AssertionError)
+Checks: Dict[str, Callable[[], None]] = {}
+# 統計檢查使用的信賴水準 (固定種子 不會隨機失敗 放寬以容許合理的抽樣誤差)
+CheckConfidence = 0.99
+
+
+def check(func: Callable[[], None]) -> Callable[[], None]:
+    """
+    登錄檢查 (名稱為函式名稱去掉 check_)
+    """
+    Checks[func.__name__.removeprefix("check_")] = func
+    return func
+
+
+def _assert_in_interval(name: str, value: float, wins: int, total: int):
+    """
+    value 需落在 wins/total 的 Wilson 信賴區間內
+    """
+    from batch_runner import wilson_interval
+    low, high = wilson_interval(wins, total, CheckConfidence)
+    assert low <= value <= high, f"{name} {value:.4f} 不在模擬的信賴區間 [{low:.4f}, {high:.4f}] ({wins}/{total})"
+
+
+#region 到期計時器
+
+def _reference_tick(reference: Dict, with_data: bool, dt: float) -> List:
+    """
+    舊版逐 tick 遞減的計時字典 回傳這個 tick 到期的 key (依加入順序)
+    """
+    expired = []
+    for key in list(reference):
+        if with_data:
+            data, value = reference[key]
+            value = max(0, value - dt)
+            reference[key] = (data, value)
+            if value == 0:
+                expired.append(key)
+        elif reference[key] > 0:
+            reference[key] = max(0, reference[key] - dt)
+            if reference[key] == 0:
+                expired.append(key)
+    return expired
+
+
+@check
+def check_timer_dict():
+    """
+    TimerDict 與逐 tick 遞減的字典結果相同 (覆寫未到期的項目、刪除後到期、來源索引)
+    """
+    from battle_simulator import FastBattleTickTime, TimerDict, _countdown_ticks
+    dt = FastBattleTickTime
+
+    # 覆寫未到期的項目 以新的時間到期 舊的到期時間不再觸發 (浮點數逐 tick 遞減 0.5 需要 6 個 tick)
+    timers = TimerDict(with_data=True, source=str)
+    timers[1] = ("A", 0.3)
+    timers.advance()
+    timers[1] = ("A", 0.5)
+    expired_at = []
+    for tick in range(1, 10):
+        timers.advance()
+        while (key := timers.pop_expired()) is not None:
+            expired_at.append((tick, key))
+            del timers[key]
+    assert expired_at == [(_countdown_ticks(0.5, dt), 1)], expired_at
+
+    # 刪除後到期的舊項目略過 同 key 重新加入時以新的時間為準
+    timers = TimerDict(with_data=True, source=str)
+    timers[1] = ("A", 0.2)
+    timers[2] = ("A", 0.2)
+    del timers[1]
+    assert timers.keys_of("A") == [2] and timers.first_of("A") == 2
+    timers.advance(2)
+    assert timers.pop_expired() == 2 and timers.pop_expired() is None
+    del timers[2]
+    assert not timers.has_source("A") and timers.first_of("A") is None and timers.keys_of("A") == []
+    timers[1] = ("A", 0.1)
+    assert timers.next_expiry() == 1 and timers.keys_of("A") == [1]
+
+    # 小於等於0的冷卻不會到期 小於等於0的效果下一個 tick 到期
+    cooldowns = TimerDict()
+    cooldowns["skill"] = 0
+    assert cooldowns.next_expiry() is None
+    cooldowns.advance(100)
+    assert cooldowns.pop_expired() is None and cooldowns["skill"] == 0
+    effects = TimerDict(with_data=True)
+    effects["effect"] = (None, 0)
+    assert effects.next_expiry() == 1
+
+    # 隨機操作 與逐 tick 遞減的字典比較 (數值完全相同 到期順序相同 來源索引一致)
+    rng = np.random.default_rng(23)
+    values = [-1, 0, 0.1, 0.25, 0.3, 1.0, 1.7, 2.35, 3]
+    for with_data in (False, True):
+        timers = TimerDict(with_data=with_data, source=(lambda data: data) if with_data else None)
+        reference: Dict = {}
+        for step in range(3000):
+            key = int(rng.integers(8))
+            match int(rng.integers(6)):
+                case 0 | 1:
+                    value = values[rng.integers(len(values))]
+                    if with_data:
+                        value = ("S" + str(key % 3), max(0, value))
+                    timers[key] = value
+                    reference[key] = value
+                case 2 if key in reference:
+                    del timers[key]
+                    del reference[key]
+                case 3:
+                    # 到期前一次跳過多個 tick
+                    ahead = timers.next_expiry()
+                    count = int(rng.integers(1, 6)) if ahead is None else min(int(rng.integers(1, 6)), ahead - 1)
+                    if count > 0:
+                        timers.advance(count)
+                        for _ in range(count):
+                            assert not _reference_tick(reference, with_data, dt), f"步驟 {step}: 跳過的 tick 有項目到期"
+                case _:
+                    timers.advance()
+                    expired = []
+                    while (key := timers.pop_expired()) is not None:
+                        expired.append(key)
+                        del timers[key]
+                    expected = _reference_tick(reference, with_data, dt)
+                    for key in expected:
+                        del reference[key]
+                    assert expired == expected, f"步驟 {step}: 到期 {expired} != {expected}"
+            assert dict(timers.items()) == reference, f"步驟 {step}: {dict(timers.items())} != {reference}"
+            assert list(timers) == list(reference), f"步驟 {step}: 迭代順序不同"
+            if with_data:
+                for source in ("S0", "S1", "S2"):
+                    keys = [k for k, (data, _) in reference.items() if data == source]
+                    assert timers.keys_of(source) == keys, f"步驟 {step}: {source} {timers.keys_of(source)} != {keys}"
+                    assert timers.has_source(source) == bool(keys)
+                    assert timers.first_of(source) == (keys[0] if keys else None)
+
+#endregion
+
+
+#region 快速戰鬥
+
+@check
+def check_mirror_damage():
+    """
+    同名角色對戰時 雙方造成的總傷害分開計算
+    """
+    from battle_engine import BattleSpec, run_battle
+    spec = BattleSpec.from_monster("Monster_Gunn_2")
+    differs = False
+    for seed in range(20):
+        result = run_battle(spec, spec, seed=seed, log_verbosity="none")
+        assert result.player_name == result.enemy_name
+        # 勝方造成的傷害至少是敗方的最大生命 (沒有自然恢復與吸血)
+        if result.timed_out:
+            continue
+        winner_damage = result.player_damage if result.player_won else result.enemy_damage
+        loser_max_hp = (result.enemy_stats if result.player_won else result.player_stats)["MaxHP"]
+        assert winner_damage >= loser_max_hp, f"種子 {seed}: 勝方傷害 {winner_damage} 少於敗方生命 {loser_max_hp}"
+        differs |= result.player_damage != result.enemy_damage
+    assert differs, "雙方總傷害每場都相同 (可能仍以名稱合併)"
+
+
+def _battle_outcome(result) -> Tuple:
+    """
+    比對用的戰鬥結果 (勝負、時間、能力值、傷害、含時間的日誌文字)
+    """
+    log = [(x.time, str(x)) if hasattr(x, "time") else (None, x) for x in result.battle_log]
+    return (result.player_won, result.timed_out, result.duration, result.player_stats, result.enemy_stats,
+            result.player_damage, result.enemy_damage, result.player_skill_usage, result.enemy_skill_usage, log)
+
+
+@check
+def check_idle_tick_skip():
+    """
+    跳過閒置 tick 與每個 tick 都執行 pass_time 的戰鬥結果完全相同 (日誌、能力值、時間)
+    """
+    from battle_engine import BattleSpec, run_battle
+    from battle_simulator import BattleCharacter
+    scenarios = (
+        (BattleSpec.player("Human", "Sword", 10, weapons=[("Sword_Right_001", 2)],
+                           items=[("Potion_Hp_01", 3), ("ATK_Reel_01", 2)]), BattleSpec.from_monster("Monster_HardLabor_0")),
+        (BattleSpec.player("Elf", "Mage", 20, weapons=[("Mage_Both_001", 3)], items=[("Potion_Mp_01", 3)]),
+         BattleSpec.player("Human", "Knight", 20, weapons=[("Sword_Right_002", 1)])),
+        (BattleSpec.from_monster("Monster_Gunn_3"), BattleSpec.from_monster("Monster_Gunn_2")),
+    )
+
+    pass_time, idle_ticks = BattleCharacter.pass_time, BattleCharacter.idle_ticks
+    calls = [0]
+
+    def counted_pass_time(self):
+        calls[0] += 1
+        pass_time(self)
+
+    BattleCharacter.pass_time = counted_pass_time
+    try:
+        for player_spec, enemy_spec in scenarios:
+            name = f"{player_spec.job or player_spec.monster} vs {enemy_spec.job or enemy_spec.monster}"
+            for seed in range(4):
+                calls[0] = 0
+                skipped = _battle_outcome(run_battle(player_spec, enemy_spec, seed=seed))
+                skipped_calls = calls[0]
+                # 每個 tick 都排程並執行 pass_time (不使用 skip_ticks)
+                BattleCharacter.idle_ticks = lambda self, dt: 1
+                try:
+                    calls[0] = 0
+                    stepped = _battle_outcome(run_battle(player_spec, enemy_spec, seed=seed))
+                finally:
+                    BattleCharacter.idle_ticks = idle_ticks
+                assert calls[0] > skipped_calls, f"{name} 種子 {seed}: 沒有跳過任何 tick"
+                for label, a, b in zip(("勝負", "超時", "時間", "玩家能力值", "敵人能力值", "玩家傷害", "敵人傷害",
+                                        "玩家技能次數", "敵人技能次數"), skipped, stepped):
+                    assert a == b, f"{name} 種子 {seed} {label}: 跳過 {a} 逐 tick {b}"
+                for i, (a, b) in enumerate(zip(skipped[-1], stepped[-1])):
+                    assert a == b, f"{name} 種子 {seed} 日誌第 {i} 筆: 跳過 {a} 逐 tick {b}"
+                assert len(skipped[-1]) == len(stepped[-1]), f"{name} 種子 {seed}: 日誌筆數不同"
+    finally:
+        BattleCharacter.pass_time = pass_time
+
+
+@check
+def check_seed_reproducible():
+    """
+    相同種子的戰鬥結果相同 未指定種子時結果記錄的種子可重現 批次結果與工作行程數量無關
+    """
+    from batch_runner import run_batch
+    from battle_engine import BattleSpec, run_battle
+    player_spec = BattleSpec.player("Human", "Sword", 10, weapons=[("Sword_Right_001", 2)], items=[("Potion_Hp_01", 3)])
+    enemy_spec = BattleSpec.from_monster("Monster_HardLabor_0")
+    for seed in range(3):
+        first = _battle_outcome(run_battle(player_spec, enemy_spec, seed=seed))
+        assert first == _battle_outcome(run_battle(player_spec, enemy_spec, seed=seed)), f"種子 {seed}: 兩次結果不同"
+    result = run_battle(player_spec, enemy_spec)
+    assert result.seed is not None, "未指定種子時沒有記錄實際使用的種子"
+    assert _battle_outcome(result) == _battle_outcome(run_battle(player_spec, enemy_spec, seed=result.seed)), \
+        f"記錄的種子 {result.seed} 無法重現戰鬥"
+
+    # 多行程依完成順序累計 逐場的數值以排序後比較
+    single = run_batch(player_spec, enemy_spec, 60, seed=20, workers=1, chunk_size=10, engine="scalar")
+    pooled = run_batch(player_spec, enemy_spec, 60, seed=20, workers=2, chunk_size=10, engine="scalar")
+    for label in ("battles", "wins", "timeouts", "player_skill_usage", "enemy_skill_usage"):
+        a, b = getattr(single, label), getattr(pooled, label)
+        assert a == b, f"批次 {label}: 1個行程 {a} 2個行程 {b}"
+    for label in ("win_durations", "player_damage", "enemy_damage"):
+        a, b = sorted(getattr(single, label)), sorted(getattr(pooled, label))
+        assert a == b, f"批次 {label}: 1個行程與2個行程的結果不同"
+
+#endregion
+
+
+#region 向量引擎
+
+def _assert_same_mean(name: str, a: List[float], b: List[float], sigmas: float = 4.0):
+    """
+    兩組樣本的平均值差距需在合併標準誤的 sigmas 倍以內
+    """
+    error = sigmas * np.sqrt(np.var(a) / len(a) + np.var(b) / len(b)) + 1e-9
+    assert abs(np.mean(a) - np.mean(b)) <= error, f"{name}: {np.mean(a):.3f} 與 {np.mean(b):.3f} 相差超過 {error:.3f}"
+
+
+@check
+def check_vector_vs_scalar():
+    """
+    向量引擎與快速戰鬥 (固定種子) 的勝率、擊殺時間與雙方傷害在統計上一致
+    """
+    from batch_runner import run_batch
+    from battle_engine import BattleSpec
+    scenarios = (
+        (BattleSpec.player("Human", "Sword", 10, weapons=[("Sword_Right_001", 2)]), BattleSpec.from_monster("Monster_HardLabor_0")),
+        (BattleSpec.player("Human", "Sword", 5), BattleSpec.from_monster("Monster_Origin_4")),
+    )
+    for player_spec, enemy_spec in scenarios:
+        name = f"{player_spec.job} {player_spec.level} vs {enemy_spec.monster}"
+        vector = run_batch(player_spec, enemy_spec, 4000, seed=17, workers=1, engine="vector")
+        scalar = run_batch(player_spec, enemy_spec, 400, seed=17, workers=1, engine="scalar")
+        assert vector.engine == "vector", f"{name} 沒有使用向量引擎"
+        _assert_in_interval(f"{name} 向量引擎勝率", vector.win_rate, scalar.wins, scalar.battles)
+        if len(vector.win_durations) > 1 and len(scalar.win_durations) > 1:
+            _assert_same_mean(f"{name} 平均擊殺時間", vector.win_durations, scalar.win_durations)
+        _assert_same_mean(f"{name} 玩家傷害", vector.player_damage, scalar.player_damage)
+        _assert_same_mean(f"{name} 敵人傷害", vector.enemy_damage, scalar.enemy_damage)
+
+#endregion
+
+
+#region 精確解
+
+def _exact_characters(monster: str, hp: Optional[int] = None, recovery: Optional[int] = None,
+                      recovery_dmg: Optional[float] = None):
+    """
+    建立兩隻相同怪物 (已執行被動技能) 可覆寫最大生命/自然恢復/吸血
+    """
+    from battle_engine import BattleSpec, create_battle_character
+    game_data = GameData.Instance
+    characters = []
+    for name in ("A", "B"):
+        character = create_battle_character(BattleSpec.from_monster(monster, name=name), game_data)
+        character.battle_log = []
+        character.run_passive_skill()
+        if hp is not None:
+            character.stats["MaxHP"] = character.stats["HP"] = hp
+        if recovery is not None:
+            character.stats["HP_Recovery"] = recovery
+        if recovery_dmg is not None:
+            character.stats["RecoveryDmg"] = recovery_dmg
+        characters.append(character)
+    return characters
+
+
+def _simulate(make: Callable[[], Tuple], battles: int) -> Tuple[int, int, List[float]]:
+    """
+    以快速戰鬥模擬 battles 場 (種子為場次編號)
+
+    Returns:
+        (玩家勝場, 超時場數, 玩家獲勝的戰鬥時間)
+    """
+    from battle_simulator import BattleSimulator, FastBattleMaxTime
+    simulator = BattleSimulator(GameData.Instance, train_ai=False, log_verbosity="none")
+    wins, timeouts, durations = 0, 0, []
+    for seed in range(battles):
+        player, enemy = make()
+        simulator.simulate_battle_fast(player, enemy, seed=seed)
+        if simulator.timed_out:
+            timeouts += 1
+            assert simulator.battle_time == FastBattleMaxTime, f"超時的戰鬥時間為 {simulator.battle_time}"
+        if player.is_alive():
+            wins += 1
+            durations.append(simulator.battle_time)
+    return wins, timeouts, durations
+
+
+@check
+def check_exact_recover():
+    """
+    自然恢復/吸血的狀態平移 回復後不超過最大生命 總機率不變 生命0的列不受影響
+    """
+    from exact_engine import ExactBattleSolver
+    rng = np.random.default_rng(0)
+    maximum = 7
+    states = rng.random((maximum + 1, 3))
+    states[0] = 0
+    for amount in (0, 1, 3, maximum - 1, maximum, maximum + 5):
+        result = ExactBattleSolver._recover(states, amount, maximum)
+        expected = np.zeros_like(states)
+        for hp in range(1, maximum + 1):
+            expected[min(hp + amount, maximum)] += states[hp]
+        assert np.allclose(result, expected), f"回復 {amount}: {result} != {expected}"
+        assert np.isclose(result.sum(), states.sum())
+
+
+@check
+def check_exact_vs_scalar():
+    """
+    精確解的勝率與擊殺時間分位數 與固定種子的快速戰鬥模擬一致
+    """
+    from batch_runner import run_batch
+    from battle_engine import BattleSpec
+    from damage_analysis import attack_delay
+    from exact_engine import solve_exact_battle
+    battles = 600
+    for player_monster, enemy_monster in (("Monster_Test_0", "Monster_Test_0"), ("Monster_Gunn_3", "Monster_Gunn_2")):
+        player_spec, enemy_spec = BattleSpec.from_monster(player_monster), BattleSpec.from_monster(enemy_monster)
+        exact = solve_exact_battle(player_spec, enemy_spec)
+        stats = run_batch(player_spec, enemy_spec, battles, seed=22, workers=1, engine="scalar")
+        name = f"{player_monster} vs {enemy_monster}"
+        _assert_in_interval(f"{name} 勝率", exact.win_probability, stats.wins, stats.battles)
+
+        # 擊殺時間是攻擊時間點的離散值 分位數最多差一次攻擊間隔
+        exact_ttk = exact.summary()["time_to_kill"]
+        simulated_ttk = stats.summary()["time_to_kill"]
+        tolerance = attack_delay(_exact_characters(player_monster)[0], 1) + 1e-9
+        for key in ("p25", "p50", "p75"):
+            assert abs(exact_ttk[key] - simulated_ttk[key]) <= tolerance, \
+                f"{name} 擊殺時間 {key}: 精確 {exact_ttk[key]:.3f} 模擬 {simulated_ttk[key]:.3f}"
+        error = 3 * simulated_ttk["std"] / np.sqrt(len(stats.win_durations)) + 1e-9
+        assert abs(exact_ttk["mean"] - simulated_ttk["mean"]) <= error, \
+            f"{name} 平均擊殺時間: 精確 {exact_ttk['mean']:.3f} 模擬 {simulated_ttk['mean']:.3f}"
+
+    # 自然恢復與吸血 (回復到最大生命時截斷)
+    from exact_engine import ExactBattleSolver
+    make = lambda: _exact_characters("Monster_Test_0", recovery=4, recovery_dmg=40)
+    exact = ExactBattleSolver(*make()).solve()
+    wins, _, durations = _simulate(make, 400)
+    _assert_in_interval("自然恢復與吸血 勝率", exact.win_probability, wins, 400)
+    mean = exact.summary()["time_to_kill"]["mean"]
+    error = 3 * np.std(durations) / np.sqrt(len(durations))
+    assert abs(mean - np.mean(durations)) <= error, f"自然恢復與吸血 平均擊殺時間: 精確 {mean:.3f} 模擬 {np.mean(durations):.3f}"
+
+
+@check
+def check_exact_timeout():
+    """
+    戰鬥時間上限 超時以玩家存活記為獲勝 時間記為上限 分出勝負後下一個事件超過上限也記為超時
+    """
+    from battle_simulator import FastBattleMaxTime
+    from exact_engine import ExactBattleSolver
+
+    # 生命足夠撐過時間上限 每場都超時
+    make = lambda: _exact_characters("Monster_Test_0", hp=800)
+    exact = ExactBattleSolver(*make()).solve()
+    assert np.isclose(exact.timeout_probability, 1.0), exact.timeout_probability
+    assert np.isclose(exact.win_durations.get(FastBattleMaxTime, 0.0), 1.0), exact.win_durations.get(FastBattleMaxTime)
+    wins, timeouts, _ = _simulate(make, 5)
+    assert wins == timeouts == 5, f"模擬 {wins} 勝 {timeouts} 超時"
+
+    # 約一半的戰鬥在時間上限附近分出勝負或超時
+    make = lambda: _exact_characters("Monster_Test_0", hp=655)
+    exact = ExactBattleSolver(*make()).solve()
+    assert 0.1 < exact.timeout_probability < 0.9, exact.timeout_probability
+    assert np.isclose(exact.win_probability + exact.loss_probability, 1.0)
+    battles = 150
+    wins, timeouts, _ = _simulate(make, battles)
+    _assert_in_interval("超時 勝率", exact.win_probability, wins, battles)
+    _assert_in_interval("超時比例", exact.timeout_probability, timeouts, battles)
+
+#endregion
+
+
+#region 公式
+
+@check
+def check_formula():
+    """
+    公式白名單拒絕不允許的語法 陣列計算與逐元素的純量計算結果相同
+    """
+    from formula_parser import FormulaParser, compile_formula
+    rejected = [
+        "__import__('os')", "a.real", "open('x')", "[a, b]", "'text'", "lambda: 1", "max(a, key=b)",
+        "0 < a < 1", "a == b == c", "9 ** 9 ** 9", "a ** b", "2 ** 100", "a ** (1 + 1)", "pow(a, b)", "pow(a, 99)",
+        "pow(a)", "_a + 1", "a if b else c", "True",
+    ]
+    for formula in rejected:
+        try:
+            compile_formula(formula)
+        except (ValueError, SyntaxError):
+            continue
+        raise AssertionError(f"公式應被拒絕: {formula}")
+
+    rng = np.random.default_rng(25)
+    variables = {"a": rng.uniform(0.5, 50, 200), "b": rng.uniform(-20, 20, 200), "c": 3}
+    formulas = [
+        "a * c + b / 2 - a // 3 + a % 4", "sqrt(a) * pow(a, 2) + a ** -0.5", "min(a, b, c) + max(a, b) - min(a, 10)",
+        "(a > b) * a + (b <= 0) * c", "-a + +b", "(a - b) ** 3",
+    ]
+    parser = FormulaParser()
+    for formula in formulas:
+        parser.set_variables(variables)
+        array = parser.evaluate(formula)
+        scalars = []
+        for i in range(len(variables["a"])):
+            parser.set_variables({"a": float(variables["a"][i]), "b": float(variables["b"][i]), "c": variables["c"]})
+            scalars.append(parser.evaluate(formula))
+        assert np.shape(array) == (200,), f"{formula}: 陣列結果形狀 {np.shape(array)}"
+        assert np.allclose(array, scalars), f"{formula}: 陣列與純量結果不同"
+
+    # rand 陣列計算每個元素各自抽樣 且在範圍內
+    parser = FormulaParser(rng=np.random.default_rng(0))
+    parser.set_variables({"a": np.zeros(1000)})
+    values = parser.evaluate("rand(a, 10)")
+    assert values.min() >= 0 and values.max() < 10 and len(np.unique(values)) == 1000
+
+#endregion
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="戰鬥引擎一致性檢查")
+    parser.add_argument("keywords", nargs="*", help="只執行名稱包含任一關鍵字的檢查")
+    args = parser.parse_args(argv)
+
+    if GameData.Instance is None:
+        GameData()
+    selected = [name for name in Checks if not args.keywords or any(k in name for k in args.keywords)]
+    failed = []
+    for name in selected:
+        start = time.perf_counter()
+        try:
+            Checks[name]()
+        except AssertionError as e:
+            failed.append(name)
+            print(f"FAIL {name} ({time.perf_counter() - start:.1f}s): {e}")
+        else:
+            print(f"OK   {name} ({time.perf_counter() - start:.1f}s)")
+    print(f"{len(selected) - len(failed)}/{len(selected)} 通過")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+import heapq
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from battle_engine import BattleSpec, create_battle_character
+from battle_simulator import BattleCharacter, FastBattleMaxTime, FastBattleTickTime, _accumulate_ticks
+from character_factory import CharacterFactory
+from damage_analysis import AttackProfile, attack_profile, attack_delay, normal_attack_skill
+from game_models import GameData
+from skill_processor import skill_all_condition_process
+
+
+# 雙方生命值組合的狀態數上限 (超過時交給模擬)
+ExactMaxStates = 4_000_000
+# 分位數統計的百分位 (與 batch_runner 相同)
+Percentiles = [5, 25, 50, 75, 95]
+
+# 時間軸事件 (類型, 優先順序) 同時間時依優先順序 與快速戰鬥相同
+_TickEvent = ("TICK", 0)
+_PlayerAttackEvent = ("PLAYER_ATTACK", 1)
+_EnemyAttackEvent = ("ENEMY_ATTACK", 2)
+
+
+def _is_integer(value) -> bool:
+    return float(value).is_integer()
+
+
+def _can_use_skill(character: BattleCharacter, skill) -> bool:
+    """
+    技能在戰鬥中是否可能成為合法動作 (條件不成立或魔力永遠不足時一定只能普攻)
+    """
+    return skill_all_condition_process(character, skill) and skill.CastMage <= character.stats["MaxMP"]
+
+
+def check_exact_support(player: BattleCharacter, enemy: BattleCharacter) -> Optional[str]:
+    """
+    檢查戰鬥是否能以精確解計算 雙方整場都只能普攻 (雙方需已執行過被動技能)
+
+    Returns:
+        無法計算的原因 可以時回傳None
+    """
+    for character in (player, enemy):
+        if not character.characterType and character.skills:
+            return f"{character.name} 是有技能的怪物"
+        if any(s.Characteristic and _can_use_skill(character, s) for s in character.skills):
+            return f"{character.name} 可以使用主動技能"
+        if character.items:
+            return f"{character.name} 攜帶道具"
+        if character.buff_skill or character.buff_item or character.debuff_skill:
+            return f"{character.name} 有持續中的效果"
+        if character.controlled_for_attack > 0 or character.controlled_for_skill > 0:
+            return f"{character.name} 受到控制"
+        if (character.additive_buff_event.has_subscribers() or character.additive_debuff_event.has_subscribers()
+                or character.subscription_skill_event.has_subscribers()):
+            return f"{character.name} 有疊加或訂閱效果"
+        if character.stats["HP_Recovery"] < 0:
+            return f"{character.name} 自然恢復為負值"
+        if character.attackTimer <= 0:
+            return f"{character.name} 攻擊間隔不是正數"
+        if not (_is_integer(character.stats["HP"]) and _is_integer(character.stats["MaxHP"])
+                and _is_integer(character.stats["HP_Recovery"])):
+            return f"{character.name} 生命值不是整數"
+
+    for attacker, target in ((player, enemy), (enemy, player)):
+        profile = attack_profile(attacker, target, normal_attack_skill())
+        values = (profile.damage, profile.crt_damage, profile.recovery, profile.crt_recovery)
+        if not all(_is_integer(v) and v >= 0 for v in values):
+            return f"{attacker.name} 的傷害不是非負整數"
+
+    states = (player.stats["MaxHP"] + 1) * (enemy.stats["MaxHP"] + 1)
+    if states > ExactMaxStates:
+        return f"生命值狀態過多 ({int(states)})"
+    return None
+
+
+@dataclass
+class ExactBattleResult:
+    """
+    精確解的戰鬥結果分布
+    勝負與超時的判定與快速戰鬥相同: 分出勝負後的下一個事件超過時間上限時記為超時 (時間為上限) 超時以玩家是否存活判定勝負
+    """
+    win_durations: Dict[float, float] = field(default_factory=dict)  # 玩家獲勝 {戰鬥時間: 機率} (含超時)
+    loss_durations: Dict[float, float] = field(default_factory=dict)  # 玩家落敗 {戰鬥時間: 機率} (含超時)
+    timeout_probability: float = 0.0
+
+    @property
+    def win_probability(self) -> float:
+        return sum(self.win_durations.values())
+
+    @property
+    def loss_probability(self) -> float:
+        return sum(self.loss_durations.values())
+
+    @staticmethod
+    def _distribution(durations: Dict[float, float]) -> Dict[str, float]:
+        """
+        條件分布的平均、標準差與分位數 (分位數為累積機率第一次達到該百分位的時間)
+        """
+        total = sum(durations.values())
+        if total <= 0:
+            return {}
+        times = np.array(sorted(durations))
+        probabilities = np.array([durations[t] for t in times]) / total
+        mean = float(times @ probabilities)
+        result = {"mean": mean, "std": float(np.sqrt(max(0.0, (times - mean) ** 2 @ probabilities)))}
+        cumulative = np.cumsum(probabilities)
+        for p in Percentiles:
+            index = min(int(np.searchsorted(cumulative, p / 100 - 1e-12)), len(times) - 1)
+            result[f"p{p}"] = float(times[index])
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        統計結果 (欄位與 BatchStats.summary 的勝率與擊殺時間相同 可直接輸出為JSON)
+        """
+        return {
+            "engine": "exact",
+            "win_rate": self.win_probability,
+            "loss_rate": self.loss_probability,
+            "timeout_rate": self.timeout_probability,
+            "time_to_kill": self._distribution(self.win_durations),
+            "time_to_lose": self._distribution(self.loss_durations),
+        }
+
+
+class ExactBattleSolver:
+    """
+    雙方都只普攻的戰鬥 以動態規劃計算勝率與擊殺時間的精確分布
+    雙方的行動與自然恢復時間都是固定的 依快速戰鬥的事件順序建立時間軸
+    狀態為 (玩家生命, 敵人生命) 的機率矩陣 每次攻擊以 未命中/格檔 一般 暴擊 三種結果平移 (含吸血)
+    """
+
+    def __init__(self, player: BattleCharacter, enemy: BattleCharacter, game_data: GameData = None):
+        self.game_data = game_data or GameData.Instance
+        self.player = player
+        self.enemy = enemy
+        self.player_hit = attack_profile(player, enemy, normal_attack_skill())
+        self.enemy_hit = attack_profile(enemy, player, normal_attack_skill())
+        self.max_hp = (int(player.stats["MaxHP"]), int(enemy.stats["MaxHP"]))
+        self.start_hp = (int(player.stats["HP"]), int(enemy.stats["HP"]))
+        self.recovery = (int(player.stats["HP_Recovery"]), int(enemy.stats["HP_Recovery"]))
+        self.timeline = self._build_timeline()
+
+    @classmethod
+    def compile(cls, player_spec: BattleSpec, enemy_spec: BattleSpec, game_data: GameData = None,
+                factory: CharacterFactory = None) -> Tuple[Optional["ExactBattleSolver"], Optional[str]]:
+        """
+        依配置建立精確解 (先執行雙方被動技能再檢查)
+
+        Returns:
+            (精確解, 無法計算的原因) 無法計算時第一項為None
+        """
+        game_data = game_data or GameData.Instance
+        player = create_battle_character(player_spec, game_data, factory)
+        enemy = create_battle_character(enemy_spec, game_data, factory, default_name="敵對玩家")
+        battle_log = []
+        for character in (player, enemy):
+            # 有技能的怪物無法執行被動技能 (怪物技能資料沒有 Characteristic) 先排除
+            if not character.characterType and character.skills:
+                return None, f"{character.name} 是有技能的怪物"
+            character.battle_log = battle_log
+            character.run_passive_skill()
+
+        reason = check_exact_support(player, enemy)
+        if reason is not None:
+            return None, reason
+        return cls(player, enemy, game_data), None
+
+    def _build_timeline(self) -> List[Tuple[float, int, str, Tuple[bool, bool]]]:
+        """
+        依時間與優先順序排列的事件 (時間逐次累加 與快速戰鬥排程的時間相同) 包含第一個超過時間上限的事件
+        事件格式: (time, priority, event_type, (玩家是否自然恢復, 敵人是否自然恢復))
+        """
+        dt = FastBattleTickTime
+        limit = self.game_data.GameSettingDic["HpRecoverySec"].GameSettingValue
+        recovery_ticks = _accumulate_ticks(0, limit, dt)
+
+        def ticks():
+            t, index = 0.0, 0
+            while True:
+                t += dt
+                index += 1
+                regen = index % recovery_ticks == 0
+                regen_flags = (regen and self.recovery[0] > 0, regen and self.recovery[1] > 0)
+                yield t, _TickEvent[1], _TickEvent[0], regen_flags
+
+        def attacks(event: Tuple[str, int], delay: float):
+            t = 0.0
+            while True:
+                yield t, event[1], event[0], (False, False)
+                t += delay
+
+        timeline = []
+        for event in heapq.merge(ticks(), attacks(_PlayerAttackEvent, attack_delay(self.player, 1)),
+                                 attacks(_EnemyAttackEvent, attack_delay(self.enemy, 1))):
+            timeline.append(event)
+            if event[0] > FastBattleMaxTime:
+                break
+        return timeline
+
+    @staticmethod
+    def _recover(states: np.ndarray, amount: int, maximum: int) -> np.ndarray:
+        """
+        第0軸的生命回復 amount (最多回到 maximum)
+        """
+        if amount <= 0:
+            return states
+        result = np.zeros_like(states)
+        if maximum - amount >= 1:
+            result[1 + amount:maximum] = states[1:maximum - amount]
+            result[maximum] = states[maximum - amount:maximum + 1].sum(axis=0)
+        else:
+            result[maximum] = states[1:].sum(axis=0)
+        return result
+
+    @staticmethod
+    def _attack(states: np.ndarray, profile: AttackProfile, attacker_max: int) -> Tuple[np.ndarray, float]:
+        """
+        一次攻擊判定 第0軸為攻擊方生命 第1軸為防守方生命
+
+        Returns:
+            (防守方存活的狀態, 防守方在這次攻擊倒下的機率)
+        """
+        normal, crt = profile.chances()
+        result = np.zeros_like(states)
+        killed = 0.0
+        for chance, damage, recovery in ((1 - normal - crt, 0, 0), (normal, int(profile.damage), int(profile.recovery)),
+                                         (crt, int(profile.crt_damage), int(profile.crt_recovery))):
+            if chance <= 0:
+                continue
+            killed += chance * float(states[:, 1:damage + 1].sum())
+            if damage + 1 < states.shape[1]:
+                survived = ExactBattleSolver._recover(states[:, damage + 1:], recovery, attacker_max)
+                result[:, 1:states.shape[1] - damage] += chance * survived
+        return result, killed
+
+    def solve(self) -> ExactBattleResult:
+        """
+        沿時間軸推進狀態機率 記錄每個事件分出勝負的機率
+        """
+        max_p, max_e = self.max_hp
+        states = np.zeros((max_p + 1, max_e + 1))
+        states[self.start_hp] = 1.0
+        result = ExactBattleResult()
+
+        def record(durations: Dict[float, float], index: int, probability: float):
+            if probability <= 0:
+                return
+            # 分出勝負後 快速戰鬥在取出下一個事件時才結束
+            time = self.timeline[index][0]
+            next_time = self.timeline[index + 1][0]
+            if next_time > FastBattleMaxTime:
+                time = FastBattleMaxTime
+                result.timeout_probability += probability
+            durations[time] = durations.get(time, 0.0) + probability
+
+        for index, (time, _, etype, (player_regen, enemy_regen)) in enumerate(self.timeline):
+            if time > FastBattleMaxTime:
+                # 時間上限前都沒有分出勝負 超時時玩家存活 記為獲勝
+                alive = float(states.sum())
+                if alive > 0:
+                    result.win_durations[FastBattleMaxTime] = result.win_durations.get(FastBattleMaxTime, 0.0) + alive
+                    result.timeout_probability += alive
+                break
+            match etype:
+                case "TICK":
+                    if player_regen:
+                        states = self._recover(states, self.recovery[0], max_p)
+                    if enemy_regen:
+                        states = self._recover(states.T, self.recovery[1], max_e).T
+                case "PLAYER_ATTACK":
+                    states, killed = self._attack(states, self.player_hit, max_p)
+                    record(result.win_durations, index, killed)
+                case "ENEMY_ATTACK":
+                    survived, killed = self._attack(states.T, self.enemy_hit, max_e)
+                    states = survived.T
+                    record(result.loss_durations, index, killed)
+            if states.sum() <= 0:
+                break
+        return result
+
+
+def solve_exact_battle(player_spec: BattleSpec, enemy_spec: BattleSpec, game_data: GameData = None,
+                       factory: CharacterFactory = None) -> ExactBattleResult:
+    """
+    計算雙方都只普攻的戰鬥的精確結果 無法計算時拋出 ValueError
+    """
+    solver, reason = ExactBattleSolver.compile(player_spec, enemy_spec, game_data, factory)
+    if solver is None:
+        raise ValueError(f"無法計算精確解: {reason}")
+    return solver.solve()
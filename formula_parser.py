@@ -1,39 +1,156 @@
-﻿import random
-import re
+﻿import ast
 import math
-from typing import Dict
+import random
+from dataclasses import dataclass
+from functools import reduce
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+
+
+# 公式允許的語法節點 (四則運算/次方/取餘/正負號/比較/函式呼叫/變數/數值)
+FormulaAllowedNodes = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.USub, ast.UAdd,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq,
+)
+FormulaFunctionNames = ("sqrt", "pow", "min", "max", "rand")
+# 次方 (** 與 pow) 的指數只能是絕對值不超過此值的數值常數 (避免資料檔算出極大的整數)
+FormulaMaxExponent = 16
+
+# 公式字串 -> 編譯結果 (同一條公式只解析與檢查一次)
+_formula_cache: Dict[str, "CompiledFormula"] = {}
+
+
+def _scalar_functions(rng) -> Dict[str, Callable]:
+    """
+    純量計算用的函式 (與 math 模組相同)
+    """
+    uniform = rng.random if rng is not None else random.random
+    return {
+        "sqrt": math.sqrt,
+        "pow": math.pow,
+        "min": min,
+        "max": max,
+        "rand": lambda a, b: a + (b - a) * uniform(),
+    }
+
+
+def _array_functions(rng, shape: Tuple[int, ...]) -> Dict[str, Callable]:
+    """
+    NumPy 陣列計算用的函式 (逐元素計算 rand 每個元素各自抽樣)
+    """
+    generator = rng if rng is not None else np.random.default_rng()
+    return {
+        "sqrt": np.sqrt,
+        "pow": np.float_power,
+        "min": lambda *args: reduce(np.minimum, args),
+        "max": lambda *args: reduce(np.maximum, args),
+        "rand": lambda a, b: a + (np.asarray(b) - a) * generator.random(shape),
+    }
+
+
+@dataclass(frozen=True)
+class CompiledFormula:
+    """
+    編譯後的公式 (語法樹已通過白名單檢查)
+    """
+    formula: str
+    code: Any  # 編譯後的 code object
+    variables: Tuple[str, ...]  # 公式使用的變數名稱 (不含函式)
+
+    def __call__(self, variables: Dict[str, Any], rng=None):
+        """
+        計算公式 變數值可以是數值或 NumPy 陣列 (有陣列時逐元素計算並回傳陣列)
+
+        Args:
+            rng: rand() 使用的亂數產生器 純量時需有 random() 陣列時需有 random(size) (np.random.Generator)
+                 None 時使用全域亂數
+        """
+        missing = [name for name in self.variables if name not in variables]
+        if missing:
+            raise NameError(f"公式缺少變數 {missing}: {self.formula}")
+        shapes = [np.shape(variables[name]) for name in self.variables if isinstance(variables[name], np.ndarray)]
+        if shapes:
+            functions = _array_functions(rng, np.broadcast_shapes(*shapes))
+        else:
+            functions = _scalar_functions(rng)
+        namespace = {name: variables[name] for name in self.variables}
+        namespace.update(functions)
+        return eval(self.code, {"__builtins__": {}}, namespace)
+
+
+def _check_exponent(node: ast.AST, formula: str):
+    """
+    次方的指數需為絕對值不超過 FormulaMaxExponent 的數值常數 (可帶正負號)
+    """
+    match node:
+        case ast.UnaryOp(op=ast.USub() | ast.UAdd(), operand=ast.Constant(value=value)):
+            pass
+        case ast.Constant(value=value):
+            pass
+        case _:
+            raise ValueError(f"次方的指數只能是數值常數: {formula}")
+    if type(value) not in (int, float) or not abs(value) <= FormulaMaxExponent:
+        raise ValueError(f"次方的指數不能超過 {FormulaMaxExponent}: {formula}")
+
+
+def _check_node(node: ast.AST, formula: str):
+    """
+    檢查語法節點是否在白名單內 不允許時拋出 ValueError
+    """
+    if not isinstance(node, FormulaAllowedNodes):
+        raise ValueError(f"公式包含不允許的語法 {type(node).__name__}: {formula}")
+    match node:
+        case ast.Constant(value=value) if type(value) not in (int, float):
+            raise ValueError(f"公式只能使用數值常數 {value!r}: {formula}")
+        case ast.Compare(ops=ops) if len(ops) > 1:
+            # 連續比較 (a < b < c) 會以 and 串接 陣列無法判斷真假
+            raise ValueError(f"公式不能使用連續比較: {formula}")
+        case ast.BinOp(op=ast.Pow(), right=exponent) | ast.Call(func=ast.Name(id="pow"), args=[_, exponent], keywords=[]):
+            _check_exponent(exponent, formula)
+        case ast.Call(func=ast.Name(id="pow")):
+            raise ValueError(f"pow 只能有兩個位置參數: {formula}")
+        case ast.Call(func=ast.Name(id=name), keywords=[]) if name in FormulaFunctionNames:
+            pass
+        case ast.Call():
+            raise ValueError(f"公式只能呼叫 {FormulaFunctionNames}: {formula}")
+        case ast.Name(id=name) if name.startswith("_"):
+            raise ValueError(f"公式變數名稱不能以底線開頭 {name}: {formula}")
+
+
+def compile_formula(formula: str) -> CompiledFormula:
+    """
+    解析並編譯公式 (結果依公式字串快取)
+    """
+    compiled = _formula_cache.get(formula)
+    if compiled is None:
+        tree = ast.parse(formula.strip(), mode="eval")
+        for node in ast.walk(tree):
+            _check_node(node, formula)
+        variables = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and node.id not in FormulaFunctionNames and node.id not in variables:
+                variables.append(node.id)
+        compiled = CompiledFormula(formula, compile(tree, "<formula>", "eval"), tuple(variables))
+        _formula_cache[formula] = compiled
+    return compiled
+
 
 class FormulaParser:
-    def __init__(self):
-        self.variables: Dict[str, float] = {}
-        self.functions = {
-            'sqrt': math.sqrt,
-            'pow': math.pow,
-            'min': min,
-            'max': max,
-            'rand': lambda a, b: a + (b-a) * random.random()
-        }
-    
-    def set_variables(self, variables: Dict[str, float]):
+    """
+    以變數計算公式字串 (公式編譯一次後快取 變數可以是數值或 NumPy 陣列)
+    """
+    def __init__(self, rng=None):
+        self.variables: Dict[str, Any] = {}
+        self.rng = rng  # rand() 使用的亂數產生器 None 時使用全域亂數
+
+    def set_variables(self, variables: Dict[str, Any]):
         self.variables = variables
-    
-    def evaluate(self, formula: str) -> float:
+
+    def evaluate(self, formula: str) -> Any:
         try:
-            # 替換變量
-            for var, val in self.variables.items():
-                formula = re.sub(rf'\b{var}\b', str(val), formula)
-            
-            # 檢查安全性
-            if not self._is_safe(formula):
-                raise ValueError("Formula contains unsafe code")
-            
-            # 評估表達式
-            return eval(formula, {"__builtins__": None}, self.functions)
+            return compile_formula(formula)(self.variables, self.rng)
         except Exception as e:
             print(f"Error evaluating formula: {formula}")
             raise e
-    
-    def _is_safe(self, formula: str) -> bool:
-        # 簡單的安全性檢查
-        unsafe = ["import", "exec", "eval", "open", "__"]
-        return not any(word in formula for word in unsafe)
\ No newline at end of file
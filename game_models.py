@@ -1,10 +1,18 @@
-﻿import json
-from typing import List, Dict, Optional, Any
-from dataclasses import dataclass, field
+﻿import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from operator import attrgetter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Dict, Optional, Any, Tuple
+from dataclasses import dataclass, field, fields, is_dataclass
 
 
 # 基本屬性資料結構
-@dataclass
+@dataclass(slots=True)
 class BasalAttributesDataModel:
     HP: int = 0
     MP: int = 0
@@ -36,7 +44,7 @@ class BasalAttributesDataModel:
     WIS: int = 0
 
 # 技能實際運作所需資料
-@dataclass
+@dataclass(slots=True)
 class SkillOperationData:
     SkillID: str = ""
     SkillComponentID: str = ""
@@ -51,7 +59,7 @@ class SkillOperationData:
     TargetCount: int = 0
     Bonus: List[str] = None
 # 技能資料結構
-@dataclass
+@dataclass(slots=True)
 class SkillData:
     Job: str = ""
     Name: str = ""
@@ -74,14 +82,14 @@ class SkillData:
     SkillOperationDataList: List[SkillOperationData] = field(default_factory=list)
     
 # 怪物生成資料
-@dataclass
+@dataclass(slots=True)
 class MonsterSpawnDataModel:
     MonsterCodeID: str = ""
     SpawnPosX: float = 0
     SpawnPosY: float = 0
     SpawnPosZ: float = 0
 # 怪物技能資料
-@dataclass
+@dataclass(slots=True)
 class MonsterSkillDataModel:
     MonsterCodeID: str = ""
     SkillEffect: str = ""
@@ -103,7 +111,7 @@ class MonsterSkillDataModel:
     CircleDistance: float = 0
     Condition: str = ""
 # 怪物資料
-@dataclass
+@dataclass(slots=True)
 class MonsterDataModel(BasalAttributesDataModel):
     MonsterCodeID: str = ""
     Name: str = ""
@@ -138,7 +146,7 @@ class MonsterDataModel(BasalAttributesDataModel):
     # 掉落物詳情資料
 
 # 掉落物詳細資料(機率 物品ID 掉落數量等等)
-@dataclass
+@dataclass(slots=True)
 class DropItemData:
     CodeID: str = ""
     DropItemID: str = ""
@@ -146,7 +154,7 @@ class DropItemData:
     DropCountMax: int = 0
     DropCountMin: int = 0
 # 怪物掉落物資料
-@dataclass
+@dataclass(slots=True)
 class MonsterDropItemDataModel:
     AreaID: str = ""
     MonsterCodeID: str = ""
@@ -156,7 +164,7 @@ class MonsterDropItemDataModel:
 
 
 # 裝備強化屬性資料
-@dataclass
+@dataclass(slots=True)
 class ForgeData(BasalAttributesDataModel):
     CodeID: str = ""
     ForgeLv: int = 0
@@ -165,7 +173,7 @@ class ForgeData(BasalAttributesDataModel):
     DestroyedProbability: float = 0
     Redeem: int = 0
 # 道具使用後的效果資料
-@dataclass
+@dataclass(slots=True)
 class ItemEffectData:
     CodeID: str = ""
     ItemComponentID: str = ""
@@ -179,7 +187,7 @@ class ItemEffectData:
     TargetCount: int = 0
     Bonus: Any = None
 # 防具資料結構
-@dataclass
+@dataclass(slots=True)
 class ArmorDataModel(BasalAttributesDataModel):
     NeedLv: int = 0
     Name: str = ""
@@ -198,7 +206,7 @@ class ArmorDataModel(BasalAttributesDataModel):
     Price: int = 0
     ForgeConfigList: List[ForgeData] = field(default_factory=list)
 # 武器資料結構
-@dataclass
+@dataclass(slots=True)
 class WeaponDataModel(BasalAttributesDataModel):
     Lv: int = 0
     Name: str = ""
@@ -220,7 +228,7 @@ class WeaponDataModel(BasalAttributesDataModel):
     ForgeConfigList: List[ForgeData] = field(default_factory=list)
 
 # 道具資料結構
-@dataclass
+@dataclass(slots=True)
 class ItemDataModel(BasalAttributesDataModel):
     Lv: int = 0
     Name: str = ""
@@ -241,7 +249,7 @@ class ItemDataModel(BasalAttributesDataModel):
     Redeem: int = 0
 
 # 職業能力值加成
-@dataclass
+@dataclass(slots=True)
 class JobBonusDataModel:
     Job: int = 0
     STR: int = 0
@@ -253,7 +261,7 @@ class JobBonusDataModel:
     HP: float = 0.0
     MP: float = 0.0
 # 種族能力值加成
-@dataclass
+@dataclass(slots=True)
 class StatusFormulaDataModel:
     TargetStatus: str = ""
     Race: str = ""
@@ -266,7 +274,7 @@ class StatusFormulaDataModel:
     LvCondition: float = 0
 
 # 地區資料
-@dataclass
+@dataclass(slots=True)
 class AreaData:
     AreaID: str = ""
     AreaName: str =""
@@ -278,19 +286,19 @@ class AreaData:
     RecordPosZ: float = 0
 
 # 文字資料
-@dataclass
+@dataclass(slots=True)
 class GameText:
     TextID: str = ""
     TextContent: str = ""
     
 # 遊戲設定資料
-@dataclass
+@dataclass(slots=True)
 class GameSettingDataModel:
     GameSettingID: str = ""
     GameSettingValue: float = 0
 
 # 等級與經驗值的數值
-@dataclass
+@dataclass(slots=True)
 class LvAndExpDataModel:
     Lv: int = 0
     EXP: int = 0
@@ -309,165 +317,675 @@ GameSettingDic: Dict[str, GameSettingDataModel] = {}   #這開始
 AreaDataDic: Dict[str, AreaData] = {}
 ExpAndLvDic: Dict[int, LvAndExpDataModel] = {}    
 
+# 文字資料檔案列表 (這些檔案結構都相同)
+TextJsonFile = [
+        "GameText.json",
+        "StatusText.json",
+        "CommonText.json",
+        "EffectText.json",
+        "QuestText.json",
+        "TutorialText.json",
+        "JobText.json",
+        "MonsterText.json",
+        "AreaText.json",
+        "NpcText.json",
+        "ItemText.json",
+        "WeaponText.json",
+        "ArmorText.json",
+        "SkillText.json",
+]
+
+# 快照格式版本 資料模型欄位有變動時需遞增 讓舊快照失效
+SNAPSHOT_VERSION = 3
+# 快照檔頭 後面依序接著 pickle(檔頭資訊) 與 pickle(資料字典)
+SNAPSHOT_MAGIC = b"PSTSNAP\x00"
+
+# 大量重複的分類ID欄位 讀取時統一字串實體 減少記憶體用量
+InternFieldNames = ("ClassificationID", "WearPartID", "TakeHandID", "TypeID", "ASID")
+
+
+def _intern_ids(raw: dict) -> dict:
+    for key in InternFieldNames:
+        value = raw.get(key)
+        if isinstance(value, str):
+            raw[key] = sys.intern(value)
+    return raw
+
+
+# 基本屬性欄位名稱 (依資料結構宣告順序)
+BasalAttributeNames = tuple(f.name for f in fields(BasalAttributesDataModel))
+_basal_attribute_getter = attrgetter(*BasalAttributeNames)
+
+
+def get_basal_attribute_values(data: BasalAttributesDataModel) -> tuple:
+    """
+    依 BasalAttributeNames 的順序取出所有基本屬性值
+    """
+    return _basal_attribute_getter(data)
+
+
+def _merge_forge_attributes(equipment: BasalAttributesDataModel,
+                            forge: Optional[BasalAttributesDataModel]) -> BasalAttributesDataModel:
+    """
+    合併裝備本身與強化加成的基本屬性
+    """
+    if forge is None:
+        return BasalAttributesDataModel(*(value + 0 for value in get_basal_attribute_values(equipment)))
+    return BasalAttributesDataModel(*(
+        value + bonus
+        for value, bonus in zip(get_basal_attribute_values(equipment), get_basal_attribute_values(forge))
+    ))
+
+
+def _read_json(path: str):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _load_skill_data(paths: List[str]) -> Dict[str, SkillData]:
+    # 加載技能資料
+    skills_data = _read_json(paths[0])
+
+    # 處理 SkillOperationDataList
+    for skill in skills_data:
+        if "SkillOperationDataList" in skill:
+            skill["SkillOperationDataList"] = [
+                SkillOperationData(**op)
+                for op in skill["SkillOperationDataList"]
+            ]
+
+    # 轉換為 SkillData 物件
+    return {s["SkillID"]: SkillData(**s) for s in skills_data}
+
+
+def _load_monster_data(paths: List[str]) -> Dict[str, MonsterDataModel]:
+    # 加載怪物資料
+    monsters_data = _read_json(paths[0])
+
+    # 處理 MonsterSkillList
+    for monserData in monsters_data:
+        if "MonsterSkillList" in monserData:
+            monserData["MonsterSkillList"] = [
+                MonsterSkillDataModel(**op)
+                for op in monserData["MonsterSkillList"]
+            ]
+    # 處理 MonsterSpawnPosList
+    for monserData in monsters_data:
+        if "MonsterSpawnPosList" in monserData:
+            monserData["MonsterSpawnPosList"] = [
+                MonsterSpawnDataModel(**op)
+                for op in monserData["MonsterSpawnPosList"]
+            ]
+
+    # 轉換為 MonstersDataDic 物件
+    return {s["MonsterCodeID"]: MonsterDataModel(**_intern_ids(s)) for s in monsters_data}
+
+
+def _load_drop_item_data(paths: List[str]) -> Dict[str, MonsterDropItemDataModel]:
+    # 加載掉落物資料
+    dropItems_data = _read_json(paths[0])
+
+    # 處理 DropItemList
+    for dropItemData in dropItems_data:
+        if "DropItemList" in dropItemData:
+            dropItemData["DropItemList"] = [
+                DropItemData(**op)
+                for op in dropItemData["DropItemList"]
+            ]
+
+    # 轉換為 MonsterDropItemDic 物件
+    return {s["MonsterCodeID"]: MonsterDropItemDataModel(**s) for s in dropItems_data}
+
+
+def _load_armor_data(paths: List[str]) -> Dict[str, ArmorDataModel]:
+    # 加載防具資料
+    armors_data = _read_json(paths[0])
+
+    # 處理 ForgeConfigList
+    for armorData in armors_data:
+        if "ForgeConfigList" in armorData:
+            armorData["ForgeConfigList"] = [
+                ForgeData(**op)
+                for op in armorData["ForgeConfigList"]
+            ]
+
+    return {a["CodeID"]: ArmorDataModel(**_intern_ids(a)) for a in armors_data}
+
+
+def _load_weapon_data(paths: List[str]) -> Dict[str, WeaponDataModel]:
+    # 加載武器資料
+    weapons_data = _read_json(paths[0])
+
+    # 處理 ForgeConfigList
+    for weaponData in weapons_data:
+        if "ForgeConfigList" in weaponData:
+            weaponData["ForgeConfigList"] = [
+                ForgeData(**op)
+                for op in weaponData["ForgeConfigList"]
+            ]
+
+    return {a["CodeID"]: WeaponDataModel(**_intern_ids(a)) for a in weapons_data}
+
+
+def _load_item_data(paths: List[str]) -> Dict[str, ItemDataModel]:
+    # 加載道具資料
+    items_data = _read_json(paths[0])
+
+    # 處理 ItemEffectDataList
+    for itemData in items_data:
+        if "ItemEffectDataList" in itemData:
+            itemData["ItemEffectDataList"] = [
+                ItemEffectData(**op)
+                for op in itemData["ItemEffectDataList"]
+            ]
+
+    return {a["CodeID"]: ItemDataModel(**_intern_ids(a)) for a in items_data}
+
+
+def _load_job_bonus_data(paths: List[str]) -> Dict[str, JobBonusDataModel]:
+    # 加載職業加成資料
+    classes_data = _read_json(paths[0])
+    return {c["Job"]: JobBonusDataModel(**c) for c in classes_data}
+
+
+def _load_status_formula_data(paths: List[str]) -> Dict[str, StatusFormulaDataModel]:
+    # 加載種族能力值資料
+    statusFormulas_data = _read_json(paths[0])
+    return {f"{c['TargetStatus']}_{c['Race']}": StatusFormulaDataModel(**c) for c in statusFormulas_data}
+
+
+def _load_game_text_data(paths: List[str]) -> Dict[str, GameText]:
+    # 加載文字資料 (依檔案順序合併 後面的檔案覆蓋前面相同TextID)
+    gameTextDataDic = {}
+    for path in paths:
+        file = os.path.basename(path)
+        try:
+            data = _read_json(path)
+            gameTextDataDic.update({
+                item["TextID"]: GameText(**item)
+                for item in data
+            })
+        except FileNotFoundError:
+            print(f"找不到檔案: {file}")
+        except Exception as e:
+            print(f"讀取 {file} 時發生錯誤: {e}")
+    return gameTextDataDic
+
+
+def _load_game_setting_data(paths: List[str]) -> Dict[str, GameSettingDataModel]:
+    # 加載遊戲設定資料
+    gameSetting_data = _read_json(paths[0])
+    return {c["GameSettingID"]: GameSettingDataModel(**c) for c in gameSetting_data}
+
+
+def _load_area_data(paths: List[str]) -> Dict[str, AreaData]:
+    # 加載地區資料
+    areas_data = _read_json(paths[0])
+    return {c["AreaID"]: AreaData(**c) for c in areas_data}
+
+
+def _load_lv_and_exp_data(paths: List[str]) -> Dict[int, LvAndExpDataModel]:
+    # 加載等級經驗值資料
+    lvAndExp_data = _read_json(paths[0])
+    return {c["Lv"]: LvAndExpDataModel(**c) for c in lvAndExp_data}
+
+
+# 資料字典註冊表 {字典名稱: (來源檔案列表, 讀取方法)}
+TableSourceDic = {
+        "SkillDataDic": (["SkillData.json"], _load_skill_data),
+        "MonstersDataDic": (["Monster.json"], _load_monster_data),
+        "MonsterDropItemDic": (["DropItem.json"], _load_drop_item_data),
+        "ArmorsDic": (["Armor.json"], _load_armor_data),
+        "WeaponsDic": (["Weapon.json"], _load_weapon_data),
+        "ItemsDic": (["Item.json"], _load_item_data),
+        "JobBonusDic": (["JobBonus.json"], _load_job_bonus_data),
+        "StatusFormulaDic": (["StatusFormula.json"], _load_status_formula_data),
+        "GameTextDataDic": (TextJsonFile, _load_game_text_data),
+        "GameSettingDic": (["GameSetting.json"], _load_game_setting_data),
+        "AreaDataDic": (["Area.json"], _load_area_data),
+        "ExpAndLvDic": (["LvAndExp.json"], _load_lv_and_exp_data),
+}
+
+
+def _timed_load(loader, path: str):
+    """
+    讀取單一來源檔案並計時 (提供給執行緒/行程池使用 需為模組層級函式)
+
+    Returns:
+        (資料字典, 花費秒數)
+    """
+    start = time.perf_counter()
+    table = loader([path])
+    return table, time.perf_counter() - start
+
+
+def _resident_size() -> Optional[int]:
+    """
+    取得目前行程的常駐記憶體位元組數 無法取得時回傳None
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _file_digest(path: str) -> str:
+    """
+    計算檔案內容的雜湊值
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_fingerprint(path: str) -> Tuple[int, int, str]:
+    """
+    取得檔案指紋 (大小, 修改時間, 雜湊值)
+    檔案不存在時回傳 (-1, -1, "")
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return -1, -1, ""
+    return stat.st_size, stat.st_mtime_ns, _file_digest(path)
+
+
 class GameData:
+    """
+    遊戲資料
+    各個 *Dic 資料字典在第一次存取時才會讀取 (優先讀取快照 快照失效時才解析JSON)
+    需要一次讀取全部資料時呼叫 preload()
+    """
     Instance = None
     
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", use_snapshot=True, lazy=True):
         self.data_dir = data_dir
-        self.load_data()
+        self.use_snapshot = use_snapshot
+        self._load_lock = threading.RLock()
+        # 各來源檔案(或快照)的讀取時間 {檔名: 秒}
+        self.load_timings: Dict[str, float] = {}
+        # 查詢索引快取 {索引名稱: 索引}
+        self._index_cache: Dict[str, Any] = {}
+        if not lazy:
+            self.preload()
         GameData.Instance = self
 
+    def __getattr__(self, name):
+        # 只有尚未讀取的資料字典會進到這裡
+        if name in TableSourceDic:
+            return self._load_table(name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def preload(self, table_names: Optional[List[str]] = None, parallel: bool = False,
+                executor: str = "thread", max_workers: Optional[int] = None):
+        """
+        預先讀取資料字典
+
+        Args:
+            table_names: 要讀取的資料字典名稱 None時讀取全部
+            parallel: 是否將需要解析的JSON檔案分配到執行緒/行程池同時解析
+            executor: "thread" 使用執行緒池 / "process" 使用行程池
+            max_workers: 最大工作數量 None時由執行器決定
+        """
+        table_names = [name for name in (table_names or TableSourceDic) if not self.is_loaded(name)]
+        if not parallel:
+            for name in table_names:
+                getattr(self, name)
+            return
+
+        start = time.perf_counter()
+        with self._load_lock:
+            # 先讀取有效的快照 剩下的才需要解析JSON
+            pending = {}
+            for name in table_names:
+                paths = self._source_paths(TableSourceDic[name][0])
+                snapshot_start = time.perf_counter()
+                table = self._load_snapshot(name, paths) if self.use_snapshot else None
+                if table is None:
+                    pending[name] = paths
+                else:
+                    self.load_timings[f"{name}.snapshot"] = time.perf_counter() - snapshot_start
+                    setattr(self, name, table)
+
+            if pending:
+                match executor:
+                    case "thread":
+                        pool = ThreadPoolExecutor(max_workers=max_workers)
+                    case "process":
+                        pool = ProcessPoolExecutor(max_workers=max_workers)
+                    case _:
+                        raise ValueError(f"未知的執行器類型: {executor}")
+
+                with pool:
+                    # 每個檔案各自一個工作 (文字資料由多個檔案組成 合併時維持原本的檔案順序)
+                    futures = {
+                        name: [pool.submit(_timed_load, TableSourceDic[name][1], path) for path in paths]
+                        for name, paths in pending.items()
+                    }
+                    for name, paths in pending.items():
+                        table = {}
+                        for path, future in zip(paths, futures[name]):
+                            part, elapsed = future.result()
+                            table.update(part)
+                            self.load_timings[os.path.basename(path)] = elapsed
+                        if self.use_snapshot:
+                            self._save_snapshot(name, paths, table)
+                        setattr(self, name, table)
+
+        self.load_timings["總計"] = time.perf_counter() - start
+
+    def report_load_timings(self):
+        """
+        輸出各檔案的讀取時間 (由慢到快)
+        """
+        for file, elapsed in sorted(self.load_timings.items(), key=lambda x: x[1], reverse=True):
+            print(f"{file:<32}{elapsed * 1000:>10.2f} ms")
+
     def load_data(self):
-        # 加載所有JSON數據
+        """
+        加載所有遊戲資料 (等同 preload())
+        """
+        self.preload()
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        計算已讀取資料字典的記憶體用量 (遞迴加總容器/資料模型內所有物件 相同物件只計算一次)
+
+        Returns:
+            {字典名稱: 位元組數}
+        """
+        seen = set()
+
+        def sizeof(obj) -> int:
+            if id(obj) in seen:
+                return 0
+            seen.add(id(obj))
+            size = sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                size += sum(sizeof(k) + sizeof(v) for k, v in obj.items())
+            elif isinstance(obj, (list, tuple, set)):
+                size += sum(sizeof(v) for v in obj)
+            elif is_dataclass(obj):
+                if hasattr(obj, "__dict__"):
+                    size += sizeof(obj.__dict__)
+                else:
+                    size += sum(sizeof(getattr(obj, f.name)) for f in fields(obj))
+            return size
+
+        return {name: sizeof(self.__dict__[name]) for name in TableSourceDic if self.is_loaded(name)}
+
+    def report_memory_usage(self):
+        """
+        輸出各資料字典的記憶體用量與目前行程的常駐記憶體
+        """
+        usage = self.memory_usage()
+        for name, size in sorted(usage.items(), key=lambda x: x[1], reverse=True):
+            print(f"{name:<24}{size / 1024:>10.1f} KiB")
+        print(f"{'總計':<24}{sum(usage.values()) / 1024:>10.1f} KiB")
+        rss = _resident_size()
+        if rss is not None:
+            print(f"{'常駐記憶體(RSS)':<24}{rss / 1024:>10.1f} KiB")
+
+    # region 查詢索引
+
+    def _get_index(self, index_name: str, builder):
+        """
+        取得查詢索引 第一次查詢時建立後快取
+        """
+        index = self._index_cache.get(index_name)
+        if index is None:
+            with self._load_lock:
+                index = self._index_cache.get(index_name)
+                if index is None:
+                    index = builder()
+                    self._index_cache[index_name] = index
+        return index
 
+    @staticmethod
+    def _build_name_index(table: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        建立 在地化名稱 -> 資料 的索引 (名稱重複時保留第一筆 與逐一搜尋的結果相同)
+        """
+        from commonfunction import get_text
+        index = {}
+        for data in table.values():
+            index.setdefault(get_text(data.Name), data)
+        return index
+
+    @staticmethod
+    def _build_group_index(table: Dict[str, Any], key_name: str) -> Dict[str, list]:
+        """
+        建立 欄位值 -> 資料列表 的索引 (列表維持原本資料字典的順序)
+        """
+        index = {}
+        for data in table.values():
+            index.setdefault(getattr(data, key_name), []).append(data)
+        return index
+
+    def find_weapon_by_name(self, name: str) -> Optional[WeaponDataModel]:
+        """
+        以在地化名稱取得武器
+        """
+        return self._get_index("WeaponName", lambda: self._build_name_index(self.WeaponsDic)).get(name)
+
+    def find_armor_by_name(self, name: str) -> Optional[ArmorDataModel]:
+        """
+        以在地化名稱取得防具
+        """
+        return self._get_index("ArmorName", lambda: self._build_name_index(self.ArmorsDic)).get(name)
+
+    def find_monster_by_name(self, name: str) -> Optional[MonsterDataModel]:
+        """
+        以在地化名稱取得怪物
+        """
+        return self._get_index("MonsterName", lambda: self._build_name_index(self.MonstersDataDic)).get(name)
+
+    def get_skills_by_job(self, job: str) -> List[SkillData]:
+        """
+        取得職業的所有技能
+        """
+        return self._get_index("SkillJob", lambda: self._build_group_index(self.SkillDataDic, "Job")).get(job, [])
+
+    def get_armor_parts(self) -> List[str]:
+        """
+        取得所有防具部位 (依防具資料出現順序)
+        """
+        return list(self._get_index("ArmorPart", lambda: self._build_group_index(self.ArmorsDic, "WearPartID")))
+
+    def get_armors_by_part(self, wear_part_id: str) -> List[ArmorDataModel]:
+        """
+        取得指定部位的所有防具
+        """
+        return self._get_index("ArmorPart", lambda: self._build_group_index(self.ArmorsDic, "WearPartID")).get(wear_part_id, [])
+
+    def get_weapons_by_take_hand(self, *take_hand_ids: str) -> List[WeaponDataModel]:
+        """
+        取得指定持握方式的所有武器 (多個持握方式時維持武器資料原本的順序)
+        """
+        index = self._get_index("WeaponTakeHand", lambda: self._build_group_index(self.WeaponsDic, "TakeHandID"))
+        if len(take_hand_ids) == 1:
+            return index.get(take_hand_ids[0], [])
+        order = self._get_index("WeaponOrder", lambda: {code: i for i, code in enumerate(self.WeaponsDic)})
+        weapons = [weapon for take_hand_id in dict.fromkeys(take_hand_ids) for weapon in index.get(take_hand_id, [])]
+        return sorted(weapons, key=lambda weapon: order[weapon.CodeID])
+
+    def _build_forge_index(self) -> Dict[Tuple[str, int], BasalAttributesDataModel]:
+        """
+        建立 (裝備CodeID, 強化等級) -> 合併能力值 的索引 (涵蓋所有武器與防具的所有強化等級)
+        """
+        index = {}
+        for equipment in (*self.WeaponsDic.values(), *self.ArmorsDic.values()):
+            for forge in equipment.ForgeConfigList:
+                # 強化等級重複時保留第一筆 (與逐一搜尋的結果相同)
+                if (equipment.CodeID, forge.ForgeLv) not in index:
+                    index[(equipment.CodeID, forge.ForgeLv)] = _merge_forge_attributes(equipment, forge)
+        return index
+
+    def get_forged_attributes(self, equipment, forge_lv: int) -> BasalAttributesDataModel:
+        """
+        取得裝備在指定強化等級的合併能力值 (裝備本身 + 該強化等級的加成)
+        沒有對應強化等級的資料時 (例如未強化) 只計算裝備本身
+        """
+        index = self._get_index("Forge", self._build_forge_index)
+        key = (equipment.CodeID, forge_lv)
+        merged = index.get(key)
+        if merged is None:
+            merged = _merge_forge_attributes(equipment, None)
+            index[key] = merged
+        return merged
+
+    def get_basal_status_table(self):
+        """
+        取得所有 (種族, 職業, 等級) 的基礎能力值表 第一次使用時讀取磁碟快取或重新計算
+        """
+        from status_matrix import BasalStatusTable
+        return self._get_index("BasalStatusTable", lambda: BasalStatusTable.load_or_build(self))
+
+    # endregion
+
+    @property
+    def data_version(self) -> str:
+        """
+        資料版本 (由所有來源檔案的大小與修改時間計算)
+        用於判斷以遊戲資料計算出的快取是否仍然有效
+        """
+        version = self.__dict__.get("_data_version")
+        if version is None:
+            digest = hashlib.blake2b(str(SNAPSHOT_VERSION).encode(), digest_size=8)
+            for source_files, _ in TableSourceDic.values():
+                for path in self._source_paths(source_files):
+                    try:
+                        stat = os.stat(path)
+                        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+                    except FileNotFoundError:
+                        digest.update(f"{os.path.basename(path)}:-1;".encode())
+            version = digest.hexdigest()
+            self._data_version = version
+        return version
+
+    def is_loaded(self, name: str) -> bool:
+        """
+        資料字典是否已讀取
+        """
+        return name in self.__dict__
+
+    def _load_table(self, name: str):
+        """
+        讀取單一資料字典
+        來源檔案沒有變動時直接讀取二進位快照 否則重新解析JSON並寫入新快照
+        """
+        with self._load_lock:
+            # 其他執行緒可能已經讀取完成
+            if name in self.__dict__:
+                return self.__dict__[name]
+
+            source_files, loader = TableSourceDic[name]
+            paths = self._source_paths(source_files)
+
+            start = time.perf_counter()
+            table = self._load_snapshot(name, paths) if self.use_snapshot else None
+            if table is not None:
+                self.load_timings[f"{name}.snapshot"] = time.perf_counter() - start
+            else:
+                # 逐檔讀取並依順序合併 與 loader(paths) 結果相同 但可以記錄每個檔案的時間
+                table = {}
+                for path in paths:
+                    part, elapsed = _timed_load(loader, path)
+                    table.update(part)
+                    self.load_timings[os.path.basename(path)] = elapsed
+                if self.use_snapshot:
+                    self._save_snapshot(name, paths, table)
+
+            setattr(self, name, table)
+            return table
+
+    def _source_paths(self, source_files: List[str]) -> List[str]:
+        """
+        取得來源檔案的路徑
+        """
         from commonfunction import get_data_path
-        # 加載技能資料
-        with open(get_data_path("data","SkillData.json"), encoding="utf-8") as f:
-            skills_data = json.load(f)
-
-            # 處理 SkillOperationDataList
-            for skill in skills_data:
-                if "SkillOperationDataList" in skill:
-                    skill["SkillOperationDataList"] = [
-                        SkillOperationData(**op)
-                        for op in skill["SkillOperationDataList"]
-                    ]
-
-            # 轉換為 SkillData 物件
-            self.SkillDataDic = {s["SkillID"]: SkillData(**s) for s in skills_data}
-
-        # 加載怪物資料
-        with open(get_data_path("data","Monster.json"), encoding="utf-8") as f:
-            monsters_data = json.load(f)
-
-            # 處理 MonsterSkillList
-            for monserData in monsters_data:
-                if "MonsterSkillList" in monserData:
-                    monserData["MonsterSkillList"] = [
-                        MonsterSkillDataModel(**op)
-                        for op in monserData["MonsterSkillList"]
-                    ]  
-             # 處理 MonsterSpawnPosList
-            for monserData in monsters_data:
-                if "MonsterSpawnPosList" in monserData:
-                    monserData["MonsterSpawnPosList"] = [
-                        MonsterSpawnDataModel(**op)
-                        for op in monserData["MonsterSpawnPosList"]
-                    ]
-
-            # 轉換為 MonstersDataDic 物件
-            self.MonstersDataDic = {s["MonsterCodeID"]: MonsterDataModel(**s) for s in monsters_data}
-            
-        # 加載掉落物資料
-        with open(get_data_path("data","DropItem.json"), encoding="utf-8") as f:
-            dropItems_data = json.load(f)
-            
-            # 處理 DropItemList
-            for dropItemData in dropItems_data:
-                if "DropItemList" in dropItemData:
-                    dropItemData["DropItemList"] = [
-                        DropItemData(**op)
-                        for op in dropItemData["DropItemList"]
-                    ]
-
-            # 轉換為 MonsterDropItemDic 物件
-            self.MonsterDropItemDic = {s["MonsterCodeID"]: MonsterDropItemDataModel(**s) for s in dropItems_data}
-
-        # 加載防具資料
-        with open(get_data_path("data","Armor.json"), encoding="utf-8") as f:
-            armors_data = json.load(f)
-            
-            # 處理 ForgeConfigList
-            for armorData in armors_data:
-                if "ForgeConfigList" in armorData:
-                    armorData["ForgeConfigList"] = [
-                        ForgeData(**op)
-                        for op in armorData["ForgeConfigList"]
-                    ]            
-                    
-            self.ArmorsDic = {a["CodeID"]: ArmorDataModel(**a) for a in armors_data}
-            
-        # 加載武器資料
-        with open(get_data_path("data","Weapon.json"), encoding="utf-8") as f:
-            weapons_data = json.load(f)
-            
-            # 處理 ForgeConfigList
-            for weaponData in weapons_data:
-                if "ForgeConfigList" in weaponData:
-                    weaponData["ForgeConfigList"] = [
-                        ForgeData(**op)
-                        for op in weaponData["ForgeConfigList"]
-                    ]            
-                    
-            self.WeaponsDic = {a["CodeID"]: WeaponDataModel(**a) for a in weapons_data}
-            
-        # 加載道具資料
-        with open(get_data_path("data","Item.json"), encoding="utf-8") as f:
-            items_data = json.load(f)
-            
-            # 處理 ItemEffectDataList
-            for itemData in items_data:
-                if "ItemEffectDataList" in itemData:
-                    itemData["ItemEffectDataList"] = [
-                        ItemEffectData(**op)
-                        for op in itemData["ItemEffectDataList"]
-                    ]            
-                    
-            self.ItemsDic = {a["CodeID"]: ItemDataModel(**a) for a in items_data}
-            
-        # 加載職業加成資料
-        with open(get_data_path("data","JobBonus.json"), encoding="utf-8") as f:
-            classes_data = json.load(f)
-            self.JobBonusDic = {c["Job"]: JobBonusDataModel(**c) for c in classes_data}
-            
-        # 加載種族能力值資料
-        with open(get_data_path("data","StatusFormula.json"), encoding="utf-8") as f:
-            statusFormulas_data = json.load(f)
-            self.StatusFormulaDic = {f"{c['TargetStatus']}_{c['Race']}": StatusFormulaDataModel(**c) for c in statusFormulas_data}            
-            
-        # 加載文字資料
-        # 要讀取的檔案列表 (假設這些檔案結構都相同)
-        TextJsonFile = [
-                "GameText.json",
-                "StatusText.json",
-                "CommonText.json",
-                "EffectText.json",
-                "QuestText.json",
-                "TutorialText.json",
-                "JobText.json",
-                "MonsterText.json",
-                "AreaText.json",
-                "NpcText.json",
-                "ItemText.json",
-                "WeaponText.json",
-                "ArmorText.json",
-                "SkillText.json",
-        ]
-        self.GameTextDataDic = {}
-        for file in TextJsonFile:
-                try:
-                    with open(get_data_path("data",file) ,encoding="utf-8") as f:
-                        data = json.load(f)
-                        self.GameTextDataDic.update({
-                            item["TextID"]: GameText(**item)
-                            for item in data
-                        })
-                except FileNotFoundError:
-                    print(f"找不到檔案: {file}")
-                except Exception as e:
-                    print(f"讀取 {file} 時發生錯誤: {e}")          
-                    
-        # 加載遊戲設定資料
-        with open(get_data_path("data","GameSetting.json"), encoding="utf-8") as f:
-            gameSetting_data = json.load(f)
-            self.GameSettingDic = {c["GameSettingID"]: GameSettingDataModel(**c) for c in gameSetting_data}        
-            
-        # 加載地區資料
-        with open(get_data_path("data","Area.json"), encoding="utf-8") as f:
-            areas_data = json.load(f)
-            self.AreaDataDic = {c["AreaID"]: AreaData(**c) for c in areas_data}   
-            
-        # 加載地區資料
-        with open(get_data_path("data","LvAndExp.json"), encoding="utf-8") as f:
-            lvAndExp_data = json.load(f)
-            self.ExpAndLvDic = {c["Lv"]: LvAndExpDataModel(**c) for c in lvAndExp_data}   
\ No newline at end of file
+        return [get_data_path(self.data_dir, file) for file in source_files]
+
+    def _load_snapshot(self, name: str, paths: List[str]):
+        """
+        讀取資料字典的二進位快照
+
+        Returns:
+            快照有效時回傳資料字典 否則回傳None
+        """
+        from commonfunction import get_cache_path
+        snapshot_path = get_cache_path(f"{name}.snapshot")
+        if not os.path.exists(snapshot_path):
+            return None
+
+        try:
+            with open(snapshot_path, "rb") as f:
+                # 先比對檔頭 版本不同時不反序列化 (舊快照可能已經無法對應目前的資料模型)
+                if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                    return None
+                header = pickle.load(f)
+                if header.get("version") != SNAPSHOT_VERSION:
+                    return None
+                if not self._snapshot_sources_valid(header.get("sources", {}), paths):
+                    return None
+                return pickle.load(f)
+        except Exception as e:
+            print(f"讀取 {name} 快照失敗 改為讀取JSON: {e}")
+            return None
+
+    @staticmethod
+    def _snapshot_sources_valid(fingerprints: Dict[str, Tuple[int, int, str]], paths: List[str]) -> bool:
+        """
+        逐一比對來源檔案指紋 大小不同直接失效 修改時間不同時再比對雜湊
+        """
+        for path in paths:
+            saved = fingerprints.get(os.path.basename(path))
+            if saved is None:
+                return False
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # 原本就不存在的檔案 (文字檔允許缺少)
+                if saved[0] == -1:
+                    continue
+                return False
+            size, mtime_ns, digest = saved
+            if stat.st_size != size:
+                return False
+            if stat.st_mtime_ns != mtime_ns and _file_digest(path) != digest:
+                return False
+        return True
+
+    def _save_snapshot(self, name: str, paths: List[str], table):
+        """
+        將資料字典寫入二進位快照
+        """
+        from commonfunction import get_cache_path
+        header = {
+            "version": SNAPSHOT_VERSION,
+            "sources": {os.path.basename(path): _file_fingerprint(path) for path in paths},
+        }
+
+        snapshot_path = get_cache_path(f"{name}.snapshot")
+        temp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+            with open(temp_path, "wb") as f:
+                f.write(SNAPSHOT_MAGIC)
+                pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # 寫完再替換 避免其他行程讀到寫一半的快照
+            os.replace(temp_path, snapshot_path)
+        except OSError as e:
+            print(f"寫入 {name} 快照失敗: {e}")
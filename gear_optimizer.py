@@ -0,0 +1,276 @@
+import heapq
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from character_factory import CharacterFactory
+from damage_analysis import normal_attack_skill, roll_chance, stats_attack_profile
+from game_models import GameData, JobBonusDataModel, MonsterDataModel, WeaponDataModel, ArmorDataModel
+from status_matrix import StatusMatrix
+from status_operation import CharacterStatusCalculator, EquipStatusSources
+
+
+# 主手/副手可裝備的持握方式 (與介面的武器清單相同)
+MainHandTakeHands = ("RightHand", "BothHand", "SingleHand")
+OffHandTakeHands = ("SingleHand", "LeftHand")
+
+# 各目標函式使用的能力值 (數值越高越好)
+DpsStatusNames = ("MeleeATK", "MeleeHit", "Crt", "CrtDamage")
+EhpStatusNames = ("MaxHP", "DEF", "Avoid", "BlockRate", "CrtResistance", "DamageReduction")
+
+
+@dataclass
+class LoadoutResult:
+    """
+    配裝結果
+    """
+    score: float
+    weapons: List[Tuple[WeaponDataModel, int]]
+    armors: List[Tuple[ArmorDataModel, int]]
+    stats: Dict[str, Any]
+
+
+@dataclass
+class SearchStats:
+    """
+    搜尋統計
+    """
+    total_combinations: int = 0  # 全部組合數
+    nodes_visited: int = 0  # 走訪的節點數
+    leaves_evaluated: int = 0  # 實際計算目標函式的完整配裝數
+    pruned: int = 0  # 因上界不足而剪掉的分支數
+    elapsed: float = 0.0  # 花費秒數
+
+
+@dataclass
+class _Slot:
+    kind: str  # "weapon" / "armor"
+    candidates: List[Tuple[Any, int]] = field(default_factory=list)  # [(裝備, 強化等級)] None為不裝備
+    vectors: List[tuple] = field(default_factory=list)  # 各候選的能力值貢獻 (依目標函式使用的能力值)
+    attack_speeds: List[Optional[float]] = field(default_factory=list)  # 各候選武器的攻擊速度
+
+
+class GearOptimizer:
+    """
+    配裝最佳化 (分支定界)
+    依序決定主手、副手與各防具部位 以剩餘部位各自最佳的能力值估計上界 上界不超過目前第K名時剪枝
+
+    目標函式:
+        score: 能力值加權總和 (weights)
+        ehp: 對指定怪物普通攻擊的有效生命 (最大HP / 每次受擊的期望傷害比例)
+        dps: 對指定怪物普通攻擊的期望每秒傷害
+    """
+
+    def __init__(self, game_data: GameData = None):
+        self.game_data = game_data or GameData.Instance
+        self.status_matrix = StatusMatrix(self.game_data)
+        self.character_factory = CharacterFactory(self.game_data)
+
+    def _contribution(self, equipment, forge_lv: int, kind: str, status_names: Sequence[str]) -> tuple:
+        """
+        單件裝備對各能力值的貢獻
+        """
+        merged = self.game_data.get_forged_attributes(equipment, forge_lv)
+        vector = []
+        for name in status_names:
+            attribute, source = EquipStatusSources[name]
+            vector.append(getattr(merged, attribute) if source in (kind, "both") else 0)
+        return tuple(vector)
+
+    def _build_slots(self, level: int, forge_levels: Sequence[int], respect_level: bool,
+                     status_names: Sequence[str]) -> List[_Slot]:
+        """
+        建立搜尋的部位順序與各部位候選 (每個部位都可以不裝備)
+        """
+        empty = tuple(0 for _ in status_names)
+        slots = []
+
+        for take_hands in (MainHandTakeHands, OffHandTakeHands):
+            slot = _Slot("weapon", [None], [empty], [None])
+            for weapon in self.game_data.get_weapons_by_take_hand(*take_hands):
+                if respect_level and weapon.Lv > level:
+                    continue
+                for forge_lv in forge_levels:
+                    slot.candidates.append((weapon, forge_lv))
+                    slot.vectors.append(self._contribution(weapon, forge_lv, "weapon", status_names))
+                    slot.attack_speeds.append(self.game_data.GameSettingDic[weapon.ASID].GameSettingValue)
+            slots.append(slot)
+
+        for part in self.game_data.get_armor_parts():
+            slot = _Slot("armor", [None], [empty], [None])
+            for armor in self.game_data.get_armors_by_part(part):
+                if respect_level and armor.NeedLv > level:
+                    continue
+                for forge_lv in forge_levels:
+                    slot.candidates.append((armor, forge_lv))
+                    slot.vectors.append(self._contribution(armor, forge_lv, "armor", status_names))
+                    slot.attack_speeds.append(None)
+            slots.append(slot)
+        return slots
+
+    def optimize(self, race: str, jobBonusData: JobBonusDataModel, level: int, objective: str = "score",
+                 weights: Optional[Dict[str, float]] = None, monster: Optional[MonsterDataModel] = None,
+                 top_k: int = 5, forge_levels: Sequence[int] = (0,),
+                 respect_level: bool = True) -> Tuple[List[LoadoutResult], SearchStats]:
+        """
+        搜尋目標函式最高的前K組配裝
+
+        Args:
+            objective: "score" / "ehp" / "dps"
+            weights: score 使用的能力值權重 {StatusValues欄位: 權重}
+            monster: ehp / dps 使用的對象怪物
+            forge_levels: 每件裝備可考慮的強化等級
+            respect_level: 是否排除等級需求高於角色等級的裝備
+
+        Returns:
+            (由高到低的配裝結果, 搜尋統計)
+        """
+        start = time.perf_counter()
+        basal = {name: values[0].item() for name, values in
+                 self.status_matrix.compute_basal([race], [jobBonusData.Job], [level]).items()}
+
+        match objective:
+            case "score":
+                if not weights:
+                    raise ValueError("score 需要指定能力值權重")
+                unknown = [name for name in weights if name not in EquipStatusSources and name not in basal]
+                if unknown:
+                    raise ValueError(f"無法計算的能力值: {unknown}")
+                # 只有裝備會改變的能力值需要搜尋 其餘為固定值
+                status_names = [name for name in weights if name in EquipStatusSources]
+            case "ehp" | "dps":
+                if monster is None:
+                    raise ValueError(f"{objective} 需要指定對象怪物")
+                status_names = list(EhpStatusNames if objective == "ehp" else DpsStatusNames)
+                monster_stats = self.character_factory.get_monster_template(monster).stats
+            case _:
+                raise ValueError(f"未知的目標函式: {objective}")
+
+        # 角色固定的能力值 (沒有裝備時)
+        player_stats = {
+            "IncreaseDmgRate": 0, "IncreaseDmgValue": 0, "Damage": 0, "FinalDamageReductionRate": 0,
+            "BlockRate": 0, "CrtResistance": 0, "Crt": 0, "CrtDamage": 0, "DamageReduction": 0,
+        }
+        player_stats.update(basal)
+        base_vector = tuple(player_stats.get(name, 0) for name in status_names)
+        # 沒有裝備時的分數 (搜尋中只累加裝備的貢獻)
+        base_score = sum(weight * player_stats.get(name, 0) for name, weight in (weights or {}).items())
+
+        normal_skill = normal_attack_skill()
+
+        def evaluate(vector: tuple, attack_speed: float) -> float:
+            match objective:
+                case "score":
+                    return base_score + sum(weights[name] * value for name, value in zip(status_names, vector))
+                case "ehp":
+                    stats = dict(player_stats, **dict(zip(status_names, vector)))
+                    taken = stats_attack_profile(monster_stats, stats, False, normal_skill).expected_damage
+                    return math.inf if taken <= 0 else stats["MaxHP"] * monster_stats["ATK"] / taken
+                case "dps":
+                    stats = dict(player_stats, **dict(zip(status_names, vector)))
+                    return stats_attack_profile(stats, monster_stats, True, normal_skill).expected_damage * attack_speed
+
+        slots = self._build_slots(level, forge_levels, respect_level, status_names)
+
+        # 剩餘部位的最佳貢獻 (score 為線性 直接取各部位加權最大值 其他目標取各能力值的最大值)
+        if objective == "score":
+            slot_best = [max(sum(weights[n] * v for n, v in zip(status_names, vec)) for vec in slot.vectors)
+                         for slot in slots]
+        else:
+            slot_best = [tuple(max(column) for column in zip(*slot.vectors)) for slot in slots]
+        suffix_best = [None] * (len(slots) + 1)
+        suffix_best[-1] = 0 if objective == "score" else tuple(0 for _ in status_names)
+        for i in range(len(slots) - 1, -1, -1):
+            if objective == "score":
+                suffix_best[i] = suffix_best[i + 1] + slot_best[i]
+            else:
+                suffix_best[i] = tuple(a + b for a, b in zip(suffix_best[i + 1], slot_best[i]))
+        max_attack_speed = max((s for slot in slots[:2] for s in slot.attack_speeds if s is not None), default=0)
+
+        def upper_bound(depth: int, vector: tuple, partial_score: float, attack_speed: Optional[float]) -> float:
+            if objective == "score":
+                return partial_score + suffix_best[depth]
+            optimistic = tuple(a + b for a, b in zip(vector, suffix_best[depth]))
+            if objective == "ehp":
+                return evaluate(optimistic, 0)
+            # 暴擊傷害可能低於一般傷害 此時暴擊率越低越好 暴擊部分取 (最高暴擊率, 不暴擊) 兩端的較大值
+            profile = stats_attack_profile(dict(player_stats, **dict(zip(status_names, optimistic))), monster_stats,
+                                           True, normal_skill)
+            landed = roll_chance(profile.hit_value) * (1 - roll_chance(profile.block_value))
+            damage = max(profile.expected_damage, landed * profile.damage)
+            speed = player_stats["AS"] + (max_attack_speed if attack_speed is None else attack_speed)
+            return damage * speed
+
+        stats = SearchStats(total_combinations=math.prod(len(slot.candidates) for slot in slots))
+        best: List[tuple] = []  # (分數, 序號, 選擇) 的最小堆積
+        choice = [0] * len(slots)
+        counter = 0
+
+        # 候選依樂觀貢獻由高到低排序 讓較好的配裝先被找到 提早收緊下界
+        orders = []
+        for slot in slots:
+            if objective == "score":
+                keys = [sum(weights[n] * v for n, v in zip(status_names, vec)) for vec in slot.vectors]
+            else:
+                keys = [sum(vec) for vec in slot.vectors]
+            orders.append(sorted(range(len(slot.candidates)), key=lambda i: -keys[i]))
+
+        def search(depth: int, vector: tuple, partial_score: float, attack_speed: Optional[float]):
+            nonlocal counter
+            stats.nodes_visited += 1
+
+            if depth == len(slots):
+                speed = player_stats["AS"] + (attack_speed or 0)
+                score = evaluate(vector, speed) if objective != "score" else partial_score + base_score
+                stats.leaves_evaluated += 1
+                counter += 1
+                entry = (score, -counter, tuple(choice))
+                if len(best) < top_k:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+                return
+
+            if len(best) >= top_k:
+                bound = upper_bound(depth, vector, partial_score, attack_speed) \
+                    + (base_score if objective == "score" else 0)
+                if bound <= best[0][0]:
+                    stats.pruned += 1
+                    return
+
+            slot = slots[depth]
+            for i in orders[depth]:
+                candidate = slot.candidates[i]
+                # 主手為雙手武器時 副手不可裝備
+                if depth == 1 and candidate is not None:
+                    main = slots[0].candidates[choice[0]]
+                    if main is not None and main[0].TakeHandID == "BothHand":
+                        continue
+                choice[depth] = i
+                next_speed = attack_speed
+                if slot.kind == "weapon" and attack_speed is None and candidate is not None:
+                    next_speed = slot.attack_speeds[i]
+                if slot.kind == "weapon" and depth == 1 and attack_speed is None and candidate is None:
+                    next_speed = 0
+                next_vector = tuple(a + b for a, b in zip(vector, slot.vectors[i]))
+                next_score = partial_score
+                if objective == "score":
+                    next_score += sum(weights[n] * v for n, v in zip(status_names, slot.vectors[i]))
+                search(depth + 1, next_vector, next_score, next_speed)
+            choice[depth] = 0
+
+        search(0, base_vector, 0.0, None)
+
+        results = []
+        for score, _, selected in sorted(best, reverse=True):
+            weapons = [slots[d].candidates[i] for d, i in enumerate(selected)
+                       if slots[d].kind == "weapon" and slots[d].candidates[i] is not None]
+            armors = [slots[d].candidates[i] for d, i in enumerate(selected)
+                      if slots[d].kind == "armor" and slots[d].candidates[i] is not None]
+            calculator = CharacterStatusCalculator(None, weapons, armors, self.game_data)
+            character_data = calculator.create_character("", race, jobBonusData, level)
+            results.append(LoadoutResult(score, weapons, armors, character_data["stats"]))
+
+        stats.elapsed = time.perf_counter() - start
+        return results, stats
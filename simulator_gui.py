@@ -3,14 +3,13 @@ import tkinter as tk
 from tkinter import ttk, messagebox, font
 from game_models import GameData, ItemDataModel, ItemEffectData, SkillData
 from battle_simulator import BattleSimulator, BattleCharacter
+from character_factory import CharacterFactory
 from stats_analyzer import StatsAnalyzer
-from status_operation import CharacterStatusCalculator, StatusValues
 from commonfunction import get_text, clamp, load_skill_icon, load_item_icon, load_status_effect_icon
 from user_config_controller import UserConfigController
 from user_config_model import UserConfigModel
 from dummy_gui import DummyStatusEffectBar, DummyCharacterOverview, DummyItemManager
-from typing import Dict
-from dataclasses import asdict
+from typing import Dict, Hashable
 import os
 import re
 import traceback
@@ -49,6 +48,8 @@ class BattleSimulatorGUI:
 
         # 加載遊戲數據
         self.game_data = GameData()
+        # 角色建立工廠 (快取角色模板)
+        self.character_factory = CharacterFactory(self.game_data)
 
         # 用來儲存所有 UI 變數的字典
         self.vars_registry = {}
@@ -175,6 +176,8 @@ class BattleSimulatorGUI:
                 self.scrollbar.pack(side="bottom", fill="x")
 
                 self.effects = []  # 儲存技能效果UI與資料
+                self.effect_ids = {}  # 效果 handle 或 ID -> 效果 (依加入順序)
+                self.sources = {}  # 來源ID (技能ID/道具ID/狀態名稱) -> 效果 (依加入順序)
                 self.popup = None  # 暫時視窗參考
 
                 # 綁定全域點擊事件關閉 popup
@@ -188,13 +191,14 @@ class BattleSimulatorGUI:
                     widget = getattr(widget, "master", None)
                 return False
 
-            def _create_effect_widget(self, icon, name, desc, effect_id, stack_count=0):
+            def _create_effect_widget(self, icon, name, desc, effect_id: Hashable, stack_count=0, source_id=None):
                 """
                 icon: Tkinter.PhotoImage
                 name: 顯示名稱
                 desc: 說明文字
-                effect_id: 效果 ID
+                effect_id: 效果 handle 或 ID
                 stack_count: 疊層數字（0 表示不顯示）
+                source_id: 來源ID (查詢同技能/道具的疊層用)
                 """
                 # 自動依比例縮小圖示到最大 55x55
                 max_size = self.gui_ref.scaled(48*1.65) if self.gui_ref else 48
@@ -225,40 +229,43 @@ class BattleSimulatorGUI:
                 c.pack(side="left", padx=self.gui_ref.scaled(2*1.65) if self.gui_ref else 2)
 
                 # 保存資訊
-                self.effects.append({
+                eff = {
                     "id": effect_id,
+                    "source": source_id,
                     "name": name,
                     "desc": desc,
                     "widget": c,
                     "icon": icon,
                     "stack": stack_count
-                })
+                }
+                self.effects.append(eff)
+                self.effect_ids.setdefault(effect_id, []).append(eff)
+                self.sources.setdefault(source_id, []).append(eff)
 
-            def add_skill_effect(self, id: str, skill, stack_count=0):
+            def add_skill_effect(self, id: Hashable, skill, stack_count=0):
                 """
                 增加技能效果提示物件
                 """
 
                 # 疊層類型先判斷是否已存在
                 if (stack_count > 0):
-                    for eff in self.effects:
-                        if eff["id"] == id:
-                            eff["stack"] = clamp(eff["stack"] + stack_count, 0,
-                                                                int(skill.SkillOperationDataList[0].Bonus[0]))
-                            # --- 更新 Canvas 數字 ---
-                            c = eff["widget"]
-                            c.delete("stack_text")  # 刪除舊的數字
-                            if eff["stack"] > 0:
-                                max_size = self.gui_ref.scaled(48*1.65) if self.gui_ref else 48
-                                c.create_text(
-                                    max_size - 5,
-                                    max_size - 5,
-                                    text=str(eff["stack"]),
-                                    fill="black",
-                                    font=("Arial", self.gui_ref.scaled_font(10*1.65) if self.gui_ref else 10, "bold"),
-                                    tags="stack_text",  # 給標籤方便刪除
-                                )
-                            return
+                    for eff in self.effect_ids.get(id, []):
+                        eff["stack"] = clamp(eff["stack"] + stack_count, 0,
+                                                            int(skill.SkillOperationDataList[0].Bonus[0]))
+                        # --- 更新 Canvas 數字 ---
+                        c = eff["widget"]
+                        c.delete("stack_text")  # 刪除舊的數字
+                        if eff["stack"] > 0:
+                            max_size = self.gui_ref.scaled(48*1.65) if self.gui_ref else 48
+                            c.create_text(
+                                max_size - 5,
+                                max_size - 5,
+                                text=str(eff["stack"]),
+                                fill="black",
+                                font=("Arial", self.gui_ref.scaled_font(10*1.65) if self.gui_ref else 10, "bold"),
+                                tags="stack_text",  # 給標籤方便刪除
+                            )
+                        return
 
                 skillIcon = load_skill_icon(skill.Job, skill.SkillID)
                 if not skillIcon:
@@ -269,9 +276,9 @@ class BattleSimulatorGUI:
                 for op in skill.SkillOperationDataList:
                     if op.InfluenceStatus:
                         skillIntro += f"{get_text('TM_' + op.InfluenceStatus)} : {get_text('TM_' + op.AddType).format(op.EffectValue)}\n"
-                self._create_effect_widget(skillIcon, skillName, skillIntro, id, stack_count)
+                self._create_effect_widget(skillIcon, skillName, skillIntro, id, stack_count, skill.SkillID)
 
-            def add_item_effect(self, id: str, item, stack_count=0):
+            def add_item_effect(self, id: int, item, stack_count=0):
                 """
                 增加道具效果提示物件
                 """
@@ -285,50 +292,53 @@ class BattleSimulatorGUI:
                 for op in item.ItemEffectDataList:
                     if op.InfluenceStatus:
                         itemIntro += f"{get_text('TM_' + op.InfluenceStatus)} : {get_text('TM_' + op.AddType).format(op.EffectValue)}\n"
-                self._create_effect_widget(itemIcon, itemName, itemIntro, id, stack_count)
+                self._create_effect_widget(itemIcon, itemName, itemIntro, id, stack_count, item.CodeID)
 
-            def add_debuff(self, id: str, effectId, stack_count=0):
+            def add_debuff(self, id: int, effectId, stack_count=0):
                 statusEffectIcon = load_status_effect_icon(effectId)
                 if not statusEffectIcon:
                     print("讀取失敗")
                     return
                 statusEffectName = get_text(f"TM_{effectId}_Name")
                 statusEffectIntro = get_text(f"TM_{effectId}_Intro")
-                self._create_effect_widget(statusEffectIcon, statusEffectName, statusEffectIntro, id, stack_count)
+                self._create_effect_widget(statusEffectIcon, statusEffectName, statusEffectIntro, id, stack_count, effectId)
 
-            def remove_effect(self, id):
+            def remove_effect(self, id: Hashable):
                 """
                 移除一個技能效果圖示
                 """
-                for eff in self.effects:
-                    if eff["id"] == id:
-                        eff["widget"].destroy()
+                removed = self.effect_ids.pop(id, [])
+                if not removed:
+                    return
+                for eff in removed:
+                    eff["widget"].destroy()
+                    group = self.sources[eff["source"]]
+                    group.remove(eff)
+                    if not group:
+                        del self.sources[eff["source"]]
                 self.effects = [
                     eff for eff in self.effects if eff["id"] != id]
 
-            def get_effect_stack(self, id) -> int:
+            def get_effect_stack(self, id: Hashable) -> int:
                 """
-                取得指定技能當前的疊層
+                取得指定技能當前的疊層 (id 為效果 handle 或來源ID)
                 """
-                if (self.effects is not None):
-                    for eff in self.effects:
-                        if eff["id"] == id or eff["id"].startswith(id):
-                            return eff["stack"]
-                return 0
+                effects = self.effect_ids.get(id) or self.sources.get(id)
+                return effects[0]["stack"] if effects else 0
 
-            def set_effect_stack(self, id, target_stack):
+            def set_effect_stack(self, id: Hashable, target_stack):
                 """
-                設定指定技能當前的疊層
+                設定指定技能當前的疊層 (id 為效果 handle 或來源ID)
                 """
-                if (self.effects is not None):
-                    for eff in self.effects:
-                        if eff["id"] == id or eff["id"].startswith(id):
-                            eff["stack"] = target_stack
+                for eff in self.effect_ids.get(id, []) + self.sources.get(id, []):
+                    eff["stack"] = target_stack
 
             def clear_bar(self):
                 for eff in self.effects:
                     eff["widget"].destroy()
                 self.effects = []
+                self.effect_ids = {}
+                self.sources = {}
 
             def _show_popup(self, event, name, description):
                 """
@@ -605,6 +615,19 @@ class BattleSimulatorGUI:
                         row=i, column=0, sticky="w", padx=10, pady=4
                     )
 
+            def update_state_delta(self, changes: dict):
+                """只更新有變動的能力值 UI"""
+                if not self.view_window:
+                    return
+
+                for key, value in changes.items():
+                    var = self.status_labels.get(key)
+                    if var is None:
+                        # 沒有對應的 Label 時整個重建
+                        self.update_state(self.status)
+                        return
+                    var.set(f"{get_text('TM_' + key)}: {value}")
+
         # region 左側玩家設置
 
         self.player_frame = ttk.LabelFrame(self.main_frame, text="玩家設置", padding="5")
@@ -962,12 +985,7 @@ class BattleSimulatorGUI:
         # 儲存所有widget參考
         widgets_dict = {}
 
-        parts = list(
-            {
-                item.WearPartID: item.WearPartID
-                for item in GameData.Instance.ArmorsDic.values()
-            }.values()
-        )
+        parts = GameData.Instance.get_armor_parts()
         for i, part in enumerate(parts):
             ttk.Label(frame, text=(get_text(f"TM_{part}")) + " :").grid(
                 row=i, column=0, sticky=tk.W
@@ -978,8 +996,7 @@ class BattleSimulatorGUI:
                 textvariable=armor_id,
                 values=[
                     get_text(item.Name)
-                    for item in GameData.Instance.ArmorsDic.values()
-                    if item.WearPartID == part
+                    for item in GameData.Instance.get_armors_by_part(part)
                 ],
                 width=15,
             ).grid(row=i, column=1)
@@ -1000,11 +1017,7 @@ class BattleSimulatorGUI:
             row=len(parts), column=0, sticky=tk.W)
 
         # 主手武器清單
-        mainhandweapon = list(
-            weapon
-            for weapon in GameData.Instance.WeaponsDic.values()
-            if weapon.TakeHandID in ["RightHand", "BothHand", "SingleHand"]
-        )
+        mainhandweapon = GameData.Instance.get_weapons_by_take_hand("RightHand", "BothHand", "SingleHand")
         mainhandweapon_id = self.create_var(f"{prefix}_mainhandweapon_id", tk.StringVar)
         # mainhandweapon_id = tk.StringVar()
         mainhandweapon_combobox = ttk.Combobox(
@@ -1031,11 +1044,7 @@ class BattleSimulatorGUI:
         )
 
         # 副手武器清單
-        offhandweapon = list(
-            weapon
-            for weapon in GameData.Instance.WeaponsDic.values()
-            if weapon.TakeHandID in ["SingleHand", "LeftHand"]
-        )
+        offhandweapon = GameData.Instance.get_weapons_by_take_hand("SingleHand", "LeftHand")
 
         offhandweapon_id = self.create_var(f"{prefix}_offhandweapon_id", tk.StringVar)
         offhandweapon_combobox = ttk.Combobox(
@@ -1143,9 +1152,7 @@ class BattleSimulatorGUI:
             (key for key, value in self.jobNameDict.items() if value == class_name),
             None,
         )
-        jobBonusData = next(
-            (c for c in GameData.Instance.JobBonusDic.values() if c.Job == jobID), None
-        )
+        jobBonusData = GameData.Instance.JobBonusDic.get(jobID)
         # 取得職業
         if not jobBonusData:
             messagebox.showerror("錯誤", "請選擇有效的職業")
@@ -1168,14 +1175,7 @@ class BattleSimulatorGUI:
         # 創建敵人
         if self.enemy_type_var.get() == "monster":
             monster_name = self.monster_var.get()
-            monster = next(
-                (
-                    m
-                    for m in GameData.Instance.MonstersDataDic.values()
-                    if get_text(m.Name) == monster_name
-                ),
-                None,
-            )
+            monster = GameData.Instance.find_monster_by_name(monster_name)
 
             if not monster:
                 messagebox.showerror("錯誤", "請選擇有效的怪物")
@@ -1196,9 +1196,7 @@ class BattleSimulatorGUI:
                 (key for key, value in self.jobNameDict.items() if value == enemy_class_name),
                 None,
             )
-            enemy_jobBonusData = next(
-                (c for c in GameData.Instance.JobBonusDic.values() if c.Job == enemy_jobID), None
-            )
+            enemy_jobBonusData = GameData.Instance.JobBonusDic.get(enemy_jobID)
             # 創建敵對玩家
             self.enemy_character = self.create_character(
                 name="敵對玩家",
@@ -1253,31 +1251,13 @@ class BattleSimulatorGUI:
         self.weapon_list = [
             (weapon, equipment["equipment_forge_vars"][part_id].get())
             for part_id, var in equipment["equipment_vars"].items()
-            for weapon in GameData.Instance.WeaponsDic.values()
-            if get_text(weapon.Name) == var.get()
+            if (weapon := GameData.Instance.find_weapon_by_name(var.get())) is not None
         ]
 
         self.armor_list = [
             (armor, equipment["equipment_forge_vars"][part_id].get())
             for part_id, var in equipment["equipment_vars"].items()
-            for armor in GameData.Instance.ArmorsDic.values()
-            if get_text(armor.Name) == var.get()
-        ]
-
-        # 根據職業和等級計算屬性
-        calculator = CharacterStatusCalculator(
-            player_data=None,
-            weapon_list=self.weapon_list,
-            armor_list=self.armor_list,
-            game_data=GameData.Instance,
-        )
-        character_data = calculator.create_character(name, race, jobBonusData, level)
-
-        # 獲取技能
-        skills = [
-            skill
-            for skill in GameData.Instance.SkillDataDic.values()
-            if skill.Job == jobBonusData.Job
+            if (armor := GameData.Instance.find_armor_by_name(var.get())) is not None
         ]
 
         # 若未傳入 GUI 元件，使用預設的真實元件
@@ -1292,62 +1272,25 @@ class BattleSimulatorGUI:
         if character_overview is None:
             character_overview = self.enemy_overview if (name == "敵對玩家") else self.player_overview
 
-        return BattleCharacter(
-            name=character_data["name"],
-            level=character_data["level"],
+        # 相同配置(種族/職業/等級/裝備)直接使用快取的角色模板
+        return self.character_factory.create_character(
+            name=name,
+            race=race,
             jobBonusData=jobBonusData,
-            ai_id=jobBonusData.Job,
-            stats=character_data["stats"],
-            basal=character_data["basal"],
-            equip=character_data["equip"],
-            effect=character_data["effect"],
-            skills=skills,
-            equipped_weapon=self.weapon_list,
-            equipped_armor=self.armor_list,
-            characterType=True,
-            attackTimer=(1 / character_data["stats"]["AS"]),
+            level=level,
+            weapon_list=self.weapon_list,
+            armor_list=self.armor_list,
+            itemList=itemList,
             buff_bar=buff_bar,
             debuff_bar=debuff_bar,
             passive_bar=passive_bar,
-            items=itemList,
             item_manager=item_manager,
-            character_overview=character_overview
+            character_overview=character_overview,
         )
 
     def create_monster_character(self, monster,
                                 buff_bar=None, debuff_bar=None, passive_bar=None,
                                 item_manager=None, character_overview=None) -> BattleCharacter:
-        # 將怪物轉換為戰鬥角色
-        status_keys = asdict(StatusValues())
-
-        # 用來存怪物實際數值
-        stats = status_keys.copy()
-
-        # 把怪物有的欄位塞進去
-        monster_stats = {
-            "MaxHP": monster.HP,
-            "HP": monster.HP,
-            "MaxMP": monster.MP,
-            "MP": monster.MP,
-            "ATK": monster.ATK,
-            "DEF": monster.DEF,
-            "Crt": monster.Crt,
-            "CrtResistance": monster.CrtResistance,
-            "CrtDamage": 0,
-            "Avoid": monster.Avoid,
-            "Hit": monster.Hit,
-            "AtkSpeed": monster.AtkSpeed,
-            "AttackMode": monster.AttackMode,
-            "BlockRate": 0,
-            "DamageReduction": 0,
-        }
-
-        for k, v in monster_stats.items():
-            if k in stats:
-                stats[k] = v
-
-        skills = monster.MonsterSkillList
-
         # 若未傳入 GUI 元件，使用預設的真實元件
         if buff_bar is None:
             buff_bar = self.enemy_buff_status_bar
@@ -1360,26 +1303,14 @@ class BattleSimulatorGUI:
         if character_overview is None:
             character_overview = self.enemy_overview
 
-        return BattleCharacter(
-            name=get_text(f"TM_{monster.MonsterCodeID}_Name"),
-            jobBonusData=None,
-            ai_id=monster.MonsterCodeID,
-            level=monster.Lv,
-            stats=stats,
-            basal=None,
-            equip=None,
-            effect=None,
-            equipped_weapon=None,
-            equipped_armor=None,
-            skills=skills,
-            characterType=False,
-            attackTimer=1 / monster.AtkSpeed,
+        return self.character_factory.create_monster_character(
+            monster,
+            itemList=[(v["data"], v["count"]) for v in self.enemy_item_manager.carried_items.values()],
             buff_bar=buff_bar,
             debuff_bar=debuff_bar,
             passive_bar=passive_bar,
-            items=[(v["data"], v["count"]) for v in self.enemy_item_manager.carried_items.values()],
             item_manager=item_manager,
-            character_overview=character_overview
+            character_overview=character_overview,
         )
 
     def show_damage_stats(self):
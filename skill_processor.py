@@ -403,7 +403,7 @@ def skill_utility_processor(caster,op):
                 result.append(status_skill_effect_end(op, caster))
                 caster.debuff_bar.remove_effect(debuff_id)
                 del caster.debuff_skill[debuff_id]
-            caster.debuff_skill = {}
+            caster.debuff_skill.clear()
 
             result.append((battlelog_text_processor({
                 "caster_text": caster.name,
@@ -0,0 +1,251 @@
+﻿import os
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from commonfunction import get_cache_path
+from game_models import GameData, JobBonusDataModel
+from status_operation import StatusValues, StatusDefaults, StatusIndex
+
+
+# 公式係數欄位順序 (最後一欄為等級係數)
+AttributeNames = ["STR", "DEX", "INT", "AGI", "VIT", "WIS"]
+CoefficientNames = AttributeNames + ["LvCondition"]
+
+# 基礎能力值的計算項目 {StatusValues欄位: (StatusFormula的TargetStatus, 使用的係數)}
+# 使用的係數與 CharacterStatusCalculator 各個計算方法一致 公式資料中其他係數不會被計算
+BasalStatusTerms = {
+    "MeleeATK": ("MeleeATK", ["STR", "LvCondition"]),
+    "RemoteATK": ("RemoteATK", ["DEX", "LvCondition"]),
+    "MageATK": ("MageATK", ["INT", "LvCondition"]),
+    "MaxHP": ("HP", ["STR", "VIT", "LvCondition"]),
+    "MaxMP": ("MP", ["INT", "LvCondition"]),
+    "DEF": ("DEF", ["VIT", "LvCondition"]),
+    "Avoid": ("Avoid", ["DEX", "AGI"]),
+    "MeleeHit": ("MeleeHit", ["STR", "AGI", "LvCondition"]),
+    "RemoteHit": ("RemoteHit", ["DEX", "AGI", "LvCondition"]),
+    "MageHit": ("MageHit", ["INT", "AGI", "LvCondition"]),
+    "MDEF": ("MDEF", ["VIT", "WIS"]),
+    "DamageReduction": ("DamageReduction", ["VIT"]),
+    "ElementDamageIncrease": ("ElementDamageIncrease", ["INT"]),
+    "ElementDamageReduction": ("ElementDamageReduction", ["WIS"]),
+    "HP_Recovery": ("HP_Recovery", ["VIT"]),
+    "MP_Recovery": ("MP_Recovery", ["WIS"]),
+}
+BasalStatusNames = list(BasalStatusTerms)
+
+# 與種族/職業/等級無關的固定基礎值
+BasalConstantStatus = {"Speed": 1, "AS": 1}
+
+
+class StatusMatrix:
+    """
+    基礎能力值矩陣運算
+    將 StatusFormulaDic 編譯為各種族的係數矩陣 一次計算多筆 (種族, 職業, 等級) 的所有基礎能力值
+    計算結果與 CharacterStatusCalculator.create_character 的 basal 完全相同
+    """
+
+    def __init__(self, game_data: GameData = None):
+        self.game_data = game_data or GameData.Instance
+
+        # 只編譯公式齊全的種族 (缺少公式的種族在原本的計算器中同樣無法計算)
+        formula_dic = self.game_data.StatusFormulaDic
+        races = dict.fromkeys(formula.Race for formula in formula_dic.values())
+        self.races: List[str] = [
+            race for race in races
+            if all(f"{target}_{race}" in formula_dic for target, _ in BasalStatusTerms.values())
+        ]
+        self.race_index: Dict[str, int] = {race: i for i, race in enumerate(self.races)}
+
+        # 係數張量 (種族, 能力值, 係數) 計算中不使用的係數填0
+        self.coefficients = np.zeros((len(self.races), len(BasalStatusNames), len(CoefficientNames)))
+        for r, race in enumerate(self.races):
+            for s, (target, terms) in enumerate(BasalStatusTerms.values()):
+                formula = formula_dic[f"{target}_{race}"]
+                for term in terms:
+                    self.coefficients[r, s, CoefficientNames.index(term)] = getattr(formula, term)
+
+        # 職業屬性矩陣 (職業, 屬性) 與職業基礎生命/魔力
+        jobs = list(self.game_data.JobBonusDic.values())
+        self.jobs: List[str] = [job.Job for job in jobs]
+        self.job_index: Dict[str, int] = {job: i for i, job in enumerate(self.jobs)}
+        self.job_attributes = np.array([[getattr(job, name) for name in AttributeNames] for job in jobs])
+        self.job_hp = np.array([job.HP for job in jobs])
+        self.job_mp = np.array([job.MP for job in jobs])
+
+    def _to_index(self, values, index_dic: Dict[str, int], kind: str) -> np.ndarray:
+        """
+        將名稱陣列轉為索引陣列 (已經是整數陣列時直接使用)
+        """
+        array = np.asarray(values)
+        if np.issubdtype(array.dtype, np.integer):
+            return array
+        try:
+            return np.array([index_dic[value] for value in array.tolist()], dtype=np.intp)
+        except KeyError as e:
+            raise KeyError(f"沒有{kind}的能力值公式: {e.args[0]}") from None
+
+    def compute_basal(self, races: Union[Sequence[str], np.ndarray],
+                      jobs: Union[Sequence[str], np.ndarray],
+                      levels: Union[Sequence[int], np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        批次計算基礎能力值
+
+        Args:
+            races: 種族名稱 (或 self.races 的索引)
+            jobs: 職業ID (或 self.jobs 的索引)
+            levels: 等級
+
+        Returns:
+            {StatusValues欄位: 每一列的數值陣列}
+        """
+        race_idx = self._to_index(races, self.race_index, "種族")
+        job_idx = self._to_index(jobs, self.job_index, "職業")
+        levels = np.asarray(levels)
+        count = len(race_idx)
+
+        # 輸入矩陣 (列, 係數) = [STR, DEX, INT, AGI, VIT, WIS, 等級]
+        inputs = np.empty((count, len(CoefficientNames)))
+        inputs[:, :len(AttributeNames)] = self.job_attributes[job_idx]
+        inputs[:, -1] = levels
+
+        # (列, 能力值, 係數) 逐項相乘後依係數順序逐欄相加
+        # 不使用 matmul: BLAS 的加總順序不固定 四捨五入到.5邊界時可能與原本的計算不同
+        products = inputs[:, None, :] * self.coefficients[race_idx]
+        totals = products[:, :, 0]
+        for k in range(1, len(CoefficientNames)):
+            totals = totals + products[:, :, k]
+        # np.rint 與 round() 同樣是四捨六入五成雙
+        rounded = np.rint(totals).astype(np.int64)
+
+        result = {name: rounded[:, s] for s, name in enumerate(BasalStatusNames)}
+        result["MaxHP"] = result["MaxHP"] + self.job_hp[job_idx]
+        result["MaxMP"] = result["MaxMP"] + self.job_mp[job_idx]
+        result["HP"] = result["MaxHP"]
+        result["MP"] = result["MaxMP"]
+        for name, value in BasalConstantStatus.items():
+            result[name] = np.full(count, value, dtype=np.int64)
+        return result
+
+    def create_basal_status(self, race: str, jobBonusData: JobBonusDataModel, level: int) -> StatusValues:
+        """
+        計算單一角色的基礎能力值 (與 CharacterStatusCalculator 的 temp_basal_status 相同)
+        """
+        columns = self.compute_basal([race], [jobBonusData.Job], [level])
+        return StatusValues(**{name: values[0].item() for name, values in columns.items()})
+
+
+class BasalStatusTable:
+    """
+    所有 (種族, 職業, 等級) 的基礎能力值表
+    以 int32 陣列 (種族, 職業, 等級, 能力值) 存放 並在 cache 資料夾保存快取 (資料版本不同時重新計算)
+    """
+
+    CacheFileName = "BasalStatusTable.npz"
+
+    def __init__(self, races: Sequence[str], jobs: Sequence[str], min_level: int,
+                 status_names: Sequence[str], values: np.ndarray):
+        self.races: List[str] = list(races)
+        self.jobs: List[str] = list(jobs)
+        self.race_index: Dict[str, int] = {race: i for i, race in enumerate(self.races)}
+        self.job_index: Dict[str, int] = {job: i for i, job in enumerate(self.jobs)}
+        self.min_level = int(min_level)
+        self.max_level = self.min_level + values.shape[2] - 1
+        self.status_names: List[str] = list(status_names)
+        self.status_indexes: List[int] = [StatusIndex[name] for name in self.status_names]
+        self.values = values
+
+    @classmethod
+    def build(cls, game_data: GameData, status_matrix: StatusMatrix = None) -> "BasalStatusTable":
+        """
+        以 StatusMatrix 計算整張表 等級範圍取 ExpAndLvDic 的最低到最高等級
+        """
+        matrix = status_matrix or StatusMatrix(game_data)
+        min_level, max_level = min(game_data.ExpAndLvDic), max(game_data.ExpAndLvDic)
+        race_idx, job_idx, levels = np.meshgrid(
+            np.arange(len(matrix.races)), np.arange(len(matrix.jobs)), np.arange(min_level, max_level + 1),
+            indexing="ij")
+        columns = matrix.compute_basal(race_idx.ravel(), job_idx.ravel(), levels.ravel())
+
+        status_names = list(columns)
+        values = np.stack([columns[name] for name in status_names], axis=-1)
+        if values.size and (values.min() < np.iinfo(np.int32).min or values.max() > np.iinfo(np.int32).max):
+            raise OverflowError("基礎能力值超出 int32 範圍")
+        values = values.astype(np.int32).reshape(race_idx.shape + (len(status_names),))
+        return cls(matrix.races, matrix.jobs, min_level, status_names, values)
+
+    @classmethod
+    def load_or_build(cls, game_data: GameData) -> "BasalStatusTable":
+        """
+        讀取磁碟快取 快取不存在或資料版本不同時重新計算並寫入
+        """
+        if not game_data.use_snapshot:
+            return cls.build(game_data)
+
+        table = cls.load(get_cache_path(cls.CacheFileName), game_data.data_version)
+        if table is None:
+            table = cls.build(game_data)
+            table.save(get_cache_path(cls.CacheFileName), game_data.data_version)
+        return table
+
+    @classmethod
+    def load(cls, path: str, data_version: str) -> Optional["BasalStatusTable"]:
+        """
+        讀取快取檔 資料版本不同時回傳None
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if str(data["data_version"]) != data_version:
+                    return None
+                return cls(data["races"].tolist(), data["jobs"].tolist(), int(data["min_level"]),
+                           data["status_names"].tolist(), data["values"])
+        except Exception as e:
+            print(f"讀取基礎能力值表快取失敗 改為重新計算: {e}")
+            return None
+
+    def save(self, path: str, data_version: str):
+        """
+        寫入快取檔
+        """
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, "wb") as f:
+                np.savez(f, data_version=np.array(data_version), races=np.array(self.races),
+                         jobs=np.array(self.jobs), min_level=np.array(self.min_level),
+                         status_names=np.array(self.status_names), values=self.values)
+            # 寫完再替換 避免其他行程讀到寫一半的快取
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"寫入基礎能力值表快取失敗: {e}")
+
+    def lookup(self, race: str, job: str, level: int) -> Optional[StatusValues]:
+        """
+        查詢單一角色的基礎能力值
+
+        Returns:
+            表中沒有對應的種族、職業或等級時回傳None
+        """
+        r = self.race_index.get(race)
+        j = self.job_index.get(job)
+        if r is None or j is None or not self.min_level <= level <= self.max_level or level != int(level):
+            return None
+        # 以位置參數建立 StatusValues (欄位很多 關鍵字參數明顯較慢)
+        row = list(StatusDefaults)
+        for index, value in zip(self.status_indexes, self.values[r, j, int(level) - self.min_level].tolist()):
+            row[index] = value
+        return StatusValues(*row)
+
+    def level_curve(self, race: str, job: str) -> Dict[str, np.ndarray]:
+        """
+        取得種族/職業在每個等級的基礎能力值
+
+        Returns:
+            {"level": 等級陣列, StatusValues欄位: 每個等級的數值陣列}
+        """
+        values = self.values[self.race_index[race], self.job_index[job]]
+        curve = {"level": np.arange(self.min_level, self.max_level + 1)}
+        curve.update({name: values[:, s] for s, name in enumerate(self.status_names)})
+        return curve
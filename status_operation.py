@@ -1,6 +1,8 @@
-﻿from typing import Dict, List, Optional
+﻿from collections.abc import Mapping, MutableMapping
+from operator import attrgetter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass,fields
-from game_models import GameData
+from game_models import GameData, BasalAttributesDataModel, get_basal_attribute_values
 from character_status import CharacterStatus_Core, CharacterStatus_Secret, CharacterStatus_Debuff, \
     CharacterStatus_Element, MonsterStatus_Core, MonsterStatus_Debuff
 
@@ -21,6 +23,126 @@ MonsterStatus_Debuff
     pass
 
 
+# region 能力值向量
+
+# 能力值欄位的固定順序與索引
+# StatusValues 的欄位即為所有 CharacterStatus_* / MonsterStatus_* 欄位的聯集 同名欄位共用同一個索引
+StatusFieldNames: Tuple[str, ...] = tuple(f.name for f in fields(StatusValues))
+StatusIndex: Dict[str, int] = {name: i for i, name in enumerate(StatusFieldNames)}
+StatusDefaults: Tuple[Any, ...] = attrgetter(*StatusFieldNames)(StatusValues())
+_status_getter = attrgetter(*StatusFieldNames)
+
+
+class StatusVector(MutableMapping):
+    """
+    固定欄位順序的能力值向量
+    數值依 StatusIndex 的索引存放在 values 中 計算時可直接以索引讀寫
+    同時保留 dict 的介面 (stats["HP"]、in、items()) 供既有程式使用 欄位固定 不能新增或刪除
+
+    values 使用 list 而非 float64 陣列: 欄位會同時存放整數、浮點數與字串 (AttackMode)
+    效果加成是否四捨五入與戰鬥日誌的數值顯示都依賴原本的型別
+    """
+    __slots__ = ("values",)
+
+    def __init__(self, values: Optional[List[Any]] = None):
+        self.values: List[Any] = list(StatusDefaults) if values is None else values
+
+    @classmethod
+    def from_status(cls, status: StatusValues) -> "StatusVector":
+        """
+        由 StatusValues 建立
+        """
+        return cls(list(_status_getter(status)))
+
+    @classmethod
+    def from_mapping(cls, data: Mapping) -> "StatusVector":
+        """
+        由 {欄位: 數值} 建立 沒有提供的欄位使用預設值
+        """
+        vector = cls()
+        values = vector.values
+        for name, value in data.items():
+            values[StatusIndex[name]] = value
+        return vector
+
+    def to_status(self) -> StatusValues:
+        """
+        轉回 StatusValues
+        """
+        return StatusValues(*self.values)
+
+    def copy(self) -> "StatusVector":
+        return StatusVector(self.values.copy())
+
+    def __copy__(self) -> "StatusVector":
+        return self.copy()
+
+    def __getitem__(self, name: str) -> Any:
+        return self.values[StatusIndex[name]]
+
+    def __setitem__(self, name: str, value: Any):
+        self.values[StatusIndex[name]] = value
+
+    def __delitem__(self, name: str):
+        raise TypeError("能力值向量的欄位固定 無法刪除")
+
+    def __contains__(self, name: object) -> bool:
+        return name in StatusIndex
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(StatusFieldNames)
+
+    def __len__(self) -> int:
+        return len(StatusFieldNames)
+
+    def __repr__(self) -> str:
+        return f"StatusVector({dict(zip(StatusFieldNames, self.values))})"
+
+
+def to_status_vector(status) -> Optional[StatusVector]:
+    """
+    將 StatusValues / dict 轉為能力值向量 (已經是能力值向量或 None 時直接回傳)
+    """
+    if status is None or isinstance(status, StatusVector):
+        return status
+    if isinstance(status, StatusValues):
+        return StatusVector.from_status(status)
+    return StatusVector.from_mapping(status)
+
+# endregion
+
+
+# 裝備能力值來源 {StatusValues欄位: (裝備屬性欄位, 來源)}
+# 來源與 CharacterStatusCalculator 各個計算方法一致: weapon 只有武器 / armor 只有防具 / both 武器加總 + 防具加總
+EquipStatusSources = {
+    "MeleeATK": ("MeleeATK", "weapon"),
+    "RemoteATK": ("RemoteATK", "weapon"),
+    "MageATK": ("MageATK", "weapon"),
+    "MaxHP": ("HP", "both"),
+    "MaxMP": ("MP", "both"),
+    "DEF": ("DEF", "both"),
+    "Avoid": ("Avoid", "both"),
+    "MeleeHit": ("MeleeHit", "weapon"),
+    "RemoteHit": ("RemoteHit", "weapon"),
+    "MageHit": ("MageHit", "weapon"),
+    "MDEF": ("MDEF", "both"),
+    "Speed": ("Speed", "armor"),
+    "DamageReduction": ("DamageReduction", "armor"),
+    "ElementDamageIncrease": ("ElementDamageIncrease", "weapon"),
+    "ElementDamageReduction": ("ElementDamageReduction", "armor"),
+    "HP_Recovery": ("HpRecovery", "armor"),
+    "MP_Recovery": ("MpRecovery", "armor"),
+    "Crt": ("Crt", "weapon"),
+    "CrtResistance": ("CrtResistance", "armor"),
+    "CrtDamage": ("CrtDamage", "weapon"),
+    "BlockRate": ("BlockRate", "armor"),
+    "DisorderResistance": ("DisorderResistance", "armor"),
+}
+
+_equip_status_sources = [(StatusIndex[status_name], source) for status_name, (_, source) in EquipStatusSources.items()]
+_equip_attribute_getter = attrgetter(*(attribute for attribute, _ in EquipStatusSources.values()))
+
+
 class CharacterStatusCalculator:
     """
     角色屬性計算器主類別
@@ -55,7 +177,22 @@ class CharacterStatusCalculator:
         Returns:
             dict: 包含裝備加成和基礎屬性的字典
         """
-        # 按順序計算各項屬性
+        # 先加總武器與防具的合併能力值 (每件裝備只查詢一次強化索引)
+        self.weapon_status = self._sum_equipment_status(self.weapon_list)
+        self.armor_status = self._sum_equipment_status(self.armor_list)
+
+        # 基礎能力值直接查詢預先計算的能力值表 只需計算裝備加成
+        basal_status = self._lookup_basal_status()
+        if basal_status is not None:
+            self.temp_basal_status = basal_status
+            self._calculate_equip_status()
+            return {
+                "equip": self.temp_equip_status,
+                "basal": self.temp_basal_status,
+                "effect": self.temp_effect_status,
+            }
+
+        # 表中沒有的組合 (例如超出等級範圍) 按順序計算各項屬性
         self.melee_atk()  # 近戰攻擊力
         self.remote_atk()  # 遠程攻擊力
         self.mage_atk()  # 魔法攻擊力
@@ -87,6 +224,55 @@ class CharacterStatusCalculator:
             "effect": self.temp_effect_status,  # 效果影響
         }
 
+    def _lookup_basal_status(self) -> Optional[StatusValues]:
+        """
+        由能力值表取得基礎能力值 (只適用由 _create_player_data 建立的玩家數據)
+
+        Returns:
+            表中沒有對應的 (種族, 職業, 等級) 時回傳None
+        """
+        if not self.player_data or "job" not in self.player_data:
+            return None
+        return self.game_data.get_basal_status_table().lookup(
+            self.player_data["race"], self.player_data["job"], self.player_data["level"])
+
+    def _calculate_equip_status(self):
+        """
+        計算裝備提供的能力值 (與各項計算方法中的裝備加成相同)
+        """
+        # 以位置參數建立 StatusValues (欄位很多 關鍵字參數明顯較慢)
+        row = list(StatusDefaults)
+        for (index, source), weapon_value, armor_value in zip(
+                _equip_status_sources, _equip_attribute_getter(self.weapon_status),
+                _equip_attribute_getter(self.armor_status)):
+            match source:
+                case "weapon":
+                    row[index] = weapon_value
+                case "armor":
+                    row[index] = armor_value
+                case "both":
+                    row[index] = weapon_value + armor_value
+        row[StatusIndex["HP"]] = row[StatusIndex["MaxHP"]]
+        row[StatusIndex["MP"]] = row[StatusIndex["MaxMP"]]
+        self.temp_equip_status = StatusValues(*row)
+        self.attack_speed()
+
+    def _sum_equipment_status(self, equipment_list) -> BasalAttributesDataModel:
+        """
+        加總裝備列表的合併能力值 (裝備本身 + 強化加成)
+
+        Args:
+            equipment_list: [(裝備資料, 強化等級)]
+        """
+        if not equipment_list:
+            return BasalAttributesDataModel()
+        merged_list = [
+            get_basal_attribute_values(self.game_data.get_forged_attributes(equipment, forgeLv))
+            for equipment, forgeLv in equipment_list
+        ]
+        # 每個欄位各自用 sum() 加總 (與逐欄位加總的浮點數結果一致)
+        return BasalAttributesDataModel(*(sum(column) for column in zip(*merged_list)))
+
     def melee_atk(self):
         """
         計算近戰攻擊力
@@ -101,18 +287,7 @@ class CharacterStatusCalculator:
         ]
 
         # 計算裝備提供的近戰攻擊力加成
-        self.temp_equip_status.MeleeATK = sum(
-            weapon.MeleeATK
-            + next(
-                (
-                    forge.MeleeATK
-                    for forge in weapon.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for weapon , forgeLv in self.weapon_list
-        )
+        self.temp_equip_status.MeleeATK = self.weapon_status.MeleeATK
 
         # 計算基礎近戰攻擊力（根據屬性點和等級）
         self.temp_basal_status.MeleeATK = int(
@@ -131,18 +306,7 @@ class CharacterStatusCalculator:
             f"RemoteATK_{self.player_data["race"]}"
         ]
 
-        self.temp_equip_status.RemoteATK = sum(
-            weapon.RemoteATK
-            + next(
-                (
-                    forge.RemoteATK
-                    for forge in weapon.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for weapon , forgeLv in self.weapon_list
-        )
+        self.temp_equip_status.RemoteATK = self.weapon_status.RemoteATK
 
         self.temp_basal_status.RemoteATK = int(
             round(
@@ -161,18 +325,7 @@ class CharacterStatusCalculator:
             f"MageATK_{self.player_data["race"]}"
         ]
 
-        self.temp_equip_status.MageATK = sum(
-            weapon.MageATK
-            + next(
-                (
-                    forge.MageATK
-                    for forge in weapon.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for weapon , forgeLv in self.weapon_list
-        )
+        self.temp_equip_status.MageATK = self.weapon_status.MageATK
 
         self.temp_basal_status.MageATK = int(
             round(
@@ -190,30 +343,9 @@ class CharacterStatusCalculator:
             f"HP_{self.player_data["race"]}"
         ]
 
-        weapon_hp = sum(
-            weapon.HP
-            + next(
-                (
-                    forge.HP
-                    for forge in weapon.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for weapon , forgeLv in self.weapon_list
-        )
+        weapon_hp = self.weapon_status.HP
 
-        armor_hp = sum(
-            armor.HP + next(
-                (
-                forge.HP
-                for forge in armor.ForgeConfigList
-                if forge.ForgeLv == forge_lv
-                ),
-                0
-            )
-            for armor, forge_lv in self.armor_list
-        )
+        armor_hp = self.armor_status.HP
 
         self.temp_equip_status.MaxHP = weapon_hp + armor_hp
 
@@ -241,31 +373,9 @@ class CharacterStatusCalculator:
             f"MP_{self.player_data["race"]}"
         ]
 
-        weapon_mp = sum(
-            weapon.MP
-            + next(
-                (
-                    forge.MP
-                    for forge in weapon.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for weapon , forgeLv in self.weapon_list
-        )
+        weapon_mp = self.weapon_status.MP
 
-        armor_mp = sum(
-            armor.MP
-            + next(
-                (
-                    forge.MP
-                    for forge in armor.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for armor , forgeLv in self.armor_list
-        )
+        armor_mp = self.armor_status.MP
 
         self.temp_equip_status.MaxMP = weapon_mp + armor_mp
 
@@ -290,31 +400,9 @@ class CharacterStatusCalculator:
             f"DEF_{self.player_data["race"]}"
         ]
 
-        weapon_def = sum(
-            weapon.DEF
-            + next(
-                (
-                    forge.DEF
-                    for forge in weapon.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for weapon , forgeLv in self.weapon_list
-        )
+        weapon_def = self.weapon_status.DEF
 
-        armor_def = sum(
-            armor.DEF
-            + next(
-                (
-                    forge.DEF
-                    for forge in armor.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for armor , forgeLv in self.armor_list
-        )
+        armor_def = self.armor_status.DEF
 
         self.temp_equip_status.DEF = weapon_def + armor_def
 
@@ -334,31 +422,9 @@ class CharacterStatusCalculator:
         ]
 
         # 裝備迴避率加成
-        weapon_avoid = sum(
-            weapon.Avoid
-            + next(
-                (
-                    forge.Avoid
-                    for forge in weapon.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for weapon , forgeLv in self.weapon_list
-        )
+        weapon_avoid = self.weapon_status.Avoid
 
-        armor_avoid = sum(
-            armor.Avoid
-            + next(
-                (
-                    forge.Avoid
-                    for forge in armor.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for armor , forgeLv in self.armor_list
-        )
+        armor_avoid = self.armor_status.Avoid
 
         self.temp_equip_status.Avoid = weapon_avoid + armor_avoid
 
@@ -379,18 +445,7 @@ class CharacterStatusCalculator:
             f"MeleeHit_{self.player_data["race"]}"
         ]
 
-        self.temp_equip_status.MeleeHit = sum(
-            weapon.MeleeHit
-            + next(
-                (
-                    forge.MeleeHit
-                    for forge in weapon.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for weapon , forgeLv in self.weapon_list
-        )
+        self.temp_equip_status.MeleeHit = self.weapon_status.MeleeHit
 
         self.temp_basal_status.MeleeHit = int(
             round(
@@ -409,18 +464,7 @@ class CharacterStatusCalculator:
             f"RemoteHit_{self.player_data["race"]}"
         ]
 
-        self.temp_equip_status.RemoteHit = sum(
-            weapon.RemoteHit
-            + next(
-                (
-                    forge.RemoteHit
-                    for forge in weapon.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for weapon , forgeLv in self.weapon_list
-        )
+        self.temp_equip_status.RemoteHit = self.weapon_status.RemoteHit
 
         self.temp_basal_status.RemoteHit = int(
             round(
@@ -439,18 +483,7 @@ class CharacterStatusCalculator:
             f"MageHit_{self.player_data["race"]}"
         ]
 
-        self.temp_equip_status.MageHit = sum(
-            weapon.MageHit
-            + next(
-                (
-                    forge.MageHit
-                    for forge in weapon.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for weapon , forgeLv in self.weapon_list
-        )
+        self.temp_equip_status.MageHit = self.weapon_status.MageHit
 
         self.temp_basal_status.MageHit = int(
             round(
@@ -469,31 +502,9 @@ class CharacterStatusCalculator:
             f"MDEF_{self.player_data["race"]}"
         ]
 
-        weapon_mdef = sum(
-            weapon.MDEF
-            + next(
-                (
-                    forge.MDEF
-                    for forge in weapon.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for weapon , forgeLv in self.weapon_list
-        )
+        weapon_mdef = self.weapon_status.MDEF
 
-        armor_mdef = sum(
-            armor.MDEF
-            + next(
-                (
-                    forge.MDEF
-                    for forge in armor.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for armor , forgeLv in self.armor_list
-        )
+        armor_mdef = self.armor_status.MDEF
 
         self.temp_equip_status.MDEF = weapon_mdef + armor_mdef
 
@@ -507,18 +518,7 @@ class CharacterStatusCalculator:
     def speed(self):
         """計算移動速度"""
 
-        self.temp_equip_status.Speed = sum(
-            armor.Speed
-            + next(
-                (
-                    forge.Speed
-                    for forge in armor.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for armor , forgeLv in self.armor_list
-        )
+        self.temp_equip_status.Speed = self.armor_status.Speed
 
         self.temp_basal_status.Speed = 1
 
@@ -541,18 +541,7 @@ class CharacterStatusCalculator:
         ]
 
         # 裝備防禦力加成
-        armorDamageReduction = sum(
-            armor.DamageReduction
-            + next(
-                (
-                    forge.DamageReduction
-                    for forge in armor.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for armor , forgeLv in self.armor_list
-        )
+        armorDamageReduction = self.armor_status.DamageReduction
 
         self.temp_equip_status.DamageReduction = armorDamageReduction
 
@@ -568,18 +557,7 @@ class CharacterStatusCalculator:
         ]
 
         # 武器加成
-        weaponElementDamageIncrease = sum(
-            weapon.ElementDamageIncrease
-            + next(
-                (
-                    forge.ElementDamageIncrease
-                    for forge in weapon.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for weapon , forgeLv in self.weapon_list
-        )
+        weaponElementDamageIncrease = self.weapon_status.ElementDamageIncrease
 
         self.temp_equip_status.ElementDamageIncrease = weaponElementDamageIncrease
 
@@ -595,18 +573,7 @@ class CharacterStatusCalculator:
         ]
 
         # 裝備屬性傷害減免加成
-        armorElementDamageReduction = sum(
-            armor.ElementDamageReduction
-            + next(
-                (
-                    forge.ElementDamageReduction
-                    for forge in armor.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for armor , forgeLv in self.armor_list
-        )
+        armorElementDamageReduction = self.armor_status.ElementDamageReduction
 
         self.temp_equip_status.ElementDamageReduction = armorElementDamageReduction
 
@@ -622,18 +589,7 @@ class CharacterStatusCalculator:
         ]
 
         # 裝備屬性傷害減免加成
-        armorHP_Recovery = sum(
-            armor.HpRecovery
-            + next(
-                (
-                    forge.HpRecovery
-                    for forge in armor.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for armor , forgeLv in self.armor_list
-        )
+        armorHP_Recovery = self.armor_status.HpRecovery
 
         self.temp_equip_status.HP_Recovery = armorHP_Recovery
 
@@ -649,18 +605,7 @@ class CharacterStatusCalculator:
         ]
 
         # 裝備屬性傷害減免加成
-        armorMP_Recovery = sum(
-            armor.MpRecovery
-            + next(
-                (
-                    forge.MpRecovery
-                    for forge in armor.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for armor , forgeLv in self.armor_list
-        )
+        armorMP_Recovery = self.armor_status.MpRecovery
 
         self.temp_equip_status.MP_Recovery = armorMP_Recovery
 
@@ -674,18 +619,7 @@ class CharacterStatusCalculator:
         暴擊計算
         """
 
-        weapon_crt = sum(
-            weapon.Crt
-            + next(
-                (
-                    forge.Crt
-                    for forge in weapon.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for weapon , forgeLv in self.weapon_list
-        )
+        weapon_crt = self.weapon_status.Crt
 
         self.temp_equip_status.Crt = weapon_crt
 
@@ -694,18 +628,7 @@ class CharacterStatusCalculator:
         暴擊抵抗計算
         """
 
-        armor_crtResistance = sum(
-            armor.CrtResistance
-            + next(
-                (
-                    forge.CrtResistance
-                    for forge in armor.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for armor , forgeLv in self.armor_list
-        )
+        armor_crtResistance = self.armor_status.CrtResistance
 
         self.temp_equip_status.CrtResistance = armor_crtResistance
         
@@ -714,18 +637,7 @@ class CharacterStatusCalculator:
         暴擊附加傷害計算
         """
 
-        weapon_crtDamage = sum(
-            weapon.CrtDamage
-            + next(
-                (
-                    forge.CrtDamage
-                    for forge in weapon.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for weapon , forgeLv in self.weapon_list
-        )
+        weapon_crtDamage = self.weapon_status.CrtDamage
 
         self.temp_equip_status.CrtDamage = weapon_crtDamage
         
@@ -734,18 +646,7 @@ class CharacterStatusCalculator:
         格檔計算
         """
 
-        armor_blockRate = sum(
-            armor.BlockRate
-            + next(
-                (
-                    forge.BlockRate
-                    for forge in armor.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for armor , forgeLv in self.armor_list
-        )
+        armor_blockRate = self.armor_status.BlockRate
 
         self.temp_equip_status.BlockRate = armor_blockRate
         
@@ -754,18 +655,7 @@ class CharacterStatusCalculator:
         異常狀態計算
         """
 
-        armor_disorderResistance = sum(
-            armor.DisorderResistance
-            + next(
-                (
-                    forge.DisorderResistance
-                    for forge in armor.ForgeConfigList
-                    if forge.ForgeLv == forgeLv
-                ),
-                0,
-            )
-            for armor , forgeLv in self.armor_list
-        )
+        armor_disorderResistance = self.armor_status.DisorderResistance
 
         self.temp_equip_status.DisorderResistance = armor_disorderResistance
 
@@ -792,13 +682,9 @@ class CharacterStatusCalculator:
         stats = self.calculate_all_status()
 
         # 設定總能力值
-        result = {}
-        basal = stats["basal"];
-        equip = stats["equip"];
-        for f in fields(StatusValues):
-            tempName = f.name
-            value = getattr(basal, tempName) + getattr(equip, tempName)
-            result[tempName] = value
+        result = StatusVector([
+            basal + equip for basal, equip in zip(_status_getter(stats["basal"]), _status_getter(stats["equip"]))
+        ])
 
 
         # 返回完整角色數據
@@ -830,6 +716,7 @@ class CharacterStatusCalculator:
         """
         return {
             "race": race ,
+            "job": jobBonusData.Job,  # 職業ID (查詢基礎能力值表用)
             "STR": jobBonusData.STR, 
             "DEX": jobBonusData.DEX, 
             "INT": jobBonusData.INT, 
@@ -851,10 +738,4 @@ class CharacterStatusCalculator:
         Returns:
             list: 可用技能列表
         """
-        #
-
-        return [
-            skill
-            for skill in self.game_data.SkillDataDic.values()
-            if skill.Job in char_class.Job
-        ]
\ No newline at end of file
+        return list(self.game_data.get_skills_by_job(char_class.Job))
\ No newline at end of file
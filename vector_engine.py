@@ -0,0 +1,529 @@
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from AICombatAction import ActorCritic
+from battle_engine import BattleSpec, create_battle_character
+from battle_simulator import BattleCharacter, FastBattleMaxTime, FastBattleTickTime, _countdown, _countdown_ticks, \
+    _accumulate_ticks
+from character_factory import CharacterFactory
+from commonfunction import get_text
+from damage_analysis import AttackProfile, DamageSkillComponents, attack_profile, attack_delay, effective_skill, \
+    normal_attack_skill
+from game_models import GameData, SkillData
+from skill_processor import skill_all_condition_process
+
+
+# 向量引擎可以計算的傷害組件 (只對目標造成一次攻擊判定)
+VectorDamageComponents = DamageSkillComponents
+# _execute_component 中會改變狀態的組件 (出現在主動技能時交給逐場模擬)
+# 不在 _execute_component 處理範圍內的組件 (例如空白) 只產生一筆沒有效果的結果
+EffectSkillComponents = ("ElementDamage", "CrowdControl", "ContinuanceBuff", "AdditiveBuff", "Debuff", "PassiveBuff",
+                         "Utility", "Health", "EnhanceSkill", "UpgradeSkill")
+# 戰鬥中結果不會改變的技能條件 (其他條件例如 HpLess 交給逐場模擬)
+StaticConditionKeys = ("EquipWeapon", "EquipLeft", "EquipArmor", "InCombatStatus", "Stack")
+# 施放對象為自己的 EffectRecive (與 _execute_component 相同)
+SelfEffectRecives = (0, -2, -3)
+
+
+def check_vector_support(player: BattleCharacter, enemy: BattleCharacter) -> Optional[str]:
+    """
+    檢查戰鬥是否能以向量引擎模擬 (雙方需已執行過被動技能)
+
+    Returns:
+        無法向量化的原因 可以時回傳None
+    """
+    if enemy.characterType:
+        return "對手不是怪物"
+    if enemy.skills:
+        return "怪物有技能"
+
+    settings = GameData.Instance.GameSettingDic
+    first_recovery = min(_accumulate_ticks(0, settings["HpRecoverySec"].GameSettingValue, FastBattleTickTime),
+                         _accumulate_ticks(0, settings["MpRecoverySec"].GameSettingValue, FastBattleTickTime))
+    for character in (player, enemy):
+        if character.items:
+            return f"{character.name} 攜帶道具"
+        if character.buff_item or character.debuff_skill:
+            return f"{character.name} 有持續中的效果"
+        # 被動技能的效果在第一次自然恢復前結束時 以能力值階段處理
+        if any(_countdown_ticks(duration, FastBattleTickTime) >= first_recovery
+               for _, duration in character.buff_skill.values()):
+            return f"{character.name} 有持續中的效果"
+        if character.controlled_for_attack > 0 or character.controlled_for_skill > 0:
+            return f"{character.name} 受到控制"
+        if (character.additive_buff_event.has_subscribers() or character.additive_debuff_event.has_subscribers()
+                or character.subscription_skill_event.has_subscribers()):
+            return f"{character.name} 有疊加或訂閱效果"
+        if character.stats["HP_Recovery"] < 0 or character.stats["MP_Recovery"] < 0:
+            return f"{character.name} 自然恢復為負值"
+
+    for skill in player.skills:
+        if not skill.Characteristic:
+            continue
+        for op in skill.SkillOperationDataList:
+            if op.SkillComponentID in EffectSkillComponents:
+                return f"技能 {skill.SkillID} 有 {op.SkillComponentID} 效果"
+            if op.DependCondition not in ("", "None", None):
+                return f"技能 {skill.SkillID} 有依賴條件"
+            if op.SkillComponentID in VectorDamageComponents and op.EffectRecive in SelfEffectRecives:
+                return f"技能 {skill.SkillID} 對自己造成傷害"
+            for condition in (*op.ConditionOR, *op.ConditionAND):
+                if condition and condition.split("_")[0] not in StaticConditionKeys:
+                    return f"技能 {skill.SkillID} 的條件 {condition} 會在戰鬥中改變"
+    return None
+
+
+@dataclass
+class _VectorAction:
+    """
+    玩家的一個動作 (普攻或純傷害技能)
+    """
+    skill: Optional[SkillData]  # 普攻為None
+    hits: List[Optional[AttackProfile]]  # 依序的技能結果 None為沒有效果的組件
+    delay: float  # 到下一次行動的間隔
+    cooldown_chain: List[float] = field(default_factory=list)  # 冷卻數值逐 tick 的序列 (冷卻小於等於0時為空)
+
+    @property
+    def sets_cooldown(self) -> bool:
+        # 與快速戰鬥相同 有任何技能結果時才進入冷卻
+        return self.skill is not None and len(self.hits) > 0
+
+
+@dataclass
+class _VectorPhase:
+    """
+    能力值固定的一段戰鬥 (被動技能效果結束時進入下一個階段)
+    """
+    start_tick: int  # 從第幾個 tick 之後開始
+    actions: List[Optional[_VectorAction]]  # 與 action_map 相同順序 道具動作為None
+    enemy_hit: AttackProfile
+    mask: np.ndarray  # 不隨戰鬥變化的合法動作 (技能條件與效果執行中)
+    max_hp: float
+    max_mp: float
+    hp_delta: float = 0  # 進入階段時當前生命的變化 (效果結束時扣回增加的最大生命)
+    mp_delta: float = 0
+
+
+class _BatchedPolicy:
+    """
+    批次評估玩家 PPO 策略 (actor) 的動作機率
+    有存檔模型時所有戰鬥共用同一組權重 沒有時每場戰鬥各自隨機初始化 (與逐場模擬每場建立新的 AI 相同)
+    """
+
+    def __init__(self, policy: ActorCritic, count: int, shared: bool, state_dim: int, n_actions: int):
+        self.shared = shared
+        if shared:
+            self.layers = [(layer.weight.detach(), layer.bias.detach())
+                           for layer in policy.actor if isinstance(layer, nn.Linear)]
+        else:
+            actors = [ActorCritic(state_dim, n_actions).actor for _ in range(count)]
+            linears = [[layer for layer in actor if isinstance(layer, nn.Linear)] for actor in actors]
+            self.layers = [
+                (torch.stack([layers[i].weight.detach() for layers in linears]),
+                 torch.stack([layers[i].bias.detach() for layers in linears]))
+                for i in range(len(linears[0]))
+            ]
+
+    def probabilities(self, indexes: np.ndarray, states: np.ndarray, masks: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            indexes: 戰鬥編號 (n)
+            states: 狀態 (n, 狀態維度)
+            masks: 合法動作 (n, 動作數)
+
+        Returns:
+            動作機率 (n, 動作數)
+        """
+        x = torch.from_numpy(states)
+        with torch.no_grad():
+            for i, (weight, bias) in enumerate(self.layers):
+                if self.shared:
+                    x = torch.nn.functional.linear(x, weight, bias)
+                else:
+                    rows = torch.from_numpy(indexes)
+                    x = torch.baddbmm(bias[rows].unsqueeze(2), weight[rows], x.unsqueeze(2)).squeeze(2)
+                if i < len(self.layers) - 1:
+                    x = torch.tanh(x)
+            # 與 choose_action 相同 不合法動作的 logits 設為 -1e9
+            x[~torch.from_numpy(masks)] = -1e9
+            return torch.softmax(x, dim=1).double().numpy()
+
+
+@dataclass
+class VectorBattleResults:
+    """
+    向量戰鬥結果 (每個陣列的第一維為戰鬥編號)
+    """
+    player_won: np.ndarray
+    timed_out: np.ndarray
+    duration: np.ndarray
+    player_damage: np.ndarray
+    enemy_damage: np.ndarray
+    player_hp: np.ndarray
+    enemy_hp: np.ndarray
+    skill_names: List[str]  # player_skill_usage 的欄位 (技能名稱)
+    player_skill_usage: np.ndarray  # (戰鬥, 技能) 使用次數
+    player_skill_names: List[str]  # 玩家所有技能名稱 (包含被動技能)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """
+        轉為與 batch_runner 逐場模擬相同格式的摘要
+        """
+        summaries = []
+        for i in range(len(self.player_won)):
+            usage = {name: 0 for name in self.player_skill_names}
+            for name, count in zip(self.skill_names, self.player_skill_usage[i].tolist()):
+                usage[name] += count
+            summaries.append({
+                "won": bool(self.player_won[i]),
+                "timed_out": bool(self.timed_out[i]),
+                "duration": float(self.duration[i]),
+                "player_damage": float(self.player_damage[i]),
+                "enemy_damage": float(self.enemy_damage[i]),
+                "player_skill_usage": usage,
+                "enemy_skill_usage": {},
+            })
+        return summaries
+
+
+class VectorBattleScenario:
+    """
+    向量化戰鬥 (玩家只使用普攻與純傷害技能 對上沒有技能的怪物)
+    所有戰鬥以陣列同步推進 每一輪每場戰鬥處理自己的下一個事件 (依時間 同時間玩家先行動)
+    tick 只處理被動效果結束與雙方的自然恢復 技能冷卻以施放時的 tick 位置計算 與快速戰鬥逐 tick 遞減的結果相同
+    不訓練 AI
+    """
+
+    def __init__(self, player: BattleCharacter, enemy: BattleCharacter, game_data: GameData = None):
+        self.game_data = game_data or GameData.Instance
+        self.player = player
+        self.enemy = enemy
+        ai = player.ai
+        self.action_map = list(ai.action_map)
+        self.state_dim = ai.state_dim
+        self.has_model = os.path.exists(ai._save_path())
+        self.policy = ai.policy
+        self.enemy_delay = attack_delay(enemy, 1)
+        self.enemy_max_hp = enemy.stats["MaxHP"]
+        self.skill_indexes = [a for a, action_id in enumerate(self.action_map)
+                              if any(s.SkillID == action_id for s in player.skills)]
+        self.cast_mage = np.zeros(len(self.action_map))
+        for a in self.skill_indexes:
+            self.cast_mage[a] = next(s for s in player.skills if s.SkillID == self.action_map[a]).CastMage
+
+        # 狀態的技能冷卻特徵 (與 get_state 相同: Characteristic 為 True 的技能) [(狀態欄位, 動作, 最大冷卻)]
+        feature_skills = [s for s in player.skills if s.Characteristic is True]
+        self.cooldown_features = [
+            (5 + len(feature_skills) + j, self.action_map.index(s.SkillID), self.game_data.SkillDataDic[s.SkillID].CD)
+            for j, s in enumerate(feature_skills)
+        ]
+
+        # tick 時間格線 (逐次累加 dt 與快速戰鬥排程的時間相同) 與自然恢復週期
+        dt = FastBattleTickTime
+        grid = []
+        t = 0.0
+        while t <= FastBattleMaxTime:
+            t += dt
+            grid.append(t)
+        self.tick_times = np.array(grid)
+        settings = self.game_data.GameSettingDic
+        self.hp_recovery_ticks = _accumulate_ticks(0, settings["HpRecoverySec"].GameSettingValue, dt)
+        self.mp_recovery_ticks = _accumulate_ticks(0, settings["MpRecoverySec"].GameSettingValue, dt)
+
+        # 能力值階段 被動效果結束的 tick 都在第一次自然恢復之前 (check_vector_support)
+        # 以原型角色實際執行 pass_time 到所有效果結束 記錄每個 tick 後的能力值
+        self.phases: List[_VectorPhase] = [self._build_phase(0)]
+        tick = 0
+        while player.buff_skill:
+            tick += 1
+            hp, mp = player.stats["HP"], player.stats["MP"]
+            count = len(player.buff_skill)
+            player.pass_time()
+            if len(player.buff_skill) != count:
+                self.phases.append(self._build_phase(tick, player.stats["HP"] - hp, player.stats["MP"] - mp))
+        self.phase_starts = np.array([phase.start_tick for phase in self.phases])
+
+    def _build_phase(self, start_tick: int, hp_delta: float = 0, mp_delta: float = 0) -> _VectorPhase:
+        """
+        依原型角色目前的能力值建立階段
+        """
+        player, enemy = self.player, self.enemy
+        actions: List[Optional[_VectorAction]] = []
+        mask = np.zeros(len(self.action_map), dtype=bool)
+        for a, action_id in enumerate(self.action_map):
+            if action_id == "NORMAL_ATTACK":
+                actions.append(_VectorAction(None, [attack_profile(player, enemy, normal_attack_skill())],
+                                             attack_delay(player, 1)))
+                mask[a] = True
+                continue
+            skill = next((s for s in player.skills if s.SkillID == action_id), None)
+            if skill is None:
+                actions.append(None)
+                continue
+            effective = effective_skill(self.player, skill)
+            hits = [attack_profile(player, enemy, effective) if op.SkillComponentID in VectorDamageComponents else None
+                    for op in skill.SkillOperationDataList]
+            chain, i = _countdown(skill.CD, FastBattleTickTime) if skill.CD > 0 else ([], 0)
+            damage_count = sum(hit is not None for hit in hits)
+            actions.append(_VectorAction(skill, hits, attack_delay(player, damage_count), chain[i:]))
+            # 與 get_action_mask 相同 技能條件成立且沒有同技能的效果執行中
+            mask[a] = skill_all_condition_process(player, skill) and not player.buff_skill.has_source(skill.SkillID)
+        return _VectorPhase(start_tick, actions, attack_profile(enemy, player, normal_attack_skill()), mask,
+                            player.stats["MaxHP"], player.stats["MaxMP"], hp_delta, mp_delta)
+
+    @classmethod
+    def compile(cls, player_spec: BattleSpec, enemy_spec: BattleSpec, game_data: GameData = None,
+                factory: CharacterFactory = None) -> Tuple[Optional["VectorBattleScenario"], Optional[str]]:
+        """
+        依配置建立向量化戰鬥 (先執行雙方被動技能再檢查)
+
+        Returns:
+            (向量化戰鬥, 無法向量化的原因) 無法向量化時第一項為None
+        """
+        game_data = game_data or GameData.Instance
+        player = create_battle_character(player_spec, game_data, factory)
+        enemy = create_battle_character(enemy_spec, game_data, factory, default_name="敵對玩家")
+        # 有技能的怪物無法執行被動技能 (怪物技能資料沒有 Characteristic) 先排除
+        if enemy.characterType:
+            return None, "對手不是怪物"
+        if enemy.skills:
+            return None, "怪物有技能"
+        battle_log = []
+        for character in (player, enemy):
+            character.battle_log = battle_log
+            character.run_passive_skill()
+
+        reason = check_vector_support(player, enemy)
+        if reason is not None:
+            return None, reason
+        return cls(player, enemy, game_data), None
+
+    def _apply_ticks(self, battles: np.ndarray, ticks_done: np.ndarray, ticks: np.ndarray,
+                     p_hp, p_mp, e_hp, e_mp):
+        """
+        套用 ticks_done 到 ticks 之間的 tick (被動效果結束 自然恢復)
+        """
+        old = ticks_done[battles]
+        for phase in self.phases[1:]:
+            entering = (old < phase.start_tick) & (phase.start_tick <= ticks)
+            if entering.any():
+                p_hp[battles[entering]] += phase.hp_delta
+                p_mp[battles[entering]] += phase.mp_delta
+
+        # 自然恢復 每次觸發各自 clamp (與逐 tick 相同)
+        fires = [ticks // self.hp_recovery_ticks - old // self.hp_recovery_ticks,
+                 ticks // self.mp_recovery_ticks - old // self.mp_recovery_ticks]
+        if fires[0].any() or fires[1].any():
+            last = self.phases[-1]
+            targets = ((p_hp, self.player.stats["HP_Recovery"], last.max_hp, 0),
+                       (p_mp, self.player.stats["MP_Recovery"], last.max_mp, 1),
+                       (e_hp, self.enemy.stats["HP_Recovery"], self.enemy.stats["MaxHP"], 0),
+                       (e_mp, self.enemy.stats["MP_Recovery"], self.enemy.stats["MaxMP"], 1))
+            for values, recovery, maximum, kind in targets:
+                remaining = fires[kind].copy()
+                while remaining.any():
+                    firing = battles[remaining > 0]
+                    values[firing] = np.clip(values[firing] + recovery, 0, maximum)
+                    remaining -= 1
+                    remaining[remaining < 0] = 0
+        ticks_done[battles] = ticks
+
+    @staticmethod
+    def _roll(rng: np.random.Generator, profile: AttackProfile, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        一次攻擊判定 (命中 -> 格檔 -> 暴擊)
+
+        Returns:
+            (傷害, 吸血量)
+        """
+        landed = rng.integers(0, 101, count) <= profile.hit_value
+        landed &= ~(rng.integers(0, 101, count) <= profile.block_value)
+        crt = landed & (rng.integers(0, 101, count) <= profile.crt_value)
+        damage = np.where(crt, profile.crt_damage, np.where(landed, profile.damage, 0.0))
+        recovery = np.where(crt, profile.crt_recovery, np.where(landed, profile.recovery, 0.0))
+        return damage, recovery
+
+    def _finish(self, battles: np.ndarray, times: np.ndarray, ticks: np.ndarray, p_next, e_next,
+                active, won, timed_out, duration, player_won: bool):
+        """
+        結束分出勝負的戰鬥
+        快速戰鬥在取出下一個事件 (下一個 tick 或雙方的下一次行動) 時才結束 該事件超過時間上限時仍記為超時
+        """
+        next_time = np.minimum(self.tick_times[ticks], np.minimum(p_next[battles], e_next[battles]))
+        over = next_time > FastBattleMaxTime
+        won[battles] = player_won
+        timed_out[battles] = over
+        duration[battles] = np.where(over, FastBattleMaxTime, times)
+        active[battles] = False
+
+    def run(self, count: int, seed: Optional[int] = None) -> VectorBattleResults:
+        """
+        同步模擬 count 場戰鬥
+        """
+        rng = np.random.default_rng(seed)
+        if seed is not None:
+            torch.manual_seed(seed)
+        n_actions = len(self.action_map)
+        policy = _BatchedPolicy(self.policy, count, self.has_model, self.state_dim, n_actions)
+
+        p_stats, e_stats = self.player.stats, self.enemy.stats
+        p_hp = np.full(count, float(p_stats["HP"]))
+        p_mp = np.full(count, float(p_stats["MP"]))
+        e_hp = np.full(count, float(e_stats["HP"]))
+        e_mp = np.full(count, float(e_stats["MP"]))
+        # 原型角色已經執行到最後一個階段 初始數值取第一個階段
+        for phase in self.phases[1:]:
+            p_hp -= phase.hp_delta
+            p_mp -= phase.mp_delta
+        p_next = np.zeros(count)
+        e_next = np.zeros(count)
+        ticks_done = np.zeros(count, dtype=np.int64)
+        active = np.ones(count, dtype=bool)
+        won = np.zeros(count, dtype=bool)
+        timed_out = np.zeros(count, dtype=bool)
+        duration = np.zeros(count)
+        p_damage = np.zeros(count)
+        e_damage = np.zeros(count)
+        usage = np.zeros((count, n_actions), dtype=np.int64)
+        # 各技能的施放 tick (-1 為不在冷卻中)
+        cast_tick = np.full((count, n_actions), -1, dtype=np.int64)
+        phase_masks = np.array([phase.mask for phase in self.phases])
+        phase_max_hp = np.array([phase.max_hp for phase in self.phases], dtype=float)
+        phase_max_mp = np.array([phase.max_mp for phase in self.phases], dtype=float)
+
+        def cooldown_values(battles: np.ndarray, a: int, ticks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            """
+            (是否在冷卻中, 剩餘冷卻)
+            """
+            cast = cast_tick[battles, a]
+            casted = cast >= 0
+            chain = self.phases[0].actions[a].cooldown_chain
+            if not chain:
+                # 冷卻小於等於0時不會遞減 施放後一直留在冷卻中 (與 pass_time 相同)
+                return casted, np.where(casted, float(self.phases[0].actions[a].skill.CD), 0.0)
+            offset = np.where(casted, ticks - cast, 0)
+            cooling = casted & (offset < len(chain) - 1)
+            return cooling, np.where(cooling, np.asarray(chain)[np.minimum(offset, len(chain) - 1)], 0.0)
+
+        while active.any():
+            battles = np.flatnonzero(active)
+            player_turn = p_next[battles] <= e_next[battles]
+            times = np.where(player_turn, p_next[battles], e_next[battles])
+
+            # 超時 (時間上限內的 tick 照常處理)
+            over = times > FastBattleMaxTime
+            if over.any():
+                ended = battles[over]
+                limit = np.searchsorted(self.tick_times, FastBattleMaxTime, side="right")
+                self._apply_ticks(ended, ticks_done, np.full(len(ended), limit), p_hp, p_mp, e_hp, e_mp)
+                timed_out[ended] = True
+                won[ended] = True  # 與快速戰鬥相同 超時時以玩家是否存活判定
+                duration[ended] = FastBattleMaxTime
+                active[ended] = False
+                battles, player_turn, times = battles[~over], player_turn[~over], times[~over]
+                if len(battles) == 0:
+                    break
+
+            # 先套用這個事件之前 (含同時間) 的 tick
+            ticks = np.searchsorted(self.tick_times, times, side="right")
+            self._apply_ticks(battles, ticks_done, ticks, p_hp, p_mp, e_hp, e_mp)
+            phase_index = np.searchsorted(self.phase_starts, ticks, side="right") - 1
+
+            # ── 玩家行動 ──
+            pb = battles[player_turn]
+            if len(pb):
+                pt = times[player_turn]
+                p_ticks = ticks[player_turn]
+                p_phase = phase_index[player_turn]
+                states = np.zeros((len(pb), self.state_dim), dtype=np.float32)
+                max_hp, max_mp = phase_max_hp[p_phase], phase_max_mp[p_phase]
+                states[:, 0] = np.where(max_hp > 0, np.round(p_hp[pb] / np.where(max_hp > 0, max_hp, 1), 2), 0)
+                states[:, 1] = np.where(max_mp > 0, np.round(p_mp[pb] / np.where(max_mp > 0, max_mp, 1), 2), 0)
+                if self.enemy_max_hp > 0:
+                    states[:, 2] = np.round(e_hp[pb] / self.enemy_max_hp, 2)
+
+                masks = phase_masks[p_phase]
+                for a in self.skill_indexes:
+                    cooling, _ = cooldown_values(pb, a, p_ticks)
+                    masks[:, a] &= (p_mp[pb] - self.cast_mage[a] >= 0) & ~cooling
+                for column, a, max_time in self.cooldown_features:
+                    if max_time > 0:
+                        states[:, column] = cooldown_values(pb, a, p_ticks)[1] / max_time
+
+                probabilities = policy.probabilities(pb, states, masks)
+                cumulative = np.cumsum(probabilities, axis=1)
+                draws = rng.random(len(pb)) * cumulative[:, -1]
+                choices = np.minimum((cumulative < draws[:, None]).sum(axis=1), n_actions - 1)
+
+                for a, phase in {(a, p) for a, p in zip(choices.tolist(), p_phase.tolist())}:
+                    selected = (choices == a) & (p_phase == phase)
+                    b = pb[selected]
+                    action = self.phases[phase].actions[a]
+                    if action.skill is not None:
+                        usage[b, a] += 1
+                        p_mp[b] -= self.cast_mage[a]
+                        if action.sets_cooldown:
+                            cast_tick[b, a] = p_ticks[selected]
+                    for profile in action.hits:
+                        if profile is None:
+                            continue
+                        damage, recovery = self._roll(rng, profile, len(b))
+                        e_hp[b] -= damage
+                        p_damage[b] += damage
+                        if profile.recovery or profile.crt_recovery:
+                            p_hp[b] = np.maximum(p_hp[b], np.minimum(p_hp[b] + recovery, max_hp[selected]))
+                    p_next[b] = pt[selected] + action.delay
+
+                killed = e_hp[pb] <= 0
+                self._finish(pb[killed], pt[killed], p_ticks[killed], p_next, e_next,
+                             active, won, timed_out, duration, True)
+
+            # ── 怪物行動 (沒有技能 只會普攻) ──
+            eb = battles[~player_turn]
+            if len(eb):
+                et = times[~player_turn]
+                e_ticks = ticks[~player_turn]
+                e_phase = phase_index[~player_turn]
+                for phase in np.unique(e_phase).tolist():
+                    selected = e_phase == phase
+                    b = eb[selected]
+                    profile = self.phases[phase].enemy_hit
+                    damage, recovery = self._roll(rng, profile, len(b))
+                    p_hp[b] -= damage
+                    e_damage[b] += damage
+                    if profile.recovery or profile.crt_recovery:
+                        e_hp[b] = np.maximum(e_hp[b], np.minimum(e_hp[b] + recovery, self.enemy_max_hp))
+                e_next[eb] = et + self.enemy_delay
+
+                dead = p_hp[eb] <= 0
+                self._finish(eb[dead], et[dead], e_ticks[dead], p_next, e_next,
+                             active, won, timed_out, duration, False)
+
+        return VectorBattleResults(
+            player_won=won,
+            timed_out=timed_out,
+            duration=duration,
+            player_damage=p_damage,
+            enemy_damage=e_damage,
+            player_hp=p_hp,
+            enemy_hp=e_hp,
+            skill_names=[get_text(self.phases[0].actions[a].skill.Name) for a in self.skill_indexes],
+            player_skill_usage=usage[:, self.skill_indexes],
+            player_skill_names=[get_text(s.Name) for s in self.player.skills],
+        )
+
+
+def run_vector_battles(player_spec: BattleSpec, enemy_spec: BattleSpec, count: int, seed: Optional[int] = None,
+                       game_data: GameData = None) -> Optional[VectorBattleResults]:
+    """
+    以向量引擎模擬 count 場戰鬥 無法向量化時回傳None
+    """
+    scenario, _ = VectorBattleScenario.compile(player_spec, enemy_spec, game_data)
+    if scenario is None:
+        return None
+    return scenario.run(count, seed)